@@ -0,0 +1,34 @@
+"""
+Benchmark of cold package import.
+
+Times `import stplpy` in fresh interpreters against importing requests,
+which the package defers until a client is first used.
+
+Usage (with the package installed, e.g. pip install -e .):
+    python benchmarks/bench_import.py [--repeat 5]
+"""
+import argparse
+import subprocess
+import sys
+import time
+
+
+def cold_import(module: str) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", f"import {module}"], check=True)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="Interpreters started per module (best is reported)")
+    args = parser.parse_args()
+
+    baseline = min(cold_import("sys") for _ in range(args.repeat))
+    for module in ("stplpy", "requests"):
+        best = min(cold_import(module) for _ in range(args.repeat)) - baseline
+        print(f"import {module:<10} {best * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Microbenchmark of post_token generation.
+
+Compares the previous Timeline.create_token (random.choice per character
+over a freshly built alphabet) with tokens.generate_token and
+tokens.derive_token.
+
+Usage (with the package installed, e.g. pip install -e .):
+    python benchmarks/bench_tokens.py [--number 20000] [--repeat 5]
+"""
+import argparse
+import random
+import string
+import timeit
+
+from stplpy.tokens import derive_token, generate_token
+
+
+def legacy_create_token(n: int = 10) -> str:
+    randlst = [
+        random.choice(string.ascii_letters + string.digits) for i in range(n)
+    ]
+    return "".join(randlst)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--number", type=int, default=20000, help="Tokens generated per measurement")
+    parser.add_argument("--repeat", type=int, default=5, help="Measurements per case (best is reported)")
+    args = parser.parse_args()
+
+    payload = {"duration": 3600, "record_datetime": "2024-01-01T10:00:00Z", "comment": "study", "material_code": "ASIN1"}
+    cases = [
+        ("legacy random.choice", legacy_create_token),
+        ("generate_token", generate_token),
+        ("derive_token", lambda n: derive_token(payload, n)),
+    ]
+    for length in (10, 36):
+        print(f"token length {length}:")
+        baseline = None
+        for name, function in cases:
+            best = min(timeit.repeat(lambda: function(length), number=args.number, repeat=args.repeat))
+            per_token = best / args.number * 1e6
+            baseline = baseline or per_token
+            print(f"  {name:<22} {per_token:8.2f} us/token  ({baseline / per_token:5.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
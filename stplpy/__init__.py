@@ -1,18 +1,52 @@
 import datetime
-from typing import Dict, List, Optional, Any
+import threading
+from importlib import import_module
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Iterator, List, Optional, Any, Union
 
-from .timeline import Timeline
-from .user import User
+from .image import DEFAULT_MAX_BYTES, DEFAULT_MAX_SIZE
 from .exceptions import (
     StudyPlusError,
     APIError,
     AuthenticationError,
     ResourceNotFoundError,
     ValidationError,
-    RateLimitError
+    RateLimitError,
+    CircuitOpenError
 )
-from .logger import get_logger, configure_logging
-from . import utils
+
+if TYPE_CHECKING:
+    from .cache import Cache, MemoryCache, SQLiteCache
+    from .transport import Transport
+    from .breaker import CircuitBreaker, CircuitBreakers
+    from .scheduler import RequestScheduler
+    from .logger import get_logger, configure_logging
+    from .memory import MemoryBudget
+    from .ratelimit import RateLimiter
+    from .outbox import Outbox
+    from .watcher import TimelineWatcher
+    from .timeline import Timeline
+    from .user import User
+    from . import utils
+
+# Submodules pulling in requests and other heavy dependencies are imported on
+# first attribute access, so `import stplpy` stays cheap for one-shot scripts.
+_LAZY_ATTRIBUTES = {
+    'Timeline': '.timeline',
+    'User': '.user',
+    'Cache': '.cache',
+    'MemoryCache': '.cache',
+    'SQLiteCache': '.cache',
+    'Transport': '.transport',
+    'CircuitBreaker': '.breaker',
+    'CircuitBreakers': '.breaker',
+    'RequestScheduler': '.scheduler',
+    'get_logger': '.logger',
+    'configure_logging': '.logger',
+    'RateLimiter': '.ratelimit',
+    'Outbox': '.outbox',
+    'TimelineWatcher': '.watcher',
+    'MemoryBudget': '.memory',
+}
 
 __all__ = [
     'StudyPlus',
@@ -22,6 +56,17 @@ __all__ = [
     'ResourceNotFoundError',
     'ValidationError',
     'RateLimitError',
+    'CircuitOpenError',
+    'RateLimiter',
+    'Outbox',
+    'TimelineWatcher',
+    'MemoryBudget',
+    'MemoryCache',
+    'SQLiteCache',
+    'Transport',
+    'CircuitBreaker',
+    'CircuitBreakers',
+    'RequestScheduler',
     'get_logger',
     'configure_logging',
     'utils'
@@ -30,15 +75,102 @@ __all__ = [
 __version__ = '0.2.0'
 
 
+def __getattr__(name: str) -> Any:
+    if name in _LAZY_ATTRIBUTES:
+        value = getattr(import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+    elif name == 'utils':
+        value = import_module('.utils', __name__)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES) | {'utils'})
+
+
 class StudyPlus:
-    def __init__(self, token: str):
+    """
+    StudyPlus API client.
+
+    A client can be shared across threads and survives os.fork: its
+    sub-clients are created once, request headers are read-only, and the
+    transport keeps a session per thread and process.
+
+    With memory_budget (bytes or a MemoryBudget), the profile cache and
+    timeline prefetch buffers share one limit: cached profiles are evicted
+    and reading ahead pauses when it is reached. Register further
+    components (dedupers, watchers) with client.memory_budget.register.
+    """
+
+    def __init__(
+        self,
+        token: str,
+        cache: Optional["Cache"] = None,
+        transport: Optional["Transport"] = None,
+        memory_budget: Optional[Union[int, "MemoryBudget"]] = None
+    ):
         self.token = token
-        self.user = User(token)
-        self.timeline = Timeline(token)
+        if isinstance(memory_budget, int):
+            from .memory import MemoryBudget
+            memory_budget = MemoryBudget(memory_budget)
+        self.memory_budget: Optional["MemoryBudget"] = memory_budget
+        if memory_budget is not None and getattr(cache, "attach_budget", None) is not None and cache.budget is None:
+            cache.attach_budget(memory_budget)
+        self._cache = cache
+        self._transport = transport
+        self._user: Optional["User"] = None
+        self._timeline: Optional["Timeline"] = None
+        self._lock = threading.Lock()
+
+    def _component(self, name: str, factory: Callable[[], Any]) -> Any:
+        value = getattr(self, name)
+        if value is None:
+            # Locked so threads racing on first use still share one instance.
+            with self._lock:
+                value = getattr(self, name)
+                if value is None:
+                    value = factory()
+                    setattr(self, name, value)
+        return value
+
+    # Sub-clients are built on first use; a client used only for timelines
+    # never imports or constructs the user client.
+    @property
+    def transport(self) -> "Transport":
+        from .transport import Transport
+        return self._component("_transport", Transport)
+
+    # The shared transport is resolved before _component takes the lock for
+    # the sub-client, as the lock is not reentrant.
+    @property
+    def user(self) -> "User":
+        from .user import User
+        transport = self.transport
+        return self._component("_user", lambda: User(self.token, self._cache, transport))
+
+    @property
+    def timeline(self) -> "Timeline":
+        from .timeline import Timeline
+        transport = self.transport
+        return self._component("_timeline", lambda: Timeline(self.token, transport, self.memory_budget))
 
     def log(self, text: str) -> None:
         print(f"[{datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {text}")
 
+    def circuit_breakers(self) -> Dict[str, Dict[str, Any]]:
+        return self.transport.breakers.snapshot() if self.transport.breakers else {}
+
+    def scheduler_metrics(self) -> Dict[str, Dict[str, Any]]:
+        return self.transport.scheduler.metrics() if self.transport.scheduler else {}
+
+    def transfer_stats(self) -> Dict[str, Dict[str, Any]]:
+        return self.transport.transfers.snapshot()
+
+    def memory_usage(self) -> Dict[str, int]:
+        return self.memory_budget.usage() if self.memory_budget else {}
+
     # __________User__________
     def get_myself(self) -> Dict[str, Any]:
         return self.user.get_myself()
@@ -46,11 +178,14 @@ class StudyPlus:
     def get_user(self, user_name: str) -> Dict[str, Any]:
         return self.user.get_user(user_name)
 
-    def download_profile_picture(self, user_name: Optional[str] = None, output_file_name: str = "output.jpg") -> bool:
-        return self.user.download_profile_picture(user_name, output_file_name)
+    def download_profile_picture(self, user_name: Optional[str] = None, output_file_name: str = "output.jpg", image_url: Optional[str] = None) -> bool:
+        return self.user.download_profile_picture(user_name, output_file_name, image_url)
+
+    def download_profile_pictures(self, users: Iterable[Dict[str, Any]], output_dir: str = ".", max_workers: int = 8) -> Dict[str, str]:
+        return self.user.download_profile_pictures(users, output_dir, max_workers)
 
-    def update_profile_picture(self, file_path: str) -> bool:
-        return self.user.update_profile_picture(file_path)
+    def update_profile_picture(self, file_path: str, preprocess: bool = False, max_size: int = DEFAULT_MAX_SIZE, max_bytes: int = DEFAULT_MAX_BYTES) -> bool:
+        return self.user.update_profile_picture(file_path, preprocess, max_size, max_bytes)
 
     def follow_user(self, user_name: str) -> bool:
         return self.user.follow_user(user_name)
@@ -64,24 +199,51 @@ class StudyPlus:
     def get_followers(self, target_id: str, limit: int = 10, header_less: bool = False) -> List[Dict[str, Any]]:
         return self.user.get_followers(target_id, limit, header_less)
 
+    def iter_followees(self, target_id: str, limit: Optional[int] = None, header_less: bool = False, start_page: int = 1, prefetch: int = 0) -> Iterator[List[Dict[str, Any]]]:
+        return self.user.iter_followees(target_id, limit, header_less, start_page, prefetch)
+
+    def iter_followers(self, target_id: str, limit: Optional[int] = None, header_less: bool = False, start_page: int = 1, prefetch: int = 0) -> Iterator[List[Dict[str, Any]]]:
+        return self.user.iter_followers(target_id, limit, header_less, start_page, prefetch)
+
+    def stream_followees(self, target_id: str, limit: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        return self.user.stream_followees(target_id, limit)
+
+    def stream_followers(self, target_id: str, limit: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        return self.user.stream_followers(target_id, limit)
+
     # __________Timeline__________
     def get_post_detail(self, post_id: str, include_like_users: bool = False, like_user_count: int = 100, include_comments: bool = False, comment_count: int = 100) -> Dict[str, Any]:
         return self.timeline.get_post_detail(post_id, include_like_users, like_user_count, include_comments, comment_count)
 
+    def get_post_details(self, post_ids: Iterable[str], include_like_users: bool = False, like_user_count: int = 100, include_comments: bool = False, comment_count: int = 100, fields: Optional[Iterable[str]] = None, max_workers: int = 8) -> Dict[str, Dict[str, Any]]:
+        return self.timeline.get_post_details(post_ids, include_like_users, like_user_count, include_comments, comment_count, fields, max_workers)
+
+    def get_post_comments(self, post_id: str, until: Optional[str] = None, per_page: int = 50) -> Dict[str, Any]:
+        return self.timeline.get_post_comments(post_id, until, per_page)
+
+    def get_post_like_users(self, post_id: str, until: Optional[str] = None, per_page: int = 50) -> Dict[str, Any]:
+        return self.timeline.get_post_like_users(post_id, until, per_page)
+
+    def iter_post_comments(self, post_id: str, per_page: int = 50, stream: bool = False) -> Iterator[Dict[str, Any]]:
+        return self.timeline.iter_post_comments(post_id, per_page, stream)
+
+    def iter_post_like_users(self, post_id: str, per_page: int = 50, stream: bool = False) -> Iterator[Dict[str, Any]]:
+        return self.timeline.iter_post_like_users(post_id, per_page, stream)
+
     def like_post(self, post_id: str) -> bool:
         return self.timeline.like_post(post_id)
 
     def unlike_post(self, post_id: str) -> bool:
         return self.timeline.unlike_post(post_id)
 
-    def send_comment(self, post_id: str, text: str) -> Dict[str, Any]:
-        return self.timeline.send_comment(post_id, text)
+    def send_comment(self, post_id: str, text: str, post_token: Optional[str] = None, idempotent: bool = False) -> Dict[str, Any]:
+        return self.timeline.send_comment(post_id, text, post_token, idempotent)
 
     def unsend_comment(self, post_id: str, comment_id: str) -> bool:
         return self.timeline.unsend_comment(post_id, comment_id)
 
-    def post_study_record(self, material_code: Optional[str] = None, duration: int = 0, comment: str = "", record_datetime: Optional[str] = None) -> Dict[str, Any]:
-        return self.timeline.post_study_record(material_code, duration, comment, record_datetime)
+    def post_study_record(self, material_code: Optional[str] = None, duration: int = 0, comment: str = "", record_datetime: Optional[str] = None, post_token: Optional[str] = None, idempotent: bool = False) -> Dict[str, Any]:
+        return self.timeline.post_study_record(material_code, duration, comment, record_datetime, post_token, idempotent)
 
     def delete_study_record(self, record_number: int) -> Dict[str, Any]:
         return self.timeline.delete_study_record(record_number)
@@ -98,6 +260,18 @@ class StudyPlus:
     def get_achievement_timeline(self, target_id: Optional[str] = None, until: Optional[str] = None) -> Dict[str, Any]:
         return self.timeline.get_achievement_timeline(target_id, until)
 
+    def iter_followee_timelines(self, limit: Optional[int] = None, prefetch: int = 0, until: Optional[str] = None, stream: bool = False) -> Iterator[Dict[str, Any]]:
+        return self.timeline.iter_followee_timelines(limit, prefetch, until, stream)
+
+    def iter_user_timelines(self, target_id: str, limit: Optional[int] = None, prefetch: int = 0, until: Optional[str] = None, stream: bool = False) -> Iterator[Dict[str, Any]]:
+        return self.timeline.iter_user_timelines(target_id, limit, prefetch, until, stream)
+
+    def iter_goal_timelines(self, target_id: str, limit: Optional[int] = None, prefetch: int = 0, until: Optional[str] = None, stream: bool = False) -> Iterator[Dict[str, Any]]:
+        return self.timeline.iter_goal_timelines(target_id, limit, prefetch, until, stream)
+
+    def iter_achievement_timelines(self, target_id: Optional[str] = None, limit: Optional[int] = None, prefetch: int = 0, until: Optional[str] = None, stream: bool = False) -> Iterator[Dict[str, Any]]:
+        return self.timeline.iter_achievement_timelines(target_id, limit, prefetch, until, stream)
+
     def get_followee_timelines(self, limit: int = 3) -> List[Dict[str, Any]]:
         return self.timeline.get_followee_timelines(limit)
 
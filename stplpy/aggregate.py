@@ -0,0 +1,371 @@
+"""
+Goal activity aggregation for Stplpy library.
+
+GoalAggregator crawls goal and achievement feeds of many study goals
+concurrently and keeps per-day rollups of study duration, event counts and
+active users for each goal and each (goal, material) pair. A refresh only
+reads the pages published since the previous one, and window summaries
+(1, 7 and 30 days by default) are answered from at most one bucket per day.
+
+Feeds are ordered by posting time, while study records can be backdated,
+so a read skips events recorded before the window and stops only at the
+previous refresh's newest page or at an event posted before the window.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone, tzinfo
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from .dedup import event_key
+from .timeline import Timeline
+from .utils import get_event_field, parse_iso_datetime
+
+logger = logging.getLogger(__name__)
+
+SOURCES = ("goal", "achievement")
+
+
+class _Rollup:
+    """Per-day duration, event and active-user buckets of one goal or material."""
+
+    def __init__(self) -> None:
+        self.durations: Dict[int, int] = {}
+        self.events: Dict[int, int] = {}
+        # Each user is counted on the latest day they were active, so the
+        # distinct users of a window are the sizes of its days' sets.
+        self.last_active: Dict[Any, int] = {}
+        self.users_by_day: Dict[int, Set[Any]] = {}
+
+    def add(self, day: int, duration: int, user: Optional[Any]) -> None:
+        self.durations[day] = self.durations.get(day, 0) + duration
+        self.events[day] = self.events.get(day, 0) + 1
+        if user is None:
+            return
+        previous = self.last_active.get(user)
+        if previous is not None and previous >= day:
+            return
+        if previous is not None:
+            self.users_by_day[previous].discard(user)
+        self.last_active[user] = day
+        self.users_by_day.setdefault(day, set()).add(user)
+
+    def prune(self, first_day: int) -> None:
+        for day in [day for day in self.events if day < first_day]:
+            del self.durations[day], self.events[day]
+        for day in [day for day in self.users_by_day if day < first_day]:
+            for user in self.users_by_day.pop(day):
+                del self.last_active[user]
+
+    def summary(self, today: int, window: int) -> Dict[str, int]:
+        days = range(today - window + 1, today + 1)
+        return {
+            "duration": sum(self.durations.get(day, 0) for day in days),
+            "events": sum(self.events.get(day, 0) for day in days),
+            "active_users": sum(len(self.users_by_day.get(day, ())) for day in days),
+        }
+
+
+class GoalAggregator:
+    """
+    Rolling per-goal and per-material activity totals over several study goals.
+
+    Example:
+        aggregator = GoalAggregator(cl.timeline, ["college-180", "toeic-800"])
+        aggregator.refresh()
+        aggregator.goal_summary("college-180")[7]["duration"]
+
+    Args:
+        timeline: Timeline used to fetch feeds
+        goals: Study goal ids (e.g. "college-180")
+        sources: Feeds read for each goal: "goal" and/or "achievement"
+        windows: Window lengths in days reported by the summaries
+        max_workers: Feeds fetched concurrently during a refresh
+        max_pages: Page limit per feed and refresh (all new pages if None)
+        tz: Time zone in which days start
+    """
+
+    def __init__(
+        self,
+        timeline: Timeline,
+        goals: Iterable[str] = (),
+        sources: Iterable[str] = SOURCES,
+        windows: Iterable[int] = (1, 7, 30),
+        max_workers: int = 8,
+        max_pages: Optional[int] = None,
+        tz: tzinfo = timezone.utc
+    ):
+        self.sources = tuple(sources)
+        unknown = set(self.sources) - set(SOURCES)
+        if unknown:
+            raise ValueError(f"Unknown sources: {sorted(unknown)}")
+        self.windows = tuple(sorted(set(windows)))
+        if not self.windows or self.windows[0] < 1:
+            raise ValueError("windows must be positive day counts")
+        self.timeline = timeline
+        self.max_workers = max_workers
+        self.max_pages = max_pages
+        self.tz = tz
+        self.goals: List[str] = []
+        self._goal_rollups: Dict[str, _Rollup] = {}
+        self._material_rollups: Dict[Tuple[str, str], _Rollup] = {}
+        # Keys of counted events by day, so feeds overlapping each other (or a
+        # refresh overlapping the previous one) never count an event twice.
+        self._counted: Set[Tuple[str, str]] = set()
+        self._counted_by_day: Dict[int, List[Tuple[str, str]]] = {}
+        # Ids of the newest page read from each feed; a refresh stops there.
+        self._heads: Dict[Tuple[str, str], Set[str]] = {}
+        # Stretches of each feed left unread when max_pages cut a read short,
+        # as (cursor to resume from, ids of the page that ends the stretch).
+        self._gaps: Dict[Tuple[str, str], List[Tuple[str, Set[str]]]] = {}
+        self._lock = threading.Lock()
+        for goal in goals:
+            self.add_goal(goal)
+
+    def add_goal(self, goal: str) -> None:
+        """
+        Start aggregating a study goal from the next refresh on.
+
+        Args:
+            goal: Study goal id
+        """
+        with self._lock:
+            if goal not in self._goal_rollups:
+                self.goals.append(goal)
+                self._goal_rollups[goal] = _Rollup()
+
+    def _day(self, moment: datetime) -> int:
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+        return moment.astimezone(self.tz).toordinal()
+
+    def _today(self, now: Optional[datetime]) -> int:
+        return self._day(now or datetime.now(timezone.utc))
+
+    def _event_day(self, event: Dict[str, Any], *fields: str) -> Optional[int]:
+        value = get_event_field(event, *(fields or ("record_datetime", "posted_at", "created_at")))
+        if not isinstance(value, str):
+            return None
+        try:
+            return self._day(parse_iso_datetime(value))
+        except ValueError:
+            return None
+
+    def _fetcher(self, goal: str, source: str) -> Callable[[Optional[str]], Dict[str, Any]]:
+        if source == "goal":
+            return lambda until: self.timeline.get_goal_timeline(goal, until)
+        return lambda until: self.timeline.get_achievement_timeline(goal, until)
+
+    def _read_stretch(
+        self,
+        fetch: Callable[[Optional[str]], Dict[str, Any]],
+        until: Optional[str],
+        stop: Set[str],
+        first_day: int,
+        limit: Optional[int],
+        events: List[Dict[str, Any]]
+    ) -> Tuple[Set[str], Optional[str], int]:
+        """
+        Read pages from a cursor until an id in stop, an event posted before
+        first_day or the end of the feed, appending in-window events.
+
+        Returns:
+            Ids of the first page read, the cursor to resume from if limit
+            cut the read short (None otherwise), and the pages read
+        """
+        first_page: Set[str] = set()
+        pages = 0
+        for page in self.timeline.iter_pages(fetch, limit, until):
+            pages += 1
+            feeds = page.get("feeds") or []
+            if pages == 1:
+                first_page = {event_key(event) for event in feeds}
+            for event in feeds:
+                posted = self._event_day(event, "posted_at", "created_at")
+                if event_key(event) in stop or (posted is not None and posted < first_day):
+                    return first_page, None, pages
+                day = self._event_day(event)
+                if day is not None and day >= first_day:
+                    events.append(event)
+            if not page.get("next"):
+                return first_page, None, pages
+            until = page["next"]
+        return first_page, until, pages
+
+    def _read_feed(
+        self, goal: str, source: str, first_day: int
+    ) -> Tuple[List[Dict[str, Any]], Set[str], List[Tuple[str, Set[str]]]]:
+        """Read a feed's new pages, then any stretches left by earlier reads, within max_pages."""
+        fetch = self._fetcher(goal, source)
+        head = self._heads.get((goal, source), set())
+        events: List[Dict[str, Any]] = []
+        remaining = self.max_pages
+        new_head, resume, pages = self._read_stretch(fetch, None, head, first_day, remaining, events)
+        if remaining is not None:
+            remaining -= pages
+        gaps = list(self._gaps.get((goal, source), []))
+        if resume is not None:
+            # The read stopped before reaching the previous head; the pages in
+            # between are read by later refreshes.
+            gaps.insert(0, (resume, head))
+        pending = []
+        for cursor, stop in gaps:
+            if remaining is not None and remaining <= 0:
+                pending.append((cursor, stop))
+                continue
+            _, resume, pages = self._read_stretch(fetch, cursor, stop, first_day, remaining, events)
+            if remaining is not None:
+                remaining -= pages
+            if resume is not None:
+                pending.append((resume, stop))
+        return events, new_head or head, pending
+
+    def refresh(self, now: Optional[datetime] = None) -> int:
+        """
+        Fetch the events published since the last refresh and fold them in.
+
+        Feeds are fetched concurrently. A feed that fails keeps its previous
+        position and is caught up by the next refresh. When max_pages stops a
+        read before the previous refresh's position, the unread pages are
+        remembered and read by the following refreshes.
+
+        Args:
+            now: Reference time for dropping expired days (current time if None)
+
+        Returns:
+            Number of newly counted events
+        """
+        first_day = self._today(now) - self.windows[-1] + 1
+        feeds = [(goal, source) for goal in list(self.goals) for source in self.sources]
+        added = 0
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(feeds) or 1))) as executor:
+            futures = {executor.submit(self._read_feed, goal, source, first_day): (goal, source) for goal, source in feeds}
+            for future in as_completed(futures):
+                goal, source = futures[future]
+                try:
+                    events, head, gaps = future.result()
+                except Exception as e:
+                    logger.warning(f"Failed to refresh {source} feed of {goal}: {e}")
+                    continue
+                added += self.add_events(goal, events, now)
+                self._heads[(goal, source)] = head
+                self._gaps[(goal, source)] = gaps
+        return added
+
+    def add_events(self, goal: str, events: Iterable[Dict[str, Any]], now: Optional[datetime] = None) -> int:
+        """
+        Count events of a study goal, skipping ones already counted.
+
+        Args:
+            goal: Study goal id
+            events: Timeline feed items
+            now: Reference time for dropping expired days (current time if None)
+
+        Returns:
+            Number of newly counted events
+        """
+        first_day = self._today(now) - self.windows[-1] + 1
+        added = 0
+        with self._lock:
+            rollup = self._goal_rollups.setdefault(goal, _Rollup())
+            if goal not in self.goals:
+                self.goals.append(goal)
+            for event in events:
+                day = self._event_day(event)
+                key = (goal, event_key(event))
+                if day is None or day < first_day or key in self._counted:
+                    continue
+                self._counted.add(key)
+                self._counted_by_day.setdefault(day, []).append(key)
+                duration = int(get_event_field(event, "duration") or 0)
+                user = get_event_field(event, "user_id", "username")
+                rollup.add(day, duration, user)
+                material = get_event_field(event, "material_code", "material_title")
+                if material is not None:
+                    self._material_rollups.setdefault((goal, str(material)), _Rollup()).add(day, duration, user)
+                added += 1
+            self._prune(first_day)
+        return added
+
+    def _prune(self, first_day: int) -> None:
+        for day in [day for day in self._counted_by_day if day < first_day]:
+            self._counted.difference_update(self._counted_by_day.pop(day))
+        for rollup in self._goal_rollups.values():
+            rollup.prune(first_day)
+        for key in list(self._material_rollups):
+            rollup = self._material_rollups[key]
+            rollup.prune(first_day)
+            if not rollup.events:
+                del self._material_rollups[key]
+
+    def goal_summary(self, goal: str, now: Optional[datetime] = None) -> Dict[int, Dict[str, int]]:
+        """
+        Get the activity of a study goal over each window.
+
+        Args:
+            goal: Study goal id
+            now: End of the windows (current time if None)
+
+        Returns:
+            Dictionary mapping window days to duration (seconds), events and active_users
+        """
+        today = self._today(now)
+        with self._lock:
+            rollup = self._goal_rollups.get(goal) or _Rollup()
+            return {window: rollup.summary(today, window) for window in self.windows}
+
+    def material_summary(self, goal: str, material: str, now: Optional[datetime] = None) -> Dict[int, Dict[str, int]]:
+        """
+        Get the activity on one material within a study goal over each window.
+
+        Args:
+            goal: Study goal id
+            material: Material code
+            now: End of the windows (current time if None)
+
+        Returns:
+            Dictionary mapping window days to duration (seconds), events and active_users
+        """
+        today = self._today(now)
+        with self._lock:
+            rollup = self._material_rollups.get((goal, material)) or _Rollup()
+            return {window: rollup.summary(today, window) for window in self.windows}
+
+    def top_materials(
+        self, goal: str, window: int = 7, k: int = 10, now: Optional[datetime] = None
+    ) -> List[Tuple[str, int]]:
+        """
+        Get the materials studied longest within a study goal.
+
+        Args:
+            goal: Study goal id
+            window: Window length in days
+            k: Number of materials returned
+            now: End of the window (current time if None)
+
+        Returns:
+            List of (material code, duration in seconds), longest first
+        """
+        today = self._today(now)
+        days = range(today - window + 1, today + 1)
+        with self._lock:
+            totals = [
+                (material, sum(rollup.durations.get(day, 0) for day in days))
+                for (rollup_goal, material), rollup in self._material_rollups.items()
+                if rollup_goal == goal
+            ]
+        totals = [item for item in totals if item[1] > 0]
+        totals.sort(key=lambda item: (-item[1], item[0]))
+        return totals[:k]
+
+    def dashboard(self, now: Optional[datetime] = None) -> Dict[str, Dict[int, Dict[str, int]]]:
+        """
+        Get the window summaries of every aggregated goal.
+
+        Args:
+            now: End of the windows (current time if None)
+
+        Returns:
+            Dictionary mapping goal ids to goal_summary results
+        """
+        return {goal: self.goal_summary(goal, now) for goal in list(self.goals)}
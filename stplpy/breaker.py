@@ -0,0 +1,200 @@
+"""
+Circuit breakers for Stplpy library.
+
+A breaker tracks the outcome of the most recent calls to one endpoint
+family. When the share of failed (or too slow) calls crosses a threshold it
+opens and rejects calls immediately with CircuitOpenError instead of letting
+them wait for a network timeout. After `open_duration` it lets a few probe
+calls through and closes again if they succeed.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from .exceptions import CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+StateListener = Callable[[str, str, str], None]
+
+
+class CircuitBreaker:
+    """Thread-safe circuit breaker over a sliding window of recent calls."""
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate_threshold: float = 0.5,
+        slow_call_threshold: Optional[float] = None,
+        window_size: int = 50,
+        minimum_calls: int = 20,
+        open_duration: float = 30.0,
+        half_open_max_calls: int = 3
+    ):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_threshold = slow_call_threshold
+        self.window_size = window_size
+        self.minimum_calls = minimum_calls
+        self.open_duration = open_duration
+        self.half_open_max_calls = half_open_max_calls
+
+        self.state = CLOSED
+        self.opened_at: Optional[float] = None
+        self.rejected = 0
+        self._window: Deque[bool] = deque(maxlen=window_size)
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self._listeners: List[StateListener] = []
+        self._lock = threading.Lock()
+
+    def add_listener(self, listener: StateListener) -> None:
+        """
+        Register a callback for state changes.
+
+        Listeners run after the breaker's lock is released, so they may call
+        snapshot() or make requests; exceptions they raise are logged.
+
+        Args:
+            listener: Called with (breaker name, old state, new state)
+        """
+        self._listeners.append(listener)
+
+    def _transition(self, state: str, changes: List[Tuple[str, str]]) -> None:
+        changes.append((self.state, state))
+        self.state = state
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+        if state != HALF_OPEN:
+            self._probes_in_flight = 0
+            self._probe_successes = 0
+        if state == CLOSED:
+            self._window.clear()
+
+    def _notify(self, changes: List[Tuple[str, str]]) -> None:
+        for old, new in changes:
+            for listener in list(self._listeners):
+                try:
+                    listener(self.name, old, new)
+                except Exception as e:
+                    logger.warning(f"Circuit breaker listener failed for '{self.name}': {e}")
+
+    def before_request(self) -> None:
+        """
+        Admit or reject a call.
+
+        Raises:
+            CircuitOpenError: If the breaker is open, or half-open with all probes in flight
+        """
+        changes: List[Tuple[str, str]] = []
+        try:
+            with self._lock:
+                if self.state == OPEN:
+                    remaining = self.opened_at + self.open_duration - time.monotonic()
+                    if remaining > 0:
+                        self.rejected += 1
+                        raise CircuitOpenError(
+                            f"Circuit breaker '{self.name}' is open", self.name, remaining
+                        )
+                    self._transition(HALF_OPEN, changes)
+                if self.state == HALF_OPEN:
+                    if self._probes_in_flight >= self.half_open_max_calls:
+                        self.rejected += 1
+                        raise CircuitOpenError(
+                            f"Circuit breaker '{self.name}' is probing", self.name, 1.0
+                        )
+                    self._probes_in_flight += 1
+        finally:
+            self._notify(changes)
+
+    def record(self, success: bool, latency: float) -> None:
+        """
+        Record the outcome of an admitted call.
+
+        Args:
+            success: Whether the call succeeded
+            latency: Call duration in seconds (slow calls count as failures)
+        """
+        failed = not success or (
+            self.slow_call_threshold is not None and latency > self.slow_call_threshold
+        )
+        changes: List[Tuple[str, str]] = []
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                if failed:
+                    self._transition(OPEN, changes)
+                else:
+                    self._probe_successes += 1
+                    if self._probe_successes >= self.half_open_max_calls:
+                        self._transition(CLOSED, changes)
+            else:
+                self._window.append(failed)
+                if self.state == CLOSED and len(self._window) >= self.minimum_calls:
+                    if sum(self._window) / len(self._window) >= self.failure_rate_threshold:
+                        self._transition(OPEN, changes)
+        self._notify(changes)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Get the observable breaker state.
+
+        Returns:
+            Dictionary with state, failure_rate, calls, rejected and retry_after
+        """
+        with self._lock:
+            calls = len(self._window)
+            retry_after = 0.0
+            if self.state == OPEN:
+                retry_after = max(0.0, self.opened_at + self.open_duration - time.monotonic())
+            return {
+                "state": self.state,
+                "failure_rate": sum(self._window) / calls if calls else 0.0,
+                "calls": calls,
+                "rejected": self.rejected,
+                "retry_after": retry_after,
+            }
+
+
+class CircuitBreakers:
+    """Registry creating one CircuitBreaker per endpoint family on first use."""
+
+    def __init__(self, **breaker_options: Any):
+        self.breaker_options = breaker_options
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._listeners: List[StateListener] = []
+        self._lock = threading.Lock()
+
+    def get(self, family: str) -> CircuitBreaker:
+        breaker = self._breakers.get(family)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.get(family)
+                if breaker is None:
+                    breaker = CircuitBreaker(family, **self.breaker_options)
+                    for listener in self._listeners:
+                        breaker.add_listener(listener)
+                    self._breakers[family] = breaker
+        return breaker
+
+    def add_listener(self, listener: StateListener) -> None:
+        """Register a state-change callback on every current and future breaker."""
+        with self._lock:
+            self._listeners.append(listener)
+            for breaker in self._breakers.values():
+                breaker.add_listener(listener)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the state of every breaker.
+
+        Returns:
+            Dictionary mapping endpoint families to CircuitBreaker.snapshot() results
+        """
+        return {family: breaker.snapshot() for family, breaker in list(self._breakers.items())}
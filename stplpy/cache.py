@@ -0,0 +1,259 @@
+"""
+Caches for Stplpy library.
+
+MemoryCache is a per-process TTL/LRU cache. SQLiteCache stores entries in a
+WAL-mode SQLite file that several processes on one host can share, fronted
+by a short-lived MemoryCache so repeated lookups stay in-process.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Optional, Protocol, Tuple
+
+from .memory import estimate_size
+
+if TYPE_CHECKING:
+    from .memory import MemoryBudget
+
+DEFAULT_TTL = 300.0
+
+
+class Cache(Protocol):
+    """Interface of the cache backends accepted by User."""
+
+    def get(self, key: str) -> Optional[Any]: ...
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None: ...
+
+    def delete(self, key: str) -> None: ...
+
+
+class MemoryCache:
+    """
+    Thread-safe in-process cache with per-entry TTL and LRU eviction.
+
+    Args:
+        ttl: Default seconds until an entry expires
+        max_entries: Entries kept at most
+        budget: Memory budget the cache registers with; least recently used
+            entries are evicted when the budget is exceeded
+        budget_name: Name of the cache in the budget's usage report
+    """
+
+    def __init__(
+        self,
+        ttl: float = DEFAULT_TTL,
+        max_entries: int = 10000,
+        budget: Optional["MemoryBudget"] = None,
+        budget_name: str = "cache"
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.budget: Optional["MemoryBudget"] = None
+        self._entries: "OrderedDict[str, Tuple[float, Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        if budget is not None:
+            self.attach_budget(budget, budget_name)
+
+    def attach_budget(self, budget: "MemoryBudget", name: str = "cache") -> None:
+        """
+        Register the cache with a memory budget.
+
+        Args:
+            budget: Budget that may evict entries when exceeded
+            name: Name of the cache in the budget's usage report
+        """
+        budget.register(name, self)
+        self.budget = budget
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Get a cached value.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            The cached value, or None if missing or expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                self._pop(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Store a value.
+
+        Args:
+            key: Cache key
+            value: Value to store
+            ttl: Seconds until the entry expires (defaults to the cache TTL)
+        """
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        size = estimate_size(key) + estimate_size(value)
+        with self._lock:
+            self._pop(key)
+            self._entries[key] = (expires, value, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries:
+                self._pop(next(iter(self._entries)))
+        if self.budget is not None:
+            self.budget.enforce()
+
+    def _pop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._pop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def memory_bytes(self) -> int:
+        """Approximate bytes held by the entries."""
+        return self._bytes
+
+    def shrink(self, nbytes: int) -> int:
+        """
+        Evict least recently used entries.
+
+        Args:
+            nbytes: Bytes to free
+
+        Returns:
+            Bytes freed
+        """
+        freed = 0
+        with self._lock:
+            while self._entries and freed < nbytes:
+                key = next(iter(self._entries))
+                freed += self._entries[key][2]
+                self._pop(key)
+        return freed
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCache:
+    """
+    Cross-process cache backed by a WAL-mode SQLite file.
+
+    Hits are served from an in-process MemoryCache for up to `local_ttl`
+    seconds, so another process's writes become visible within that delay.
+    Connections are opened per thread and re-opened after os.fork.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl: float = DEFAULT_TTL,
+        local_ttl: float = 1.0,
+        local_max_entries: int = 10000,
+        purge_every: int = 1000
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.local = MemoryCache(local_ttl, local_max_entries) if local_ttl > 0 else None
+        self.purge_every = purge_every
+        self._writes = 0
+        self._state = threading.local()
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._state, "conn", None)
+        if conn is None or self._state.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._state.conn = conn
+            self._state.pid = os.getpid()
+        return conn
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Get a cached value.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            The cached value, or None if missing or expired
+        """
+        if self.local is not None:
+            value = self.local.get(key)
+            if value is not None:
+                return value
+        row = self._connection().execute(
+            "SELECT value, expires FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        if row[1] < now:
+            return None
+        value = json.loads(row[0])
+        if self.local is not None:
+            self.local.set(key, value, min(self.local.ttl, row[1] - now))
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Store a value.
+
+        Args:
+            key: Cache key
+            value: JSON-serializable value to store
+            ttl: Seconds until the entry expires (defaults to the cache TTL)
+        """
+        ttl = self.ttl if ttl is None else ttl
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time() + ttl)
+            )
+        if self.local is not None:
+            self.local.set(key, value, min(self.local.ttl, ttl))
+        self._writes += 1
+        if self._writes % self.purge_every == 0:
+            self.purge_expired()
+
+    def delete(self, key: str) -> None:
+        with self._connection() as conn:
+            conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+        if self.local is not None:
+            self.local.delete(key)
+
+    def clear(self) -> None:
+        with self._connection() as conn:
+            conn.execute("DELETE FROM cache")
+        if self.local is not None:
+            self.local.clear()
+
+    def purge_expired(self) -> int:
+        """
+        Delete expired entries from the database.
+
+        Returns:
+            Number of deleted entries
+        """
+        with self._connection() as conn:
+            return conn.execute("DELETE FROM cache WHERE expires < ?", (time.time(),)).rowcount
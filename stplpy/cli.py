@@ -0,0 +1,322 @@
+"""
+Command-line crawler for Stplpy library.
+
+Examples:
+    stplpy timeline followee --limit 10 -o feed.ndjson
+    stplpy timeline user USER_ID OTHER_ID --prefetch 2 -o users.ndjson
+    stplpy followers USER_ID --format parquet -o followers.parquet
+    stplpy followees USER_ID --checkpoint job.json -o followees.ndjson
+
+Every exported item gets a `_source` field naming the crawl it came from
+(e.g. "followers:USER_ID"). Progress and throughput are reported on stderr.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, TextIO
+
+from . import StudyPlus
+from .cache import Cache, SQLiteCache
+from .ratelimit import RateLimiter
+from .scheduler import RequestScheduler
+from .transport import Transport
+
+TIMELINE_KINDS = ("followee", "user", "goal", "achievement")
+
+
+class CrawlProgress:
+    """Counters and throughput of a running crawl."""
+
+    def __init__(self) -> None:
+        self.items = 0
+        self.pages = 0
+        self.failed = 0
+        self.per_source: Dict[str, Dict[str, int]] = {}
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def add(self, source: str, items: int) -> None:
+        with self._lock:
+            self.items += items
+            self.pages += 1
+            counts = self.per_source.setdefault(source, {"items": 0, "pages": 0})
+            counts["items"] += items
+            counts["pages"] += 1
+
+    def fail(self) -> None:
+        with self._lock:
+            self.failed += 1
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    @property
+    def items_per_second(self) -> float:
+        return self.items / self.elapsed if self.elapsed > 0 else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.items} items, {self.pages} pages, {self.failed} failed sources "
+            f"in {self.elapsed:.1f}s, {self.items_per_second:.1f} items/s"
+        )
+
+
+class _Checkpoint:
+    """Per-source crawl positions, rewritten atomically after every page."""
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.sources: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.sources = json.load(f)["sources"]
+
+    def get(self, source: str) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.sources.get(source, {}))
+
+    def update(self, source: str, **state: Any) -> None:
+        with self._lock:
+            self.sources.setdefault(source, {}).update(state)
+            if not self.path:
+                return
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump({"sources": self.sources}, f)
+            os.replace(temp_path, self.path)
+
+
+class _NDJSONWriter:
+    def __init__(self, path: Optional[str], append: bool):
+        self._file: TextIO = open(path, "a" if append else "w", encoding="utf-8") if path else sys.stdout
+        self._lock = threading.Lock()
+
+    def write(self, rows: List[Dict[str, Any]]) -> None:
+        lines = "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows)
+        with self._lock:
+            self._file.write(lines)
+            self._file.flush()
+
+    def close(self) -> None:
+        if self._file is not sys.stdout:
+            self._file.close()
+
+
+class _ParquetWriter:
+    """Collects rows and writes one Parquet file on close (items vary in shape, so the schema is inferred once)."""
+
+    def __init__(self, path: str):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ImportError("Parquet export requires pyarrow. Install it with: pip install stplpy[parquet]")
+        self.path = path
+        self._rows: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def write(self, rows: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            self._rows.extend(rows)
+
+    def close(self) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        pq.write_table(pa.Table.from_pylist(self._rows), self.path)
+
+
+def _cached(cache: Optional[Cache], key: str, ttl: float, fetch: Callable[[], Any]) -> Any:
+    if cache is None:
+        return fetch()
+    value = cache.get(key)
+    if value is None:
+        value = fetch()
+        if value is not None:
+            cache.set(key, value, ttl)
+    return value
+
+
+def _crawl_timeline(client: StudyPlus, kind: str, target: Optional[str], args: argparse.Namespace,
+                    writer: Any, checkpoint: _Checkpoint, progress: CrawlProgress, cache: Optional[Cache]) -> None:
+    source = f"timeline:{kind}" + (f":{target}" if target else "")
+    state = checkpoint.get(source)
+    if state.get("done"):
+        return
+    getters = {
+        "followee": lambda until: client.timeline.get_followee_timeline(until),
+        "user": lambda until: client.timeline.get_user_timeline(target, until),
+        "goal": lambda until: client.timeline.get_goal_timeline(target, until),
+        "achievement": lambda until: client.timeline.get_achievement_timeline(target, until),
+    }
+    get_page = getters[kind]
+
+    def fetch(until: Optional[str]) -> Dict[str, Any]:
+        return _cached(cache, f"page:{source}:{until}", args.cache_ttl, lambda: get_page(until))
+
+    pages_done = state.get("pages", 0)
+    limit = None if args.limit is None else max(0, args.limit - pages_done)
+    for result in client.timeline.iter_pages(fetch, limit, until=state.get("cursor"), prefetch=args.prefetch):
+        writer.write([dict(feed, _source=source) for feed in result["feeds"]])
+        progress.add(source, len(result["feeds"]))
+        pages_done += 1
+        checkpoint.update(source, cursor=result.get("next"), pages=pages_done, done=not result.get("next"))
+
+
+def _crawl_users(client: StudyPlus, relation: str, target: str, args: argparse.Namespace,
+                 writer: Any, checkpoint: _Checkpoint, progress: CrawlProgress, cache: Optional[Cache]) -> None:
+    source = f"{relation}s:{target}"
+    state = checkpoint.get(source)
+    if state.get("done"):
+        return
+    iterate = client.user.iter_followers if relation == "follower" else client.user.iter_followees
+    page = state.get("page", 1)
+    remaining = None if args.limit is None else max(0, args.limit - page + 1)
+    if remaining == 0:
+        return
+
+    # Iterate unbounded (so a failed page raises instead of being skipped) and
+    # stop after the remaining pages ourselves.
+    fetched = 0
+    for users in iterate(target, start_page=page, prefetch=args.prefetch):
+        writer.write([dict(user, _source=source) for user in users])
+        progress.add(source, len(users))
+        fetched += 1
+        checkpoint.update(source, page=page + fetched)
+        if fetched == remaining:
+            return
+    checkpoint.update(source, page=page + fetched, done=True)
+
+
+def _report_progress(progress: CrawlProgress, interval: float, stop: threading.Event) -> None:
+    while not stop.wait(interval):
+        print(f"[stplpy] {progress}", file=sys.stderr, flush=True)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the argument parser of the stplpy command."""
+    parser = argparse.ArgumentParser(prog="stplpy", description="Crawl StudyPlus timelines and follow lists.")
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("-o", "--output", help="Output file (NDJSON to stdout if omitted)")
+    common.add_argument("--format", choices=("ndjson", "parquet"), help="Output format (default: from the output file extension)")
+    common.add_argument("--token", default=None, help="OAuth token (default: TOKEN environment variable or .env)")
+    common.add_argument("--limit", type=int, default=None, help="Maximum pages per source (all pages if omitted)")
+    common.add_argument("--concurrency", type=int, default=4, help="Maximum requests in flight and sources crawled in parallel")
+    common.add_argument("--prefetch", type=int, default=1, help="Pages requested ahead of the writer per source")
+    common.add_argument("--rate-limit", type=float, default=None, help="Maximum requests per second")
+    common.add_argument("--cache-dir", default=None, help="Directory of a timeline page cache shared between runs")
+    common.add_argument("--cache-ttl", type=float, default=3600.0, help="Seconds a cached page stays valid")
+    common.add_argument("--checkpoint", default=None, help="Checkpoint file to resume an interrupted crawl")
+    common.add_argument("--metrics", default=None, help="Write crawl, scheduler, circuit breaker and transfer metrics as JSON")
+    common.add_argument("--progress-interval", type=float, default=5.0, help="Seconds between progress lines (0 disables)")
+
+    commands = parser.add_subparsers(dest="command", required=True)
+    timeline = commands.add_parser("timeline", parents=[common], help="Crawl timeline feeds")
+    timeline.add_argument("kind", choices=TIMELINE_KINDS)
+    timeline.add_argument("targets", nargs="*", help="User ids, goal ids or achievement goal ids")
+    for relation in ("followers", "followees"):
+        users = commands.add_parser(relation, parents=[common], help=f"Crawl the {relation} of users")
+        users.add_argument("targets", nargs="+", help="User ids")
+    return parser
+
+
+def _load_token(token: Optional[str]) -> Optional[str]:
+    if token:
+        return token
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
+    return os.environ.get("TOKEN")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Run the stplpy command.
+
+    Args:
+        argv: Command-line arguments (sys.argv[1:] if omitted)
+
+    Returns:
+        Exit status
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    output_format = args.format or ("parquet" if (args.output or "").endswith(".parquet") else "ndjson")
+    if output_format == "parquet" and not args.output:
+        parser.error("--format parquet requires --output")
+    if output_format == "parquet" and args.checkpoint:
+        parser.error("--checkpoint requires NDJSON output (Parquet files cannot be appended to)")
+    if args.command == "timeline" and args.kind in ("user", "goal") and not args.targets:
+        parser.error(f"timeline {args.kind} requires at least one target")
+    if args.concurrency < 1 or args.prefetch < 0:
+        parser.error("--concurrency must be at least 1 and --prefetch at least 0")
+    token = _load_token(args.token)
+    if not token:
+        parser.error("no token given (use --token or set TOKEN)")
+
+    cache = None
+    if args.cache_dir:
+        os.makedirs(args.cache_dir, exist_ok=True)
+        cache = SQLiteCache(os.path.join(args.cache_dir, "pages.sqlite"), ttl=args.cache_ttl)
+    transport = Transport(
+        rate_limiter=RateLimiter(args.rate_limit) if args.rate_limit else None,
+        scheduler=RequestScheduler(slots=args.concurrency),
+        pool_maxsize=max(16, args.concurrency * (args.prefetch + 1))
+    )
+    client = StudyPlus(token, transport=transport)
+    checkpoint = _Checkpoint(args.checkpoint)
+    resuming = bool(checkpoint.sources)
+    writer = _ParquetWriter(args.output) if output_format == "parquet" else _NDJSONWriter(args.output, append=resuming)
+
+    if args.command == "timeline":
+        jobs = [(_crawl_timeline, args.kind, target) for target in (args.targets or [None])]
+    else:
+        jobs = [(_crawl_users, args.command[:-1], target) for target in args.targets]
+
+    progress = CrawlProgress()
+    stop = threading.Event()
+    if args.progress_interval > 0:
+        threading.Thread(target=_report_progress, args=(progress, args.progress_interval, stop), daemon=True).start()
+
+    def run(job: Any) -> None:
+        crawl, kind, target = job
+        try:
+            crawl(client, kind, target, args, writer, checkpoint, progress, cache)
+        except Exception as e:
+            progress.fail()
+            print(f"[stplpy] {kind} {target or ''}: {e}", file=sys.stderr, flush=True)
+
+    try:
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            list(executor.map(run, jobs))
+    finally:
+        stop.set()
+        writer.close()
+    print(f"[stplpy] done: {progress}", file=sys.stderr, flush=True)
+
+    if args.metrics:
+        metrics = {
+            "elapsed": progress.elapsed,
+            "items": progress.items,
+            "pages": progress.pages,
+            "failed_sources": progress.failed,
+            "items_per_second": progress.items_per_second,
+            "sources": progress.per_source,
+            "scheduler": transport.scheduler.metrics() if transport.scheduler else {},
+            "circuit_breakers": transport.breakers.snapshot() if transport.breakers else {},
+            "transfers": transport.transfers.snapshot(),
+        }
+        with open(args.metrics, "w", encoding="utf-8") as f:
+            json.dump(metrics, f, indent=2)
+    return 1 if progress.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
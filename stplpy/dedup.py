@@ -0,0 +1,214 @@
+"""
+Deduplication of timeline events for Stplpy library.
+
+Overlapping feeds and cursor pages shifting under concurrent posts yield the
+same event more than once. The dedupers here drop repeats within a fixed
+memory budget: WindowDeduper remembers the most recent keys exactly, and
+BloomDeduper uses rotating Bloom filters for a much larger approximate
+window (with a small, configurable false-positive rate).
+"""
+import hashlib
+import json
+import math
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Union
+
+from .utils import get_event_id
+
+KeyFunction = Callable[[Dict[str, Any]], str]
+
+
+def event_key(event: Dict[str, Any]) -> str:
+    """
+    Get the deduplication key of an event.
+
+    Args:
+        event: Timeline feed item
+
+    Returns:
+        The event id, or a hash of the event content if it has none
+    """
+    event_id = get_event_id(event)
+    if event_id is not None:
+        return event_id
+    content = json.dumps(event, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+
+class _Deduper(ABC):
+    def __init__(self) -> None:
+        self.checked = 0
+        self.duplicates = 0
+
+    @property
+    def dedup_ratio(self) -> float:
+        """Share of checked events that were dropped as duplicates."""
+        return self.duplicates / self.checked if self.checked else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get deduplication counters.
+
+        Returns:
+            Dictionary with checked, duplicates, dedup_ratio and memory_bytes
+        """
+        return {
+            "checked": self.checked,
+            "duplicates": self.duplicates,
+            "dedup_ratio": self.dedup_ratio,
+            "memory_bytes": self.memory_bytes(),
+        }
+
+    @abstractmethod
+    def seen(self, key: str) -> bool:
+        """Check a key and remember it; return True if it is a duplicate."""
+
+    @abstractmethod
+    def memory_bytes(self) -> int:
+        """Approximate memory held by the remembered keys."""
+
+
+class WindowDeduper(_Deduper):
+    """
+    Exact deduplication over the most recently seen `window` keys.
+
+    Args:
+        window: Number of keys remembered
+        memory_bytes: Approximate memory budget; overrides window when given
+    """
+
+    # Approximate cost of one remembered key (dict slot, link and 32-char string).
+    _BYTES_PER_KEY = 200
+
+    def __init__(self, window: int = 100000, memory_bytes: Optional[int] = None):
+        super().__init__()
+        if memory_bytes is not None:
+            window = max(1, memory_bytes // self._BYTES_PER_KEY)
+        self.window = window
+        self._keys: "OrderedDict[str, None]" = OrderedDict()
+
+    def seen(self, key: str) -> bool:
+        """
+        Check a key and remember it.
+
+        Args:
+            key: Deduplication key
+
+        Returns:
+            True if the key is a duplicate
+        """
+        self.checked += 1
+        if key in self._keys:
+            self._keys.move_to_end(key)
+            self.duplicates += 1
+            return True
+        self._keys[key] = None
+        if len(self._keys) > self.window:
+            self._keys.popitem(last=False)
+        return False
+
+    def memory_bytes(self) -> int:
+        return len(self._keys) * self._BYTES_PER_KEY
+
+    def shrink(self, nbytes: int) -> int:
+        """Forget the oldest keys to free about nbytes; return the bytes freed."""
+        count = min(len(self._keys), -(-nbytes // self._BYTES_PER_KEY))
+        for _ in range(count):
+            self._keys.popitem(last=False)
+        return count * self._BYTES_PER_KEY
+
+
+class BloomDeduper(_Deduper):
+    """
+    Approximate deduplication with two rotating Bloom filters.
+
+    Keys are added to the current filter and looked up in both. Once the
+    current filter holds `capacity` keys it becomes the previous one and a
+    fresh filter starts, so memory stays fixed while the last `capacity` to
+    2 * `capacity` keys are remembered. A new key is wrongly reported as a
+    duplicate with probability of about 2 * `error_rate`.
+
+    Args:
+        capacity: Keys per filter generation
+        error_rate: Target false-positive rate per filter
+        memory_bytes: Total memory budget; overrides capacity when given
+    """
+
+    def __init__(self, capacity: int = 1000000, error_rate: float = 0.001, memory_bytes: Optional[int] = None):
+        super().__init__()
+        bits_per_key = -math.log(error_rate) / (math.log(2) ** 2)
+        if memory_bytes is not None:
+            capacity = max(1, int(memory_bytes * 8 / 2 / bits_per_key))
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(capacity * bits_per_key))
+        self.num_hashes = max(1, round(bits_per_key * math.log(2)))
+        self._current = bytearray((self.num_bits + 7) // 8)
+        self._previous = bytearray(len(self._current))
+        self._count = 0
+
+    def _positions(self, key: str) -> Iterator[int]:
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    @staticmethod
+    def _contains(bits: bytearray, positions: Iterable[int]) -> bool:
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in positions)
+
+    def seen(self, key: str) -> bool:
+        """
+        Check a key and remember it.
+
+        Args:
+            key: Deduplication key
+
+        Returns:
+            True if the key is (probably) a duplicate
+        """
+        self.checked += 1
+        positions = list(self._positions(key))
+        if self._contains(self._current, positions):
+            self.duplicates += 1
+            return True
+        if self._contains(self._previous, positions):
+            self.duplicates += 1
+            duplicate = True
+        else:
+            duplicate = False
+        for p in positions:
+            self._current[p >> 3] |= 1 << (p & 7)
+        self._count += 1
+        if self._count >= self.capacity:
+            self._previous, self._current = self._current, bytearray(len(self._current))
+            self._count = 0
+        return duplicate
+
+    def memory_bytes(self) -> int:
+        return len(self._current) + len(self._previous)
+
+
+def dedup(
+    events: Iterable[Dict[str, Any]],
+    deduper: Optional[Union[WindowDeduper, BloomDeduper]] = None,
+    key: KeyFunction = event_key
+) -> Iterator[Dict[str, Any]]:
+    """
+    Drop repeated events from a timeline iterator.
+
+    Args:
+        events: Timeline feed items, e.g. from Timeline.iter_followee_timelines
+        deduper: WindowDeduper or BloomDeduper (a default WindowDeduper if omitted);
+            pass the same instance to several calls to dedup across feeds
+        key: Function computing the deduplication key of an event
+
+    Returns:
+        Iterator over events not seen before
+    """
+    deduper = deduper if deduper is not None else WindowDeduper()
+    for event in events:
+        if not deduper.seen(key(event)):
+            yield event
@@ -0,0 +1,294 @@
+"""
+Indexed in-memory event store for Stplpy library.
+
+EventStore keeps crawled timeline events in compact columns (interned
+strings and typed arrays) with hash indexes on user and material and a
+sorted index on record time, so point and range queries avoid scanning
+every event. A store can be saved to and loaded from a compressed binary
+snapshot.
+"""
+import bisect
+import logging
+import struct
+import sys
+import zlib
+from array import array
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from .utils import get_event_field, get_event_id, parse_iso_datetime
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b"STPLEVS2"
+# Snapshots before version 2 stored strings NUL-joined instead of length-prefixed.
+_MAGIC_V1 = b"STPLEVS1"
+
+# Durations are stored as unsigned 32-bit seconds.
+_MAX_DURATION = 2 ** 32 - 1
+
+TimeValue = Union[str, float, int, datetime]
+
+
+def _to_timestamp(value: TimeValue) -> float:
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+    if isinstance(value, str):
+        return _to_timestamp(parse_iso_datetime(value))
+    return float(value)
+
+
+class EventStore:
+    """
+    Columnar store of timeline events.
+
+    Each event keeps its event id, feed type, user id, material code, record
+    time and duration. String values are interned once and referenced by
+    32-bit ids, so an event costs a few dozen bytes plus its unique strings.
+    """
+
+    def __init__(self) -> None:
+        self._strings: List[str] = [""]
+        self._string_ids: Dict[str, int] = {"": 0}
+        self._event_col = array("I")
+        self._type_col = array("I")
+        self._user_col = array("I")
+        self._material_col = array("I")
+        self._time_col = array("d")
+        self._duration_col = array("I")
+        self._rows_by_event: Dict[int, int] = {}
+        self._rows_by_user: Dict[int, array] = {}
+        self._rows_by_material: Dict[int, array] = {}
+        self._sorted_times = array("d")
+        self._sorted_rows = array("I")
+        self._time_index_dirty = False
+
+    def _intern(self, value: Optional[Any]) -> int:
+        if value is None:
+            return 0
+        value = str(value)
+        string_id = self._string_ids.get(value)
+        if string_id is None:
+            string_id = len(self._strings)
+            self._strings.append(value)
+            self._string_ids[value] = string_id
+        return string_id
+
+    def _index_row(self, row: int) -> None:
+        self._rows_by_event[self._event_col[row]] = row
+        self._rows_by_user.setdefault(self._user_col[row], array("I")).append(row)
+        self._rows_by_material.setdefault(self._material_col[row], array("I")).append(row)
+        self._time_index_dirty = True
+
+    def add(self, feed: Dict[str, Any]) -> bool:
+        """
+        Add a timeline event.
+
+        Args:
+            feed: Timeline feed item
+
+        Durations outside 0 to 2^32 - 1 seconds are clamped to that range.
+
+        Returns:
+            True if the event was added, False if it has no id, is already
+            stored or has a malformed record time or duration
+        """
+        event_id = get_event_id(feed)
+        if event_id is None or self._string_ids.get(event_id, 0) in self._rows_by_event:
+            return False
+        record_time = get_event_field(feed, "record_datetime", "posted_at", "created_at")
+        try:
+            timestamp = _to_timestamp(record_time) if record_time else 0.0
+            duration = min(max(int(get_event_field(feed, "duration") or 0), 0), _MAX_DURATION)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Skipping malformed event {event_id}: {e}")
+            return False
+
+        row = len(self._event_col)
+        self._event_col.append(self._intern(event_id))
+        self._type_col.append(self._intern(feed.get("feed_type")))
+        self._user_col.append(self._intern(get_event_field(feed, "user_id", "username")))
+        self._material_col.append(self._intern(get_event_field(feed, "material_code")))
+        self._time_col.append(timestamp)
+        self._duration_col.append(duration)
+        self._index_row(row)
+        return True
+
+    def extend(self, feeds: Iterable[Dict[str, Any]]) -> int:
+        """
+        Add events from an iterable, e.g. Timeline.iter_user_timelines.
+
+        Args:
+            feeds: Timeline feed items
+
+        Returns:
+            Number of events added
+        """
+        return sum(1 for feed in feeds if self.add(feed))
+
+    def __len__(self) -> int:
+        return len(self._event_col)
+
+    # __________Queries__________
+    def _row(self, row: int) -> Dict[str, Any]:
+        timestamp = self._time_col[row]
+        return {
+            "event_id": self._strings[self._event_col[row]],
+            "feed_type": self._strings[self._type_col[row]] or None,
+            "user_id": self._strings[self._user_col[row]] or None,
+            "material_code": self._strings[self._material_col[row]] or None,
+            "record_datetime": datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ") if timestamp else None,
+            "duration": self._duration_col[row],
+        }
+
+    def _time_range_rows(self, start: Optional[TimeValue], end: Optional[TimeValue]) -> array:
+        if self._time_index_dirty:
+            order = sorted(range(len(self._time_col)), key=self._time_col.__getitem__)
+            self._sorted_rows = array("I", order)
+            self._sorted_times = array("d", (self._time_col[row] for row in order))
+            self._time_index_dirty = False
+        low = 0 if start is None else bisect.bisect_left(self._sorted_times, _to_timestamp(start))
+        high = len(self._sorted_times) if end is None else bisect.bisect_left(self._sorted_times, _to_timestamp(end))
+        return self._sorted_rows[low:high]
+
+    def get(self, event_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get one event by id.
+
+        Returns:
+            The stored event, or None if unknown
+        """
+        row = self._rows_by_event.get(self._string_ids.get(str(event_id), 0))
+        return None if row is None else self._row(row)
+
+    def query(
+        self,
+        user_id: Optional[str] = None,
+        material_code: Optional[str] = None,
+        start: Optional[TimeValue] = None,
+        end: Optional[TimeValue] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Find events matching all given criteria.
+
+        The smallest candidate set among the user, material and time
+        indexes is scanned and filtered by the remaining criteria.
+
+        Args:
+            user_id: Only events of this user
+            material_code: Only events for this material
+            start: Only events recorded at or after this time (inclusive)
+            end: Only events recorded before this time (exclusive)
+
+        Returns:
+            Matching events ordered by record time
+        """
+        candidates = []
+        if user_id is not None:
+            candidates.append(self._rows_by_user.get(self._string_ids.get(str(user_id), -1), array("I")))
+        if material_code is not None:
+            candidates.append(self._rows_by_material.get(self._string_ids.get(str(material_code), -1), array("I")))
+        if start is not None or end is not None or not candidates:
+            candidates.append(self._time_range_rows(start, end))
+        rows = min(candidates, key=len)
+
+        user_key = None if user_id is None else self._string_ids.get(str(user_id))
+        material_key = None if material_code is None else self._string_ids.get(str(material_code))
+        low = None if start is None else _to_timestamp(start)
+        high = None if end is None else _to_timestamp(end)
+        matched = [
+            row for row in rows
+            if (user_key is None or self._user_col[row] == user_key)
+            and (material_key is None or self._material_col[row] == material_key)
+            and (low is None or self._time_col[row] >= low)
+            and (high is None or self._time_col[row] < high)
+        ]
+        matched.sort(key=self._time_col.__getitem__)
+        return [self._row(row) for row in matched]
+
+    def users(self) -> List[str]:
+        """Get the ids of all users with stored events."""
+        return [self._strings[key] for key in self._rows_by_user if key]
+
+    def materials(self) -> List[str]:
+        """Get the codes of all materials with stored events."""
+        return [self._strings[key] for key in self._rows_by_material if key]
+
+    # __________Snapshots__________
+    def save(self, path: str) -> None:
+        """
+        Write a compressed binary snapshot.
+
+        Args:
+            path: Output file path
+        """
+        encoded = [value.encode("utf-8") for value in self._strings]
+        lengths = array("I", (len(value) for value in encoded))
+        strings = b"".join(encoded)
+        columns = [lengths, self._event_col, self._type_col, self._user_col, self._material_col, self._time_col, self._duration_col]
+        parts = [struct.pack("<QQ", len(self._strings), len(self))]
+        parts.append(struct.pack("<Q", len(strings)))
+        parts.append(strings)
+        for column in columns:
+            if sys.byteorder == "big":
+                column = array(column.typecode, column)
+                column.byteswap()
+            parts.append(column.tobytes())
+        with open(path, "wb") as f:
+            f.write(_MAGIC)
+            f.write(zlib.compress(b"".join(parts), 6))
+
+    @classmethod
+    def load(cls, path: str) -> "EventStore":
+        """
+        Read a snapshot written by save.
+
+        Args:
+            path: Snapshot file path
+
+        Returns:
+            A new EventStore with its indexes rebuilt
+        """
+        with open(path, "rb") as f:
+            magic = f.read(len(_MAGIC))
+            if magic not in (_MAGIC, _MAGIC_V1):
+                raise ValueError(f"Not an event store snapshot: {path}")
+            data = zlib.decompress(f.read())
+
+        string_count, row_count = struct.unpack_from("<QQ", data, 0)
+        (strings_length,) = struct.unpack_from("<Q", data, 16)
+        offset = 24
+        strings = data[offset:offset + strings_length]
+        offset += strings_length
+
+        def read_column(typecode: str, count: int) -> array:
+            nonlocal offset
+            column = array(typecode)
+            size = count * column.itemsize
+            column.frombytes(data[offset:offset + size])
+            if sys.byteorder == "big":
+                column.byteswap()
+            offset += size
+            return column
+
+        store = cls()
+        if magic == _MAGIC_V1:
+            store._strings = strings.decode("utf-8").split("\0")
+        else:
+            store._strings = []
+            start = 0
+            for length in read_column("I", string_count):
+                store._strings.append(strings[start:start + length].decode("utf-8"))
+                start += length
+        if len(store._strings) != string_count:
+            raise ValueError(f"Corrupt event store snapshot: {path}")
+        store._string_ids = {value: index for index, value in enumerate(store._strings)}
+
+        for name in ("_event_col", "_type_col", "_user_col", "_material_col", "_time_col", "_duration_col"):
+            setattr(store, name, read_column(getattr(store, name).typecode, row_count))
+
+        for row in range(row_count):
+            store._index_row(row)
+        return store
@@ -34,3 +34,12 @@ class APIError(StudyPlusError):
     def __init__(self, message: str, status_code: int = None):
         super().__init__(message)
         self.status_code = status_code
+
+
+class CircuitOpenError(StudyPlusError):
+    """Raised when a request is rejected because its endpoint's circuit breaker is open."""
+
+    def __init__(self, message: str, family: str = None, retry_after: float = 0.0):
+        super().__init__(message)
+        self.family = family
+        self.retry_after = retry_after
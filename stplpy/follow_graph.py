@@ -0,0 +1,341 @@
+"""
+Follow graph snapshots for Stplpy library.
+
+FollowSnapshot holds the follower or followee ids of one user as a sorted
+id array (packed 64-bit integers when every id is numeric) plus the order
+in which the API listed them. Snapshots are saved as compressed binary
+files, compared with a linear merge, and refreshed incrementally: a refresh
+stops at the first page that lines up with the previous listing and reuses
+the rest of it.
+"""
+import bisect
+import os
+import re
+import struct
+import sys
+import time
+import zlib
+from array import array
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from .user import User
+
+_MAGIC = b"STPLFGS1"
+
+RELATIONS = ("follower", "followee")
+
+SortedIds = Union[array, List[str]]
+
+
+def _is_numeric_id(value: str) -> bool:
+    return value.isdigit() and (value == "0" or value[0] != "0") and int(value) < 2 ** 64
+
+
+def _sorted_ids(ids: Sequence[str]) -> SortedIds:
+    unique = set(ids)
+    if all(_is_numeric_id(value) for value in unique):
+        return array("Q", sorted(int(value) for value in unique))
+    return sorted(unique)
+
+
+def _as_strings(ids: SortedIds) -> List[str]:
+    return sorted(str(value) for value in ids) if isinstance(ids, array) else ids
+
+
+def diff_sorted(old: Sequence[Any], new: Sequence[Any]) -> Tuple[List[Any], List[Any]]:
+    """
+    Compare two ascending, duplicate-free sequences in one linear pass.
+
+    Args:
+        old: Earlier ids
+        new: Later ids
+
+    Returns:
+        Tuple of (ids only in new, ids only in old)
+    """
+    added: List[Any] = []
+    removed: List[Any] = []
+    i = j = 0
+    while i < len(old) and j < len(new):
+        if old[i] == new[j]:
+            i += 1
+            j += 1
+        elif old[i] < new[j]:
+            removed.append(old[i])
+            i += 1
+        else:
+            added.append(new[j])
+            j += 1
+    removed.extend(old[i:])
+    added.extend(new[j:])
+    return added, removed
+
+
+class FollowSnapshot:
+    """
+    Follower or followee ids of one user at one point in time.
+
+    Args:
+        target_id: User whose relations were listed
+        relation: "follower" or "followee"
+        listing: User ids in the order the API listed them
+        taken_at: Unix time of the crawl (now if None)
+    """
+
+    def __init__(self, target_id: str, relation: str, listing: Sequence[str], taken_at: Optional[float] = None):
+        if relation not in RELATIONS:
+            raise ValueError(f"relation must be one of {RELATIONS}")
+        self.target_id = str(target_id)
+        self.relation = relation
+        self.taken_at = time.time() if taken_at is None else taken_at
+        listing = list(dict.fromkeys(str(value) for value in listing))
+        self.ids = _sorted_ids(listing)
+        # Listing order as positions in the sorted id array.
+        self.order = array("I", (self._position(value) for value in listing))
+
+    def _position(self, value: str) -> int:
+        return bisect.bisect_left(self.ids, int(value) if isinstance(self.ids, array) else value)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, user_id: object) -> bool:
+        value = str(user_id)
+        if isinstance(self.ids, array) and not _is_numeric_id(value):
+            return False
+        position = self._position(value)
+        return position < len(self.ids) and str(self.ids[position]) == value
+
+    def __iter__(self) -> Iterator[str]:
+        return (str(value) for value in self.ids)
+
+    def listing(self) -> List[str]:
+        """Get the user ids in the order the API listed them."""
+        return [str(self.ids[position]) for position in self.order]
+
+    def diff(self, newer: "FollowSnapshot") -> Tuple[List[str], List[str]]:
+        """
+        Compare with a later snapshot in linear time.
+
+        Args:
+            newer: Snapshot taken after this one
+
+        Returns:
+            Tuple of (user ids added, user ids removed)
+        """
+        old, new = self.ids, newer.ids
+        if isinstance(old, array) != isinstance(new, array):
+            old, new = _as_strings(old), _as_strings(new)
+        added, removed = diff_sorted(old, new)
+        return [str(value) for value in added], [str(value) for value in removed]
+
+    def events(self, newer: "FollowSnapshot") -> List[Dict[str, Any]]:
+        """
+        Describe the changes up to a later snapshot as follow/unfollow events.
+
+        Args:
+            newer: Snapshot taken after this one
+
+        Returns:
+            List of dictionaries with type ("follow" or "unfollow"), relation,
+            target_id, user_id and detected_at (ISO 8601)
+        """
+        added, removed = self.diff(newer)
+        detected_at = datetime.fromtimestamp(newer.taken_at, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        changes = [("follow", user_id) for user_id in added] + [("unfollow", user_id) for user_id in removed]
+        return [
+            {
+                "type": kind,
+                "relation": newer.relation,
+                "target_id": newer.target_id,
+                "user_id": user_id,
+                "detected_at": detected_at,
+            }
+            for kind, user_id in changes
+        ]
+
+    # __________Files__________
+    def save(self, path: str) -> None:
+        """
+        Write the snapshot as a compressed binary file, replacing it atomically.
+
+        Args:
+            path: Output file path
+        """
+        numeric = isinstance(self.ids, array)
+        header = "\0".join((self.target_id, self.relation)).encode("utf-8")
+        ids = array("Q", self.ids) if numeric else array("B", "\0".join(self.ids).encode("utf-8"))
+        order = array("I", self.order)
+        if sys.byteorder == "big":
+            ids.byteswap()
+            order.byteswap()
+        parts = [
+            struct.pack("<dBQQQ", self.taken_at, numeric, len(header), len(self.ids), len(ids) * ids.itemsize),
+            header,
+            ids.tobytes(),
+            order.tobytes(),
+        ]
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(_MAGIC)
+            f.write(zlib.compress(b"".join(parts), 6))
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "FollowSnapshot":
+        """
+        Read a snapshot written by save.
+
+        Args:
+            path: Snapshot file path
+
+        Returns:
+            The FollowSnapshot
+        """
+        with open(path, "rb") as f:
+            if f.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError(f"Not a follow graph snapshot: {path}")
+            data = zlib.decompress(f.read())
+
+        taken_at, numeric, header_length, count, ids_length = struct.unpack_from("<dBQQQ", data, 0)
+        offset = struct.calcsize("<dBQQQ")
+        target_id, relation = data[offset:offset + header_length].decode("utf-8").split("\0")
+        offset += header_length
+        raw_ids = data[offset:offset + ids_length]
+        offset += ids_length
+        order = array("I")
+        order.frombytes(data[offset:])
+        if numeric:
+            ids: SortedIds = array("Q")
+            ids.frombytes(raw_ids)
+        else:
+            ids = raw_ids.decode("utf-8").split("\0") if count else []
+        if sys.byteorder == "big":
+            order.byteswap()
+            if numeric:
+                ids.byteswap()
+        if len(ids) != count or any(position >= count for position in order):
+            raise ValueError(f"Corrupt follow graph snapshot: {path}")
+
+        snapshot = cls.__new__(cls)
+        snapshot.target_id = target_id
+        snapshot.relation = relation
+        snapshot.taken_at = taken_at
+        snapshot.ids = ids
+        snapshot.order = order
+        return snapshot
+
+
+def take_snapshot(
+    user: User,
+    target_id: str,
+    relation: str = "follower",
+    previous: Optional[FollowSnapshot] = None,
+    expected_count: Optional[int] = None,
+    prefetch: int = 0
+) -> FollowSnapshot:
+    """
+    Crawl a follower or followee listing into a snapshot.
+
+    With `previous`, pages are fetched newest first only until one lines up
+    with a run of the previous listing; the rest of the previous listing is
+    reused. Unfollows past that page are then only seen by a full crawl, so
+    pass `expected_count` (e.g. the follower count from the user's profile)
+    to keep crawling whenever the reused listing would not add up to it.
+
+    Args:
+        user: User used to fetch the listing
+        target_id: User whose relations are listed
+        relation: "follower" or "followee"
+        previous: Earlier snapshot of the same listing
+        expected_count: Known size of the listing, used to validate an early stop
+        prefetch: Pages requested concurrently while one is processed
+
+    Returns:
+        The new FollowSnapshot
+    """
+    if relation not in RELATIONS:
+        raise ValueError(f"relation must be one of {RELATIONS}")
+    iterate = user.iter_followers if relation == "follower" else user.iter_followees
+    previous_listing = previous.listing() if previous is not None else []
+    positions = {user_id: index for index, user_id in enumerate(previous_listing)}
+    listing: List[str] = []
+
+    # Early stops happen mid-stream, so pages prefetched past it are discarded.
+    for page in iterate(target_id, prefetch=prefetch):
+        ids = [str(item["user_id"]) for item in page if item.get("user_id") is not None]
+        listing.extend(ids)
+        start = positions.get(ids[0]) if ids else None
+        if start is None or previous_listing[start:start + len(ids)] != ids:
+            continue
+        tail = previous_listing[start + len(ids):]
+        if expected_count is None or len(dict.fromkeys(listing + tail)) == expected_count:
+            listing.extend(tail)
+            break
+    return FollowSnapshot(target_id, relation, listing)
+
+
+class FollowGraphStore:
+    """
+    Directory of dated follow graph snapshots.
+
+    Example:
+        store = FollowGraphStore("snapshots")
+        for event in store.refresh(cl.user, "12345"):
+            print(event["type"], event["user_id"])
+
+    Args:
+        directory: Directory holding the snapshot files (created if missing)
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _prefix(self, target_id: str, relation: str) -> str:
+        return f"{relation}s-{re.sub(r'[^A-Za-z0-9_.-]', '_', str(target_id))}-"
+
+    def path(self, snapshot: FollowSnapshot) -> str:
+        """Get the file path of a snapshot: one file per listing and UTC day."""
+        day = datetime.fromtimestamp(snapshot.taken_at, timezone.utc).strftime("%Y%m%d")
+        return os.path.join(self.directory, f"{self._prefix(snapshot.target_id, snapshot.relation)}{day}.fgs")
+
+    def latest(self, target_id: str, relation: str = "follower") -> Optional[FollowSnapshot]:
+        """
+        Load the most recent stored snapshot of a listing.
+
+        Args:
+            target_id: User whose relations were listed
+            relation: "follower" or "followee"
+
+        Returns:
+            The snapshot, or None if none is stored
+        """
+        prefix = self._prefix(target_id, relation)
+        names = sorted(name for name in os.listdir(self.directory) if name.startswith(prefix) and name.endswith(".fgs"))
+        return FollowSnapshot.load(os.path.join(self.directory, names[-1])) if names else None
+
+    def refresh(
+        self,
+        user: User,
+        target_id: str,
+        relation: str = "follower",
+        expected_count: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Take a new snapshot incrementally, store it and report the changes.
+
+        Args:
+            user: User used to fetch the listing
+            target_id: User whose relations are listed
+            relation: "follower" or "followee"
+            expected_count: Known size of the listing (see take_snapshot)
+
+        Returns:
+            Follow/unfollow events since the previous snapshot (none on the first run)
+        """
+        previous = self.latest(target_id, relation)
+        snapshot = take_snapshot(user, target_id, relation, previous, expected_count)
+        snapshot.save(self.path(snapshot))
+        return previous.events(snapshot) if previous is not None else []
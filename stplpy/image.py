@@ -0,0 +1,183 @@
+"""
+Image preprocessing for Stplpy profile picture uploads.
+
+Resizing and re-encoding require the optional Pillow dependency
+(``pip install stplpy[image]``); format detection works without it.
+"""
+import io
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .exceptions import ValidationError
+
+DEFAULT_MAX_SIZE = 1024
+DEFAULT_MAX_BYTES = 512 * 1024
+
+MIME_TYPES = {
+    "jpeg": "image/jpeg",
+    "png": "image/png",
+    "gif": "image/gif",
+    "webp": "image/webp",
+    "heic": "image/heic",
+}
+
+FILE_EXTENSIONS = {
+    "jpeg": "jpg",
+    "png": "png",
+    "gif": "gif",
+    "webp": "webp",
+    "heic": "heic",
+}
+
+_JPEG_QUALITIES = (85, 75, 65, 55, 45)
+
+
+def detect_image_format(data: bytes) -> Optional[str]:
+    """
+    Detect an image format from its magic bytes.
+
+    Args:
+        data: Leading bytes of the image (at least 12 bytes)
+
+    Returns:
+        Format name ("jpeg", "png", "gif", "webp", "heic") or None if unknown
+    """
+    if data.startswith(b"\xff\xd8\xff"):
+        return "jpeg"
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    if data[4:8] == b"ftyp" and data[8:12] in (b"heic", b"heix", b"mif1", b"msf1"):
+        return "heic"
+    return None
+
+
+def _load_pillow() -> Any:
+    try:
+        from PIL import Image, ImageOps
+    except ImportError as e:
+        raise ImportError(
+            "Image preprocessing requires Pillow. Install it with 'pip install stplpy[image]'."
+        ) from e
+    return Image, ImageOps
+
+
+def preprocess_image(
+    data: bytes,
+    max_size: int = DEFAULT_MAX_SIZE,
+    max_bytes: int = DEFAULT_MAX_BYTES
+) -> Tuple[bytes, str]:
+    """
+    Downsize, re-encode and strip metadata from an image.
+
+    The image is rotated according to its EXIF orientation, shrunk to fit in
+    a max_size square and encoded as a metadata-free JPEG, lowering quality
+    and then resolution until it fits in max_bytes.
+
+    Args:
+        data: Raw image bytes
+        max_size: Maximum width and height in pixels
+        max_bytes: Target size of the encoded image in bytes
+
+    Returns:
+        Tuple of (encoded bytes, MIME type)
+
+    Raises:
+        ValidationError: If the data cannot be decoded as an image
+    """
+    Image, ImageOps = _load_pillow()
+    try:
+        image = Image.open(io.BytesIO(data))
+        image = ImageOps.exif_transpose(image)
+    except Exception as e:
+        raise ValidationError(f"Invalid image data: {str(e)}") from e
+
+    if image.mode in ("RGBA", "LA", "P"):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        image = background
+    elif image.mode != "RGB":
+        image = image.convert("RGB")
+
+    size = max_size
+    while True:
+        image.thumbnail((size, size), Image.LANCZOS)
+        for quality in _JPEG_QUALITIES:
+            buffer = io.BytesIO()
+            image.save(buffer, format="JPEG", quality=quality, optimize=True)
+            if buffer.tell() <= max_bytes:
+                return buffer.getvalue(), MIME_TYPES["jpeg"]
+        if size <= 64:
+            return buffer.getvalue(), MIME_TYPES["jpeg"]
+        size = int(size * 0.75)
+
+
+def prepare_upload(
+    file_path: str,
+    preprocess: bool = False,
+    max_size: int = DEFAULT_MAX_SIZE,
+    max_bytes: int = DEFAULT_MAX_BYTES
+) -> Tuple[str, bytes, str]:
+    """
+    Read an image file and build the multipart file tuple for an upload.
+
+    Args:
+        file_path: Path to the image file
+        preprocess: Whether to run preprocess_image on the data
+        max_size: Maximum width and height when preprocessing
+        max_bytes: Target encoded size when preprocessing
+
+    Returns:
+        Tuple of (file name, image bytes, MIME type)
+
+    Raises:
+        ValidationError: If the file does not exist
+    """
+    try:
+        with open(file_path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        raise ValidationError(f"Profile picture file not found: {file_path}")
+
+    if preprocess:
+        data, mime_type = preprocess_image(data, max_size, max_bytes)
+        return "image.jpg", data, mime_type
+
+    image_format = detect_image_format(data[:16]) or "jpeg"
+    return f"image.{FILE_EXTENSIONS[image_format]}", data, MIME_TYPES[image_format]
+
+
+def _preprocess_file(job: Tuple[str, Dict[str, int]]) -> Tuple[bytes, str]:
+    file_path, options = job
+    with open(file_path, "rb") as f:
+        return preprocess_image(f.read(), **options)
+
+
+def preprocess_images(
+    file_paths: Iterable[str],
+    max_size: int = DEFAULT_MAX_SIZE,
+    max_bytes: int = DEFAULT_MAX_BYTES,
+    max_workers: Optional[int] = None
+) -> List[Tuple[bytes, str]]:
+    """
+    Preprocess many image files in a process pool.
+
+    Args:
+        file_paths: Paths of the images to process
+        max_size: Maximum width and height in pixels
+        max_bytes: Target size of each encoded image in bytes
+        max_workers: Number of worker processes (defaults to the CPU count)
+
+    Returns:
+        List of (encoded bytes, MIME type) tuples in input order
+    """
+    _load_pillow()
+    options = {"max_size": max_size, "max_bytes": max_bytes}
+    jobs = [(file_path, options) for file_path in file_paths]
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(_preprocess_file, jobs))
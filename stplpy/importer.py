@@ -0,0 +1,225 @@
+"""
+Bulk study-record import for Stplpy library.
+
+Records are streamed from CSV or NDJSON files with the columns
+``duration``, ``record_datetime`` and optionally ``material_code`` and
+``comment``. Each record is posted with a post_token derived from its
+content, so re-running an interrupted import does not create duplicates.
+"""
+import csv
+import json
+import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set
+
+from .exceptions import ValidationError
+from .ratelimit import RateLimiter
+from .retry import call_with_retry
+from .timeline import Timeline
+from .tokens import derive_token
+
+logger = logging.getLogger(__name__)
+
+MAX_DURATION = 24 * 60 * 60
+
+
+def iter_records(path: str, file_format: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Stream raw records from a CSV or NDJSON file.
+
+    Args:
+        path: Path to the file
+        file_format: "csv" or "ndjson" (guessed from the extension if omitted)
+
+    Returns:
+        Iterator of record dictionaries
+    """
+    if file_format is None:
+        extension = os.path.splitext(path)[1].lower()
+        file_format = "csv" if extension == ".csv" else "ndjson"
+
+    # utf-8-sig drops the byte order mark that Excel and other exporters prepend.
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        if file_format == "csv":
+            yield from csv.DictReader(f)
+        elif file_format in ("ndjson", "jsonl"):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            raise ValidationError(f"Unsupported import format: {file_format}")
+
+
+def validate_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Validate and normalize a raw record.
+
+    Args:
+        record: Raw record from iter_records
+
+    Returns:
+        Dictionary of post_study_record keyword arguments
+
+    Raises:
+        ValidationError: If duration or record_datetime is missing or invalid
+    """
+    try:
+        duration = int(record.get("duration", ""))
+    except (TypeError, ValueError):
+        raise ValidationError(f"Invalid duration: {record.get('duration')!r}")
+    if not 0 < duration <= MAX_DURATION:
+        raise ValidationError(f"Duration out of range (1-{MAX_DURATION} seconds): {duration}")
+
+    raw_datetime = record.get("record_datetime")
+    try:
+        parsed = datetime.fromisoformat(str(raw_datetime).replace("Z", "+00:00"))
+    except ValueError:
+        raise ValidationError(f"Invalid record_datetime: {raw_datetime!r}")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+
+    return {
+        "material_code": record.get("material_code") or None,
+        "duration": duration,
+        "comment": record.get("comment") or "",
+        "record_datetime": parsed.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+    }
+
+
+def derive_post_token(record: Dict[str, Any], n: int = 10) -> str:
+    """
+    Derive a stable post_token from a normalized record.
+
+    Args:
+        record: Normalized record from validate_record
+        n: Token length
+
+    Returns:
+        Alphanumeric token that is identical for identical records
+    """
+    return derive_token(record, n)
+
+
+class ImportProgress:
+    """Counters and throughput of a running import."""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.posted = 0
+        self.failed = 0
+        self.errors: List[str] = []
+        self.started = time.monotonic()
+
+    @property
+    def done(self) -> int:
+        return self.posted + self.failed
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    @property
+    def records_per_second(self) -> float:
+        return self.done / self.elapsed if self.elapsed > 0 else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.done}/{self.total} records ({self.posted} posted, {self.failed} failed) "
+            f"in {self.elapsed:.1f}s, {self.records_per_second:.1f} records/s"
+        )
+
+
+def _log_progress(progress: ImportProgress) -> None:
+    logger.info(str(progress))
+
+
+def import_study_records(
+    timeline: Timeline,
+    path: str,
+    file_format: Optional[str] = None,
+    rate_limiter: Optional[RateLimiter] = None,
+    concurrency: int = 4,
+    max_attempts: int = 5,
+    progress: Optional[Callable[[ImportProgress], None]] = _log_progress,
+    progress_interval: float = 5.0,
+    dry_run: bool = False
+) -> ImportProgress:
+    """
+    Import study records from a CSV or NDJSON file.
+
+    The whole file is validated first (streaming, so memory stays flat); no
+    record is posted if any row is invalid. Records are then posted
+    concurrently under the rate limiter with content-derived post_tokens.
+
+    Args:
+        timeline: Timeline (or StudyPlus) client used to post the records
+        path: Path to the file
+        file_format: "csv" or "ndjson" (guessed from the extension if omitted)
+        rate_limiter: Shared limiter for the posts (defaults to 2 requests/s)
+        concurrency: Maximum number of in-flight posts
+        max_attempts: Attempts per record for transient failures
+        progress: Callback receiving ImportProgress periodically and at the end
+        progress_interval: Seconds between progress callbacks
+        dry_run: Only validate the file
+
+    Returns:
+        Final ImportProgress
+
+    Raises:
+        ValidationError: If any row is invalid (the message lists the first errors)
+    """
+    errors = []
+    total = 0
+    for line, record in enumerate(iter_records(path, file_format), 1):
+        total += 1
+        try:
+            validate_record(record)
+        except ValidationError as e:
+            errors.append(f"Row {line}: {e}")
+    if errors:
+        raise ValidationError(f"{len(errors)} invalid rows in {path}: " + "; ".join(errors[:10]))
+
+    state = ImportProgress(total)
+    if dry_run:
+        return state
+
+    rate_limiter = rate_limiter or RateLimiter(rate=2.0, burst=10)
+    last_report = time.monotonic()
+
+    def post(record: Dict[str, Any]) -> Any:
+        return call_with_retry(
+            timeline.post_study_record,
+            max_attempts=max_attempts,
+            rate_limiter=rate_limiter,
+            post_token=derive_post_token(record),
+            **record
+        )
+
+    def collect(finished: Set[Future]) -> None:
+        for future in finished:
+            error = future.exception()
+            if error is None:
+                state.posted += 1
+            else:
+                state.failed += 1
+                state.errors.append(str(error))
+
+    in_flight: Set[Future] = set()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for record in iter_records(path, file_format):
+            if len(in_flight) >= concurrency * 2:
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(finished)
+            in_flight.add(executor.submit(post, validate_record(record)))
+            if progress is not None and time.monotonic() - last_report >= progress_interval:
+                progress(state)
+                last_report = time.monotonic()
+        finished, _ = wait(in_flight)
+        collect(finished)
+
+    if progress is not None:
+        progress(state)
+    return state
@@ -0,0 +1,224 @@
+"""
+Memory budgeting for Stplpy library.
+
+A MemoryBudget caps the memory held by the components of a long-running
+client. Components that retain data (caches, dedup filters, watchers) are
+registered with it and report their usage; when the total passes the limit,
+the largest components that can shrink are asked to evict. Transient
+buffers (prefetched pages, pipeline queues) reserve their items' size
+before holding them and wait while the budget is exhausted, which pushes
+back on the producers instead of growing memory.
+"""
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Protocol
+
+
+class MemoryComponent(Protocol):
+    """Interface of components tracked by a MemoryBudget; shrink(nbytes) is optional."""
+
+    def memory_bytes(self) -> int: ...
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Estimate the memory held by a JSON-like value.
+
+    Counts dictionaries, lists, tuples, sets and their contents once each
+    by identity, so shared objects are not counted twice.
+
+    Args:
+        value: Value to measure (e.g. a page or profile dictionary)
+
+    Returns:
+        Approximate size in bytes
+    """
+    seen = set()
+    stack = [value]
+    total = 0
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+    return total
+
+
+class MemoryBudget:
+    """
+    Shared memory limit across caches, dedup filters, buffers and queues.
+
+    Example:
+        budget = MemoryBudget(256 * 1024 * 1024)
+        cache = MemoryCache(budget=budget)
+        budget.register("dedup", WindowDeduper())
+        print(budget.usage())
+
+    Args:
+        limit_bytes: Total bytes the tracked components may hold
+    """
+
+    def __init__(self, limit_bytes: int):
+        if limit_bytes <= 0:
+            raise ValueError("limit_bytes must be positive")
+        self.limit_bytes = limit_bytes
+        self.evicted_bytes = 0
+        self.waits = 0
+        self._components: Dict[str, MemoryComponent] = {}
+        self._reserved: Dict[str, int] = {}
+        self._changed = threading.Condition()
+
+    def register(self, name: str, component: MemoryComponent) -> None:
+        """
+        Track a component's memory.
+
+        Args:
+            name: Name reported by usage
+            component: Object with memory_bytes(), and optionally shrink(nbytes)
+                evicting about nbytes and returning the bytes freed
+        """
+        with self._changed:
+            if name in self._components or name in self._reserved:
+                raise ValueError(f"Memory component already registered: {name}")
+            self._components[name] = component
+
+    def unregister(self, name: str) -> None:
+        with self._changed:
+            self._components.pop(name, None)
+            self._changed.notify_all()
+
+    def _usage(self) -> Dict[str, int]:
+        usage = {name: component.memory_bytes() for name, component in self._components.items()}
+        for name, reserved in self._reserved.items():
+            usage[name] = usage.get(name, 0) + reserved
+        return usage
+
+    def usage(self) -> Dict[str, int]:
+        """
+        Get the current memory per component.
+
+        Returns:
+            Dictionary mapping component names to approximate bytes held
+        """
+        with self._changed:
+            return self._usage()
+
+    def used(self) -> int:
+        """Total approximate bytes held by all components."""
+        return sum(self.usage().values())
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get budget counters.
+
+        Returns:
+            Dictionary with limit_bytes, used_bytes, evicted_bytes, waits and components
+        """
+        with self._changed:
+            usage = self._usage()
+            return {
+                "limit_bytes": self.limit_bytes,
+                "used_bytes": sum(usage.values()),
+                "evicted_bytes": self.evicted_bytes,
+                "waits": self.waits,
+                "components": usage,
+            }
+
+    def _enforce(self, extra: int = 0) -> int:
+        usage = self._usage()
+        excess = sum(usage.values()) + extra - self.limit_bytes
+        freed = 0
+        # The largest shrinkable components give way first.
+        for name in sorted(self._components, key=lambda name: -usage.get(name, 0)):
+            if freed >= excess:
+                break
+            shrink = getattr(self._components[name], "shrink", None)
+            if shrink is not None:
+                freed += shrink(excess - freed)
+        self.evicted_bytes += freed
+        return freed
+
+    def enforce(self) -> int:
+        """
+        Evict from shrinkable components until usage is within the limit.
+
+        Components call this after growing; it must not be called while
+        holding a lock a component's memory_bytes or shrink takes.
+
+        Returns:
+            Bytes freed
+        """
+        with self._changed:
+            freed = self._enforce()
+            if freed:
+                self._changed.notify_all()
+            return freed
+
+    def reserve(self, name: str, nbytes: int, timeout: Optional[float] = None) -> bool:
+        """
+        Reserve memory for a buffered item, waiting while the budget is exhausted.
+
+        Shrinkable components are asked to make room first. A buffer holding
+        no reservation is always admitted, so every buffer can make progress
+        even when a single item exceeds the limit.
+
+        Args:
+            name: Buffer name reported by usage
+            nbytes: Bytes to reserve
+            timeout: Seconds to wait at most (forever if None)
+
+        Returns:
+            True if reserved, False on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._changed:
+            if name in self._components:
+                raise ValueError(f"{name} is a registered component, not a buffer")
+            waited = False
+            while True:
+                if not self._reserved.get(name) or sum(self._usage().values()) + nbytes <= self.limit_bytes:
+                    break
+                if self._enforce(nbytes) and sum(self._usage().values()) + nbytes <= self.limit_bytes:
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                if not waited:
+                    self.waits += 1
+                    waited = True
+                self._changed.wait(remaining)
+            self._reserved[name] = self._reserved.get(name, 0) + nbytes
+            return True
+
+    def release(self, name: str, nbytes: int) -> None:
+        """
+        Return memory reserved by reserve.
+
+        Args:
+            name: Buffer name
+            nbytes: Bytes to release
+        """
+        with self._changed:
+            remaining = self._reserved.get(name, 0) - nbytes
+            if remaining > 0:
+                self._reserved[name] = remaining
+            else:
+                self._reserved.pop(name, None)
+            self._changed.notify_all()
+
+    @contextmanager
+    def reservation(self, name: str, nbytes: int) -> Iterator[None]:
+        """Hold a reservation for the duration of a block."""
+        self.reserve(name, nbytes)
+        try:
+            yield
+        finally:
+            self.release(name, nbytes)
@@ -0,0 +1,306 @@
+"""
+Durable write outbox for Stplpy library.
+
+Writes (study records and comments) are appended to a local SQLite
+write-ahead log together with their post_token and drained by a background
+flusher. A write is only marked done after the API accepted it; because the
+post_token is fixed at enqueue time, a write re-sent after a crash or a lost
+response is deduplicated by the server.
+"""
+import json
+import logging
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from .exceptions import RateLimitError
+from .ratelimit import RateLimiter
+from .retry import backoff_delay, is_retryable
+from .timeline import Timeline
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    post_token TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL DEFAULT 0,
+    last_error TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt);
+"""
+
+
+class Outbox:
+    """
+    SQLite-backed queue of pending writes with a background flusher.
+
+    Example:
+        with Outbox(cl.timeline, "outbox.db") as outbox:
+            outbox.enqueue_study_record(duration=3600, comment="Math")
+            outbox.join(timeout=60)
+    """
+
+    def __init__(
+        self,
+        timeline: Timeline,
+        path: str = "stplpy_outbox.db",
+        rate_limiter: Optional[RateLimiter] = None,
+        batch_size: int = 50,
+        concurrency: int = 4,
+        max_attempts: int = 8,
+        base_backoff: float = 1.0,
+        max_backoff: float = 300.0
+    ):
+        self.timeline = timeline
+        self.path = path
+        self.rate_limiter = rate_limiter or RateLimiter(rate=2.0, burst=10)
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._drained = threading.Condition()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # __________Enqueue__________
+    def _enqueue(self, kind: str, payload: Dict[str, Any], post_token: str) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO outbox (kind, payload, post_token, created_at) VALUES (?, ?, ?, ?)",
+                (kind, json.dumps(payload), post_token, time.time())
+            )
+        self._wakeup.set()
+        return cursor.lastrowid
+
+    def enqueue_study_record(
+        self,
+        material_code: Optional[str] = None,
+        duration: int = 0,
+        comment: str = "",
+        record_datetime: Optional[str] = None,
+        post_token: Optional[str] = None
+    ) -> int:
+        """
+        Queue a study record for posting.
+
+        The record time defaults to now so a delayed flush keeps the original time.
+
+        Returns:
+            Outbox entry id
+        """
+        if record_datetime is None:
+            record_datetime = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        payload = {
+            "material_code": material_code,
+            "duration": duration,
+            "comment": comment,
+            "record_datetime": record_datetime,
+        }
+        return self._enqueue("study_record", payload, post_token or self.timeline.create_token())
+
+    def enqueue_comment(self, post_id: str, text: str, post_token: Optional[str] = None) -> int:
+        """
+        Queue a comment for sending.
+
+        Returns:
+            Outbox entry id
+        """
+        payload = {"post_id": post_id, "text": text}
+        return self._enqueue("comment", payload, post_token or self.timeline.create_token(36))
+
+    # __________Inspection__________
+    def counts(self) -> Dict[str, int]:
+        """
+        Count entries by status.
+
+        Returns:
+            Dictionary mapping "pending", "done" and "failed" to entry counts
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall()
+        counts = {PENDING: 0, DONE: 0, FAILED: 0}
+        counts.update(dict(rows))
+        return counts
+
+    def failed(self) -> List[Dict[str, Any]]:
+        """
+        List entries that permanently failed.
+
+        Returns:
+            List of entries with their payload, attempts and last error
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, kind, payload, post_token, attempts, last_error FROM outbox WHERE status = ?",
+                (FAILED,)
+            ).fetchall()
+        return [
+            {"id": r[0], "kind": r[1], "payload": json.loads(r[2]), "post_token": r[3], "attempts": r[4], "last_error": r[5]}
+            for r in rows
+        ]
+
+    def purge_done(self) -> int:
+        """
+        Delete entries that were sent successfully.
+
+        Returns:
+            Number of deleted entries
+        """
+        with self._lock:
+            return self._conn.execute("DELETE FROM outbox WHERE status = ?", (DONE,)).rowcount
+
+    # __________Flushing__________
+    def _due_batch(self) -> Tuple[List[Tuple[int, str, str, str, int]], Optional[float]]:
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, kind, payload, post_token, attempts FROM outbox "
+                "WHERE status = ? AND next_attempt <= ? ORDER BY id LIMIT ?",
+                (PENDING, now, self.batch_size)
+            ).fetchall()
+            next_due = self._conn.execute(
+                "SELECT MIN(next_attempt) FROM outbox WHERE status = ?", (PENDING,)
+            ).fetchone()[0]
+        return rows, next_due
+
+    def _send(self, row: Tuple[int, str, str, str, int]) -> Optional[Exception]:
+        _, kind, payload, post_token, _ = row
+        data = json.loads(payload)
+        self.rate_limiter.acquire()
+        try:
+            if kind == "study_record":
+                self.timeline.post_study_record(post_token=post_token, **data)
+            elif kind == "comment":
+                self.timeline.send_comment(data["post_id"], data["text"], post_token=post_token)
+            else:
+                raise ValueError(f"Unknown outbox entry kind '{kind}'")
+        except Exception as e:
+            if isinstance(e, RateLimitError):
+                self.rate_limiter.penalize(self.base_backoff)
+            return e
+        return None
+
+    def flush_once(self) -> int:
+        """
+        Send one batch of due entries in the calling thread.
+
+        Returns:
+            Number of entries processed
+        """
+        rows, _ = self._due_batch()
+        if not rows:
+            return 0
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            errors = list(executor.map(self._send, rows))
+
+        now = time.time()
+        done, retry, failed = [], [], []
+        for row, error in zip(rows, errors):
+            entry_id, attempts = row[0], row[4] + 1
+            if error is None:
+                done.append((DONE, attempts, entry_id))
+            elif is_retryable(error) and attempts < self.max_attempts:
+                delay = max(backoff_delay(attempts, self.base_backoff, self.max_backoff), getattr(error, "retry_after", 0.0))
+                retry.append((attempts, now + delay, str(error), entry_id))
+            else:
+                logger.warning(f"Outbox entry {entry_id} failed permanently: {error}")
+                failed.append((FAILED, attempts, str(error), entry_id))
+
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany("UPDATE outbox SET status = ?, attempts = ? WHERE id = ?", done)
+                self._conn.executemany(
+                    "UPDATE outbox SET attempts = ?, next_attempt = ?, last_error = ? WHERE id = ?", retry
+                )
+                self._conn.executemany(
+                    "UPDATE outbox SET status = ?, attempts = ?, last_error = ? WHERE id = ?", failed
+                )
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        return len(rows)
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                processed = self.flush_once()
+            except Exception as e:
+                logger.error(f"Outbox flush failed: {e}")
+                processed = 0
+            with self._drained:
+                self._drained.notify_all()
+            if processed:
+                continue
+            _, next_due = self._due_batch()
+            timeout = None if next_due is None else max(0.0, next_due - time.time())
+            self._wakeup.wait(timeout)
+            self._wakeup.clear()
+
+    def start(self) -> None:
+        """Start the background flusher thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="stplpy-outbox", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the flusher thread; pending entries stay queued on disk."""
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until no entries are pending.
+
+        Args:
+            timeout: Maximum seconds to wait (None waits forever)
+
+        Returns:
+            True if the outbox drained, False on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._drained:
+            while self.counts()[PENDING]:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._drained.wait(remaining if remaining is not None else 1.0)
+        return True
+
+    def close(self) -> None:
+        """Stop the flusher and close the database."""
+        self.stop()
+        self._conn.close()
+
+    def __enter__(self) -> "Outbox":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
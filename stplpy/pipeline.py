@@ -0,0 +1,347 @@
+"""
+Staged processing pipelines for Stplpy library.
+
+A Pipeline reads items from a source iterable (such as a timeline iterator)
+and passes them through stages connected by bounded queues. Each stage runs
+its function on its own pool of worker threads, so slow requests in one
+stage overlap with the others, and a full queue blocks the stage feeding it
+rather than letting work pile up in memory. Per-stage throughput and queue
+depth are available while the pipeline runs. With a MemoryBudget, queued
+items also reserve their size, so queues stop growing once memory is short.
+"""
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from .memory import MemoryBudget, estimate_size
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+# How often blocked workers check whether the pipeline is stopping.
+_POLL_INTERVAL = 0.1
+
+
+class _StageStats:
+    def __init__(self, workers: int) -> None:
+        self.workers = workers
+        self.received = 0
+        self.emitted = 0
+        self.errors = 0
+        self.busy = 0.0
+        self.max_queue_depth = 0
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+
+
+class _Stage:
+    def __init__(
+        self,
+        name: str,
+        function: Callable[[Any], Any],
+        kind: str,
+        workers: int,
+        queue_size: int,
+        on_error: str
+    ):
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        if on_error not in ("raise", "skip"):
+            raise ValueError("on_error must be 'raise' or 'skip'")
+        self.name = name
+        self.function = function
+        self.kind = kind
+        self.workers = workers
+        self.queue_size = queue_size
+        self.on_error = on_error
+
+    def outputs(self, item: Any) -> Iterable[Any]:
+        if self.kind == "map":
+            return (self.function(item),)
+        if self.kind == "filter":
+            return (item,) if self.function(item) else ()
+        return self.function(item)
+
+
+class Pipeline:
+    """
+    Chain of concurrent stages fed from an iterable.
+
+    Items leave a stage with several workers in completion order, not input
+    order. A pipeline is run once; iterate it (or call collect) to start it.
+
+    Example:
+        pipeline = (
+            Pipeline(cl.timeline.iter_user_timelines("12345", limit=20))
+            .map(lambda event: cl.timeline.get_post_detail(get_event_id(event), include_comments=True), workers=8)
+            .flat_map(lambda detail: detail.get("comments", []))
+            .map(lambda comment: cl.user.get_user(comment["username"]), workers=4)
+        )
+        profiles = pipeline.collect()
+
+    Args:
+        source: Items fed into the first stage
+        queue_size: Default capacity of the queue in front of each stage
+        budget: Memory budget that queued items reserve their size from; each
+            queue reserves as "pipeline:<stage name>" ("pipeline:results" for
+            the output), so every queue can always take at least one item
+    """
+
+    def __init__(self, source: Iterable[Any], queue_size: int = 100, budget: Optional[MemoryBudget] = None):
+        self.source = source
+        self.queue_size = queue_size
+        self.budget = budget
+        self._stages: List[_Stage] = []
+        self._stats: Dict[str, _StageStats] = {}
+        self._queues: List["queue.Queue[Any]"] = []
+        self._results: List["queue.Queue[Any]"] = []
+        self._queue_names: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._error: Optional[BaseException] = None
+        self._started = False
+
+    # __________Building__________
+    def _add(
+        self,
+        kind: str,
+        function: Callable[[Any], Any],
+        name: Optional[str],
+        workers: int,
+        queue_size: Optional[int],
+        on_error: str
+    ) -> "Pipeline":
+        if self._started:
+            raise RuntimeError("Stages cannot be added to a running pipeline")
+        name = name or f"{len(self._stages) + 1}:{getattr(function, '__name__', kind)}"
+        if name in self._stats or name == "source":
+            raise ValueError(f"Duplicate stage name: {name}")
+        stage = _Stage(name, function, kind, workers, queue_size or self.queue_size, on_error)
+        self._stages.append(stage)
+        self._stats[name] = _StageStats(workers)
+        return self
+
+    def map(
+        self,
+        function: Callable[[Any], Any],
+        name: Optional[str] = None,
+        workers: int = 1,
+        queue_size: Optional[int] = None,
+        on_error: str = "raise"
+    ) -> "Pipeline":
+        """
+        Add a stage passing on function(item) for each item.
+
+        Args:
+            function: Called on every item from a worker thread
+            name: Stage name in metrics (derived from the function if None)
+            workers: Items processed concurrently by this stage
+            queue_size: Capacity of the queue in front of this stage
+            on_error: "raise" stops the pipeline on an exception; "skip" logs and drops the item
+
+        Returns:
+            The pipeline, for chaining
+        """
+        return self._add("map", function, name, workers, queue_size, on_error)
+
+    def flat_map(
+        self,
+        function: Callable[[Any], Iterable[Any]],
+        name: Optional[str] = None,
+        workers: int = 1,
+        queue_size: Optional[int] = None,
+        on_error: str = "raise"
+    ) -> "Pipeline":
+        """Add a stage passing on every item of function(item); arguments as for map."""
+        return self._add("flat_map", function, name, workers, queue_size, on_error)
+
+    def filter(
+        self,
+        predicate: Callable[[Any], Any],
+        name: Optional[str] = None,
+        workers: int = 1,
+        queue_size: Optional[int] = None,
+        on_error: str = "raise"
+    ) -> "Pipeline":
+        """Add a stage passing on the items for which predicate(item) is true; arguments as for map."""
+        return self._add("filter", predicate, name, workers, queue_size, on_error)
+
+    # __________Running__________
+    def _put(self, target: "queue.Queue[Any]", item: Any) -> bool:
+        """Put an item, waiting for room; return False if the pipeline is stopping."""
+        size = estimate_size(item) if self.budget is not None and item is not _DONE else 0
+        if size:
+            while not self.budget.reserve(self._queue_names[id(target)], size, timeout=_POLL_INTERVAL):
+                if self._stopping.is_set():
+                    return False
+        while not self._stopping.is_set():
+            try:
+                target.put((item, size), timeout=_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        if size:
+            self.budget.release(self._queue_names[id(target)], size)
+        return False
+
+    def _get(self, source: "queue.Queue[Any]") -> Any:
+        while not self._stopping.is_set():
+            try:
+                item, size = source.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+            if size:
+                self.budget.release(self._queue_names[id(source)], size)
+            return item
+        return _DONE
+
+    def _fail(self, error: BaseException) -> None:
+        with self._lock:
+            if self._error is None:
+                self._error = error
+        self._stopping.set()
+
+    def _feed(self, output: "queue.Queue[Any]") -> None:
+        stats = self._stats["source"]
+        stats.started = time.monotonic()
+        try:
+            for item in self.source:
+                stats.emitted += 1
+                if not self._put(output, item):
+                    return
+        except Exception as e:
+            stats.errors += 1
+            self._fail(e)
+        finally:
+            stats.finished = time.monotonic()
+            self._put(output, _DONE)
+
+    def _work(self, stage: _Stage, source: "queue.Queue[Any]", output: "queue.Queue[Any]", remaining: List[int]) -> None:
+        stats = self._stats[stage.name]
+        while True:
+            item = self._get(source)
+            if item is _DONE:
+                # Pass the end marker on to sibling workers; the last one out
+                # forwards it downstream.
+                with self._lock:
+                    remaining[0] -= 1
+                    last = remaining[0] == 0
+                    if last:
+                        stats.finished = time.monotonic()
+                if last:
+                    self._put(output, _DONE)
+                else:
+                    self._put(source, _DONE)
+                return
+            started = time.monotonic()
+            with self._lock:
+                stats.received += 1
+                stats.max_queue_depth = max(stats.max_queue_depth, source.qsize() + 1)
+                if stats.started is None:
+                    stats.started = started
+            try:
+                for result in stage.outputs(item):
+                    with self._lock:
+                        stats.emitted += 1
+                    if not self._put(output, result):
+                        return
+            except Exception as e:
+                with self._lock:
+                    stats.errors += 1
+                if stage.on_error == "raise":
+                    self._fail(e)
+                    return
+                logger.warning(f"Pipeline stage '{stage.name}' dropped an item: {e}")
+            finally:
+                with self._lock:
+                    stats.busy += time.monotonic() - started
+
+    def _start(self) -> "queue.Queue[Any]":
+        if self._started:
+            raise RuntimeError("A pipeline can only be run once")
+        self._started = True
+        self._stats = {"source": _StageStats(1), **self._stats}
+        self._queues = [queue.Queue(stage.queue_size) for stage in self._stages]
+        results: "queue.Queue[Any]" = queue.Queue(self.queue_size)
+        self._results = [results]
+        self._queue_names = {id(queue_): f"pipeline:{stage.name}" for stage, queue_ in zip(self._stages, self._queues)}
+        self._queue_names[id(results)] = "pipeline:results"
+        outputs = self._queues[1:] + [results]
+        self._threads.append(threading.Thread(
+            target=self._feed, args=(self._queues[0] if self._stages else results,), name="stplpy-pipeline-source", daemon=True
+        ))
+        for stage, source, output in zip(self._stages, self._queues, outputs):
+            remaining = [stage.workers]
+            for index in range(stage.workers):
+                self._threads.append(threading.Thread(
+                    target=self._work, args=(stage, source, output, remaining),
+                    name=f"stplpy-pipeline-{stage.name}-{index}", daemon=True
+                ))
+        for thread in self._threads:
+            thread.start()
+        return results
+
+    def __iter__(self) -> Iterator[Any]:
+        results = self._start()
+        try:
+            while True:
+                item = self._get(results)
+                if item is _DONE:
+                    break
+                yield item
+        finally:
+            self.stop()
+        if self._error is not None:
+            raise self._error
+
+    def collect(self) -> List[Any]:
+        """Run the pipeline and return all items leaving the last stage."""
+        return list(self)
+
+    def stop(self) -> None:
+        """Stop all stages, discarding items still queued, and wait for their threads."""
+        self._stopping.set()
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join()
+        for queue_ in self._queues + self._results:
+            while not queue_.empty():
+                size = queue_.get_nowait()[1]
+                if size:
+                    self.budget.release(self._queue_names[id(queue_)], size)
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get per-stage throughput and queue metrics.
+
+        Returns:
+            Dictionary mapping stage names ("source" first) to workers,
+            received, emitted, errors, queue_depth (items waiting in front of
+            the stage), max_queue_depth, busy_seconds, elapsed_seconds,
+            throughput (items received per second) and utilization (busy
+            share of the workers' time)
+        """
+        now = time.monotonic()
+        depths = {stage.name: queue_.qsize() for stage, queue_ in zip(self._stages, self._queues)}
+        with self._lock:
+            result = {}
+            for name, stats in self._stats.items():
+                elapsed = (stats.finished or now) - stats.started if stats.started is not None else 0.0
+                count = stats.emitted if name == "source" else stats.received
+                result[name] = {
+                    "workers": stats.workers,
+                    "received": stats.received,
+                    "emitted": stats.emitted,
+                    "errors": stats.errors,
+                    "queue_depth": depths.get(name, 0),
+                    "max_queue_depth": stats.max_queue_depth,
+                    "busy_seconds": stats.busy,
+                    "elapsed_seconds": elapsed,
+                    "throughput": count / elapsed if elapsed > 0 else 0.0,
+                    "utilization": stats.busy / (elapsed * stats.workers) if elapsed > 0 else 0.0,
+                }
+            return result
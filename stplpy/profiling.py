@@ -0,0 +1,272 @@
+"""
+Request profiling for Stplpy library.
+
+With a hook registered on a Transport, every request gets a RequestTrace
+holding monotonic start and end times of its lifecycle phases:
+
+    breaker        circuit breaker check
+    queue          waiting for a scheduler slot
+    rate_limit     waiting for a rate limiter token
+    connect        opening a new connection, including DNS resolution
+    tls            TLS handshake of a new connection
+    server         request sent until response headers arrived
+    download       reading the response body
+    decode         response.json()
+    error_mapping  turning an error response into a StudyPlusError
+    hooks          running the registered hooks
+
+Connection phases only appear when a request opened a new connection.
+Hooks run once the response body has been read: when the request returns,
+or for stream=True requests when the body iterator finishes or the
+response is closed. decode and error_mapping may happen afterwards and are
+appended to the same trace object.
+RequestProfiler is a hook that keeps recent traces and summarizes them per
+endpoint or exports them in the Chrome trace event format (viewable in
+chrome://tracing or Perfetto).
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+PHASES = (
+    "breaker", "queue", "rate_limit", "connect", "tls", "server", "download", "decode", "error_mapping", "hooks"
+)
+
+_current = threading.local()
+
+
+class RequestTrace:
+    """
+    Phase timings of one request.
+
+    Args:
+        method: HTTP method
+        url: Request URL
+        endpoint: Endpoint name (see transport.endpoint_name)
+    """
+
+    def __init__(self, method: str, url: str, endpoint: str):
+        self.method = method.upper()
+        self.url = url
+        self.endpoint = endpoint
+        self.thread_id = threading.get_ident()
+        self.start = time.monotonic()
+        self.end: Optional[float] = None
+        self.status_code: Optional[int] = None
+        self.error: Optional[str] = None
+        self.phases: List[Tuple[str, float, float]] = []
+
+    def add(self, phase: str, start: float, end: Optional[float] = None) -> None:
+        """Record a phase lasting from start to end (now if None)."""
+        self.phases.append((phase, start, time.monotonic() if end is None else end))
+
+    def durations(self) -> Dict[str, float]:
+        """Get the total seconds spent in each phase."""
+        totals: Dict[str, float] = {}
+        for phase, start, end in self.phases:
+            totals[phase] = totals.get(phase, 0.0) + end - start
+        return totals
+
+    @property
+    def duration(self) -> float:
+        """Seconds from the request call until it returned (or until now)."""
+        return (self.end or time.monotonic()) - self.start
+
+
+RequestHook = Callable[[RequestTrace], None]
+
+
+@contextmanager
+def tracing(trace: Optional[RequestTrace]) -> Iterator[None]:
+    """Make trace the calling thread's current trace while a request is sent."""
+    _current.trace = trace
+    try:
+        yield
+    finally:
+        # Kept after the request so follow-up phases (error mapping) can be added.
+        _current.last = trace
+        _current.trace = None
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Time a block as a phase of the calling thread's most recent traced request."""
+    trace = getattr(_current, "last", None)
+    if trace is None:
+        yield
+        return
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        trace.add(name, start)
+
+
+def _active_trace() -> Optional[RequestTrace]:
+    return getattr(_current, "trace", None)
+
+
+class _TimedConnectionMixin:
+    def _new_conn(self) -> Any:
+        trace = _active_trace()
+        start = time.monotonic()
+        sock = super()._new_conn()
+        if trace is not None:
+            trace.add("connect", start)
+        return sock
+
+    def connect(self) -> None:
+        trace = _active_trace()
+        start = time.monotonic()
+        super().connect()
+        if trace is not None and isinstance(self, HTTPSConnection):
+            connected = max((end for name, _, end in trace.phases if name == "connect" and end >= start), default=start)
+            trace.add("tls", connected)
+
+
+class _TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose new connections report connect and TLS phases to the current trace."""
+
+    def init_poolmanager(self, *args: Any, **kwargs: Any) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": _TimedHTTPConnectionPool, "https": _TimedHTTPSConnectionPool}
+
+
+class RequestProfiler:
+    """
+    Hook collecting request traces for per-endpoint breakdowns and Chrome traces.
+
+    Example:
+        profiler = RequestProfiler()
+        cl.transport.add_hook(profiler)
+        ...
+        print(profiler.breakdown()["timeline_feeds/followee"]["phases"])
+        profiler.save_chrome_trace("trace.json")
+
+    Args:
+        max_traces: Most recent traces kept
+    """
+
+    def __init__(self, max_traces: int = 10000):
+        self._traces: Deque[RequestTrace] = deque(maxlen=max_traces)
+        self._lock = threading.Lock()
+
+    def __call__(self, trace: RequestTrace) -> None:
+        with self._lock:
+            self._traces.append(trace)
+
+    def traces(self) -> List[RequestTrace]:
+        """Get the kept traces, oldest first."""
+        with self._lock:
+            return list(self._traces)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._traces.clear()
+
+    def breakdown(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Summarize the kept traces per endpoint.
+
+        Returns:
+            Dictionary mapping endpoint names to requests, errors, total and
+            mean request seconds, and per phase its total, mean (per request
+            that had the phase), max seconds and share of the total time
+        """
+        result: Dict[str, Dict[str, Any]] = {}
+        for trace in self.traces():
+            stats = result.setdefault(trace.endpoint, {"requests": 0, "errors": 0, "total": 0.0, "phases": {}})
+            stats["requests"] += 1
+            stats["errors"] += trace.error is not None or (trace.status_code or 0) >= 400
+            stats["total"] += trace.duration
+            for name, seconds in trace.durations().items():
+                phase_stats = stats["phases"].setdefault(name, {"count": 0, "total": 0.0, "max": 0.0})
+                phase_stats["count"] += 1
+                phase_stats["total"] += seconds
+                phase_stats["max"] = max(phase_stats["max"], seconds)
+        for stats in result.values():
+            stats["mean"] = stats["total"] / stats["requests"]
+            ordered = {}
+            for name in PHASES:
+                if name in stats["phases"]:
+                    phase_stats = stats["phases"][name]
+                    phase_stats["mean"] = phase_stats["total"] / phase_stats["count"]
+                    phase_stats["share"] = phase_stats["total"] / stats["total"] if stats["total"] else 0.0
+                    ordered[name] = phase_stats
+            stats["phases"] = ordered
+        return result
+
+    def chrome_trace(self) -> Dict[str, Any]:
+        """
+        Export the kept traces as Chrome trace events.
+
+        Each request is a complete ("X") event on its thread's track with its
+        phases as nested events; times are microseconds since the first trace.
+
+        Returns:
+            Dictionary with traceEvents and displayTimeUnit, ready for json.dump
+        """
+        traces = self.traces()
+        origin = min((trace.start for trace in traces), default=0.0)
+        pid = os.getpid()
+        events = []
+        for trace in traces:
+            end = max([trace.end or time.monotonic()] + [phase_end for _, _, phase_end in trace.phases])
+            args = {"url": trace.url, "status_code": trace.status_code}
+            if trace.error is not None:
+                args["error"] = trace.error
+            events.append({
+                "name": f"{trace.method} {trace.endpoint}",
+                "cat": "request",
+                "ph": "X",
+                "ts": (trace.start - origin) * 1e6,
+                "dur": (end - trace.start) * 1e6,
+                "pid": pid,
+                "tid": trace.thread_id,
+                "args": args,
+            })
+            for name, start, phase_end in trace.phases:
+                events.append({
+                    "name": name,
+                    "cat": "phase",
+                    "ph": "X",
+                    "ts": (start - origin) * 1e6,
+                    "dur": (phase_end - start) * 1e6,
+                    "pid": pid,
+                    "tid": trace.thread_id,
+                })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def save_chrome_trace(self, path: str) -> None:
+        """
+        Write the Chrome trace events to a JSON file.
+
+        Args:
+            path: Output file path
+        """
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f)
@@ -0,0 +1,186 @@
+"""
+Top-K rankings for Stplpy library.
+
+TopK keeps the K best items seen so far in a bounded min-heap, so follower
+or followee lists can be streamed page by page and ranked in O(K) memory.
+"""
+import heapq
+import itertools
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from .user import User
+
+KeyFunction = Callable[[Dict[str, Any]], Optional[float]]
+
+# Marks the keys of items without an id, which never collide with real ids.
+_ANONYMOUS = object()
+
+
+def _field_getter(field: str) -> KeyFunction:
+    def get(item: Dict[str, Any]) -> Optional[float]:
+        value = item.get(field)
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return None
+        return value
+    return get
+
+
+class TopK:
+    """
+    Bounded ranking of the K items with the highest key.
+
+    Pushing an item whose id is already ranked replaces its previous entry,
+    so refreshed pages update the ranking in place. The old heap entry is
+    left behind and skipped once it reaches the top (lazy deletion), so a
+    refresh costs O(log K). Items without an id are ranked as distinct
+    entries. Items that fell out of the top K are not remembered: if a
+    ranked item's value later drops, an item evicted earlier cannot take
+    its place until it is pushed again.
+
+    Args:
+        k: Number of items to keep
+        key: Numeric field name or function returning the ranking value
+            (items without a numeric value are ignored)
+        id_field: Field identifying an item across refreshes
+    """
+
+    def __init__(self, k: int, key: Union[str, KeyFunction] = "recent_record_seconds", id_field: str = "user_id"):
+        if k < 1:
+            raise ValueError("k must be at least 1")
+        self.k = k
+        self.key = _field_getter(key) if isinstance(key, str) else key
+        self.id_field = id_field
+        self._heap: List[Tuple[float, int, Any]] = []
+        self._members: Dict[Any, Tuple[float, int, Dict[str, Any]]] = {}
+        self._sequence = itertools.count()
+        self.seen = 0
+
+    def _is_live(self, entry: Tuple[float, int, Any]) -> bool:
+        member = self._members.get(entry[2])
+        return member is not None and member[1] == entry[1]
+
+    def _prune(self) -> None:
+        """Drop superseded entries from the top of the heap."""
+        while self._heap and not self._is_live(self._heap[0]):
+            heapq.heappop(self._heap)
+
+    def push(self, item: Dict[str, Any]) -> None:
+        """
+        Offer an item to the ranking.
+
+        Args:
+            item: Item dictionary (e.g. a user from get_followers)
+        """
+        value = self.key(item)
+        if value is None:
+            return
+        self.seen += 1
+        sequence = next(self._sequence)
+        item_id = item.get(self.id_field)
+        item_key = item_id if item_id is not None else (_ANONYMOUS, sequence)
+        # Negative sequence: among equal values the earlier item ranks higher.
+        # It also versions the entry, telling live heap entries from stale ones.
+        entry = (value, -sequence, item_key)
+
+        if item_key not in self._members and len(self._members) >= self.k:
+            self._prune()
+            if entry[:2] <= self._heap[0][:2]:
+                return
+            del self._members[heapq.heappop(self._heap)[2]]
+        self._members[item_key] = (value, entry[1], item)
+        heapq.heappush(self._heap, entry)
+        if len(self._heap) > 2 * self.k:
+            # Bound memory held by stale entries; amortized O(1) per push.
+            self._heap = [(v, s, key) for key, (v, s, _) in self._members.items()]
+            heapq.heapify(self._heap)
+
+    def extend(self, items: Iterable[Dict[str, Any]]) -> "TopK":
+        """
+        Offer many items to the ranking.
+
+        Args:
+            items: Item dictionaries
+
+        Returns:
+            The ranking itself, for chaining
+        """
+        for item in items:
+            self.push(item)
+        return self
+
+    def threshold(self) -> Optional[float]:
+        """
+        Get the value an item must beat to enter a full ranking.
+
+        Returns:
+            The lowest ranked value, or None while fewer than K items are ranked
+        """
+        if len(self._members) < self.k:
+            return None
+        self._prune()
+        return self._heap[0][0]
+
+    def items(self) -> List[Dict[str, Any]]:
+        """
+        Get the ranked items.
+
+        Returns:
+            Items sorted from highest to lowest value
+        """
+        ranked = sorted(self._members.values(), key=lambda entry: (entry[0], entry[1]), reverse=True)
+        return [item for _, _, item in ranked]
+
+    def __len__(self) -> int:
+        return len(self._members)
+
+
+def top_followers(
+    user: User,
+    target_id: str,
+    k: int = 10,
+    key: Union[str, KeyFunction] = "recent_record_seconds",
+    limit: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Rank a user's followers by a numeric field, streaming page by page.
+
+    Args:
+        user: User client
+        target_id: User whose followers are ranked
+        k: Number of followers to return
+        key: Numeric field name or function returning the ranking value
+        limit: Maximum number of pages to fetch (all pages if None)
+
+    Returns:
+        Top k followers sorted from highest to lowest value
+    """
+    ranking = TopK(k, key)
+    for page in user.iter_followers(target_id, limit):
+        ranking.extend(page)
+    return ranking.items()
+
+
+def top_followees(
+    user: User,
+    target_id: str,
+    k: int = 10,
+    key: Union[str, KeyFunction] = "recent_record_seconds",
+    limit: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Rank a user's followees by a numeric field, streaming page by page.
+
+    Args:
+        user: User client
+        target_id: User whose followees are ranked
+        k: Number of followees to return
+        key: Numeric field name or function returning the ranking value
+        limit: Maximum number of pages to fetch (all pages if None)
+
+    Returns:
+        Top k followees sorted from highest to lowest value
+    """
+    ranking = TopK(k, key)
+    for page in user.iter_followees(target_id, limit):
+        ranking.extend(page)
+    return ranking.items()
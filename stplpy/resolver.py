@@ -0,0 +1,221 @@
+"""
+Batched user profile resolution for Stplpy library.
+
+UserResolver takes profile lookups from any number of threads (or asyncio
+tasks), gathers them for a short window, drops repeated usernames, answers
+cache hits at once and fetches the misses concurrently. Every caller gets
+its own future, while each distinct username is fetched only once however
+many callers asked for it.
+"""
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError, ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional
+
+from .exceptions import ResourceNotFoundError
+from .user import User
+
+logger = logging.getLogger(__name__)
+
+
+class UserResolver:
+    """
+    Micro-batching resolver of usernames to profiles.
+
+    Lookups go through User.get_user, whose endpoint is addressed by
+    username; numeric user ids are not accepted there.
+
+    Example:
+        with UserResolver(cl.user) as resolver:
+            profiles = resolver.resolve_all(extract_usernames(feeds))
+
+    Args:
+        user: User used for lookups (its cache is consulted first)
+        window: Seconds to gather requests after the first one arrives
+        max_batch: Requests taken into one batch at most
+        max_workers: Profiles fetched concurrently
+    """
+
+    def __init__(self, user: User, window: float = 0.01, max_batch: int = 100, max_workers: int = 8):
+        self.user = user
+        self.window = window
+        self.max_batch = max_batch
+        self.max_workers = max_workers
+        self.batches = 0
+        self.requested = 0
+        self.cache_hits = 0
+        self.fetched = 0
+        # Futures waiting on each username, from the first request until its
+        # fetch completes, so later callers join one already queued or in flight.
+        self._waiters: Dict[str, List[Future]] = {}
+        self._queue: List[str] = []
+        self._first_queued: Optional[float] = None
+        self._changed = threading.Condition()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    def __enter__(self) -> "UserResolver":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def _start(self) -> None:
+        if self._thread is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="stplpy-resolver")
+            self._thread = threading.Thread(target=self._run, name="stplpy-resolver-batcher", daemon=True)
+            self._thread.start()
+
+    def resolve(self, user_name: str) -> "Future[Dict[str, Any]]":
+        """
+        Request a profile.
+
+        Args:
+            user_name: Username, as accepted by User.get_user
+
+        Returns:
+            Future resolving to the profile, or raising the lookup's error
+        """
+        future: "Future[Dict[str, Any]]" = Future()
+        user_name = str(user_name)
+        with self._changed:
+            if self._closed:
+                raise RuntimeError("UserResolver is closed")
+            self._start()
+            self.requested += 1
+            waiters = self._waiters.get(user_name)
+            if waiters is not None:
+                waiters.append(future)
+                return future
+            self._waiters[user_name] = [future]
+            if not self._queue:
+                self._first_queued = time.monotonic()
+            self._queue.append(user_name)
+            self._changed.notify_all()
+        return future
+
+    def resolve_all(self, user_names: Iterable[str], skip_missing: bool = True) -> Dict[str, Dict[str, Any]]:
+        """
+        Resolve many profiles and wait for them.
+
+        Args:
+            user_names: Usernames (duplicates are fetched once)
+            skip_missing: Leave out users that do not exist instead of raising
+
+        Returns:
+            Dictionary mapping each username to its profile
+        """
+        futures = {str(user_name): self.resolve(user_name) for user_name in user_names}
+        profiles = {}
+        for user_name, future in futures.items():
+            try:
+                profiles[user_name] = future.result()
+            except ResourceNotFoundError:
+                if not skip_missing:
+                    raise
+        return profiles
+
+    async def resolve_async(self, user_name: str) -> Dict[str, Any]:
+        """Awaitable form of resolve for use from an event loop."""
+        return await asyncio.wrap_future(self.resolve(user_name))
+
+    async def resolve_all_async(self, user_names: Iterable[str], skip_missing: bool = True) -> Dict[str, Dict[str, Any]]:
+        """Awaitable form of resolve_all for use from an event loop."""
+        names = list(dict.fromkeys(str(user_name) for user_name in user_names))
+        results = await asyncio.gather(*(self.resolve_async(name) for name in names), return_exceptions=True)
+        profiles = {}
+        for name, result in zip(names, results):
+            if isinstance(result, ResourceNotFoundError) and skip_missing:
+                continue
+            if isinstance(result, BaseException):
+                raise result
+            profiles[name] = result
+        return profiles
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get resolver counters.
+
+        Returns:
+            Dictionary with requested, batches, cache_hits and fetched
+        """
+        with self._changed:
+            return {
+                "requested": self.requested,
+                "batches": self.batches,
+                "cache_hits": self.cache_hits,
+                "fetched": self.fetched,
+            }
+
+    def close(self) -> None:
+        """Resolve the requests already made, then stop the batching thread."""
+        with self._changed:
+            self._closed = True
+            self._changed.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._executor.shutdown(wait=True)
+
+    # __________Batching__________
+    def _next_batch(self) -> Optional[List[str]]:
+        """Wait for the window of the oldest queued request; None once closed and drained."""
+        with self._changed:
+            while True:
+                if self._queue:
+                    remaining = self._first_queued + self.window - time.monotonic()
+                    if self._closed or remaining <= 0 or len(self._queue) >= self.max_batch:
+                        batch, self._queue = self._queue[:self.max_batch], self._queue[self.max_batch:]
+                        self._first_queued = time.monotonic() if self._queue else None
+                        self.batches += 1
+                        return batch
+                    self._changed.wait(remaining)
+                elif self._closed:
+                    return None
+                else:
+                    self._changed.wait()
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            for user_name in batch:
+                try:
+                    cached = self.user.get_cached_user(user_name)
+                except Exception as e:
+                    logger.warning(f"Profile cache lookup for '{user_name}' failed: {e}")
+                    cached = None
+                if cached is not None:
+                    self._complete(user_name, cached, None, cache_hit=True)
+                else:
+                    self._executor.submit(self._fetch, user_name)
+
+    def _fetch(self, user_name: str) -> None:
+        try:
+            profile = self.user.get_user(user_name)
+        except Exception as e:
+            self._complete(user_name, None, e)
+        else:
+            self._complete(user_name, profile, None)
+
+    def _complete(
+        self, user_name: str, profile: Optional[Dict[str, Any]], error: Optional[BaseException], cache_hit: bool = False
+    ) -> None:
+        with self._changed:
+            waiters = self._waiters.pop(user_name, [])
+            if cache_hit:
+                self.cache_hits += 1
+            elif error is None:
+                self.fetched += 1
+        for index, future in enumerate(waiters):
+            try:
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    # Every caller gets its own copy to mutate.
+                    future.set_result(profile if index == 0 else dict(profile))
+            except InvalidStateError:
+                pass  # Cancelled by its caller.
@@ -0,0 +1,92 @@
+"""
+Retry helpers for Stplpy library.
+"""
+import random
+import time
+from typing import Any, Callable, Optional, TypeVar
+
+from requests.exceptions import RequestException
+
+from .exceptions import APIError, CircuitOpenError, RateLimitError
+from .ratelimit import RateLimiter
+
+T = TypeVar("T")
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    Check whether a failed request is worth retrying.
+
+    Rate limiting, open circuit breakers, network errors and 5xx responses
+    are transient; other errors (authentication, not found, validation, 4xx)
+    are not.
+
+    Args:
+        error: Exception raised by a request
+
+    Returns:
+        True if the request may succeed when retried
+    """
+    if isinstance(error, (RateLimitError, CircuitOpenError, RequestException)):
+        return True
+    if isinstance(error, APIError):
+        return error.status_code is None or error.status_code >= 500
+    return False
+
+
+def backoff_delay(attempt: int, base: float = 1.0, maximum: float = 60.0) -> float:
+    """
+    Compute a jittered exponential backoff delay.
+
+    Args:
+        attempt: Number of attempts made so far (1 for the first retry)
+        base: Delay after the first attempt in seconds
+        maximum: Upper bound of the delay in seconds
+
+    Returns:
+        Delay in seconds
+    """
+    delay = min(maximum, base * (2 ** (attempt - 1)))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def call_with_retry(
+    func: Callable[..., T],
+    *args: Any,
+    max_attempts: int = 5,
+    base_backoff: float = 1.0,
+    max_backoff: float = 60.0,
+    rate_limiter: Optional[RateLimiter] = None,
+    **kwargs: Any
+) -> T:
+    """
+    Call func, retrying transient failures with exponential backoff.
+
+    Args:
+        func: Function performing the request
+        *args: Positional arguments for func
+        max_attempts: Maximum number of calls
+        base_backoff: Delay after the first failure in seconds
+        max_backoff: Upper bound of the delay in seconds
+        rate_limiter: Limiter to acquire before each call (and to drain after a 429)
+        **kwargs: Keyword arguments for func
+
+    Returns:
+        The result of func
+    """
+    attempt = 0
+    while True:
+        attempt += 1
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            if attempt >= max_attempts or not is_retryable(e):
+                raise
+            delay = backoff_delay(attempt, base_backoff, max_backoff)
+            if isinstance(e, CircuitOpenError):
+                delay = max(delay, e.retry_after)
+            if isinstance(e, RateLimitError) and rate_limiter is not None:
+                rate_limiter.penalize(delay)
+            time.sleep(delay)
@@ -0,0 +1,175 @@
+"""
+Priority request scheduling for Stplpy library.
+
+RequestScheduler limits the number of requests in flight and hands out free
+slots with weighted fair queuing across priority classes. With the default
+weights an interactive write queued behind thousands of bulk reads gets the
+next free slot. Given a rate limiter, the scheduler also hands out rate
+tokens in the same order, so a write is not starved of the rate budget by
+bulk requests that already hold slots.
+"""
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+from .ratelimit import RateLimiter
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+
+DEFAULT_WEIGHTS = {INTERACTIVE: 16.0, BULK: 1.0}
+
+
+class _ClassStats:
+    def __init__(self) -> None:
+        self.waiting = 0
+        self.in_flight = 0
+        self.granted = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.recent_waits: Deque[float] = deque(maxlen=1000)
+
+
+class RequestScheduler:
+    """
+    Concurrency limiter with weighted fair queuing across priority classes.
+
+    Each waiting request gets a virtual finish tag of
+    max(last tag of its class, virtual clock) + 1 / weight, and a freed slot
+    goes to the smallest tag. A class with weight w therefore gets about w
+    slots for every slot of a weight-1 class while both are backlogged, and a
+    newly arriving high-weight request overtakes the backlog.
+
+    With a rate limiter, a request is admitted only once it holds both a slot
+    and a rate token. One waiting thread at a time takes the next token and
+    hands it, with the free slot, to the smallest tag queued at that moment,
+    so a write arriving while the budget is exhausted is served first.
+
+    Args:
+        slots: Maximum number of requests in flight
+        weights: Weight per priority class (unknown classes get weight 1)
+        rate_limiter: Limiter whose tokens are granted in scheduling order
+    """
+
+    def __init__(self, slots: int = 4, weights: Optional[Dict[str, float]] = None, rate_limiter: Optional[RateLimiter] = None):
+        if slots < 1:
+            raise ValueError("slots must be at least 1")
+        self.slots = slots
+        self.weights = dict(DEFAULT_WEIGHTS if weights is None else weights)
+        self.rate_limiter = rate_limiter
+        self._free = slots
+        self._clock = 0.0
+        self._last_tag: Dict[str, float] = {}
+        self._queue: List[Tuple[float, int, str, List[bool]]] = []
+        self._sequence = itertools.count()
+        self._stats: Dict[str, _ClassStats] = {}
+        self._dispatching = False
+        self._changed = threading.Condition(threading.Lock())
+
+    def _class_stats(self, priority: str) -> _ClassStats:
+        stats = self._stats.get(priority)
+        if stats is None:
+            stats = self._stats[priority] = _ClassStats()
+        return stats
+
+    def _grant(self, priority: str, waited: float) -> None:
+        stats = self._class_stats(priority)
+        stats.in_flight += 1
+        stats.granted += 1
+        stats.total_wait += waited
+        stats.max_wait = max(stats.max_wait, waited)
+        stats.recent_waits.append(waited)
+
+    def acquire(self, priority: str = BULK) -> None:
+        """
+        Wait for a request slot (and a rate token when the scheduler has a limiter).
+
+        Args:
+            priority: Priority class of the request
+        """
+        with self._changed:
+            if self._free > 0 and not self._queue and not self._dispatching and (
+                self.rate_limiter is None or self.rate_limiter.try_acquire()
+            ):
+                self._free -= 1
+                self._grant(priority, 0.0)
+                return
+            weight = self.weights.get(priority, 1.0)
+            tag = max(self._last_tag.get(priority, 0.0), self._clock) + 1.0 / weight
+            self._last_tag[priority] = tag
+            granted = [False]
+            heapq.heappush(self._queue, (tag, next(self._sequence), priority, granted))
+            self._class_stats(priority).waiting += 1
+            start = time.monotonic()
+
+            while not granted[0]:
+                if self._free > 0 and self._queue and not self._dispatching:
+                    self._dispatch()
+                else:
+                    self._changed.wait()
+            self._grant(priority, time.monotonic() - start)
+
+    def _dispatch(self) -> None:
+        # Called with the lock held; waits for a rate token without it, then
+        # gives the token and a slot to whichever request is first in line now.
+        if self.rate_limiter is not None:
+            self._dispatching = True
+            self._changed.release()
+            try:
+                self.rate_limiter.acquire()
+            finally:
+                self._changed.acquire()
+                self._dispatching = False
+        tag, _, priority, granted = heapq.heappop(self._queue)
+        self._clock = tag
+        self._free -= 1
+        self._class_stats(priority).waiting -= 1
+        granted[0] = True
+        self._changed.notify_all()
+
+    def release(self, priority: str = BULK) -> None:
+        """
+        Return a request slot, handing it to the next queued request.
+
+        Args:
+            priority: Priority class the slot was acquired with
+        """
+        with self._changed:
+            self._class_stats(priority).in_flight -= 1
+            self._free += 1
+            self._changed.notify_all()
+
+    @contextmanager
+    def slot(self, priority: str = BULK) -> Iterator[None]:
+        """Hold a request slot for the duration of the block."""
+        self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release(priority)
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get per-class queue depth and wait-time metrics.
+
+        Returns:
+            Dictionary mapping priority classes to queue_depth, in_flight,
+            granted, mean_wait, p95_wait and max_wait (seconds)
+        """
+        with self._changed:
+            result = {}
+            for priority, stats in self._stats.items():
+                waits = sorted(stats.recent_waits)
+                result[priority] = {
+                    "queue_depth": stats.waiting,
+                    "in_flight": stats.in_flight,
+                    "granted": stats.granted,
+                    "mean_wait": stats.total_wait / stats.granted if stats.granted else 0.0,
+                    "p95_wait": waits[int(len(waits) * 0.95)] if waits else 0.0,
+                    "max_wait": stats.max_wait,
+                }
+            return result
@@ -0,0 +1,137 @@
+"""
+Incremental JSON parsing for Stplpy library.
+
+JSONArrayStream walks one array field of a JSON object (e.g. "feeds",
+"users" or "comments") as the response body arrives and yields its items
+one at a time, so peak memory follows the largest item rather than the
+whole page. The object's other fields (such as the "next" cursor) are
+collected along the way.
+"""
+import codecs
+import json
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Union
+
+STREAM_CHUNK_SIZE = 16 * 1024
+
+_WHITESPACE = " \t\n\r"
+
+# Consumed text is dropped from the buffer once this many characters have piled up.
+_COMPACT_THRESHOLD = 64 * 1024
+
+
+class JSONArrayStream:
+    """
+    Lazily parse the items of one array field of a streamed JSON object.
+
+    Example:
+        stream = JSONArrayStream(response.iter_content(STREAM_CHUNK_SIZE), "feeds", response.close)
+        for feed in stream:
+            ...
+        cursor = stream.fields.get("next")
+
+    Args:
+        chunks: Body chunks as bytes (UTF-8) or str
+        key: Name of the top-level array field to stream
+        close: Called when iteration ends or is abandoned (e.g. response.close)
+    """
+
+    def __init__(self, chunks: Iterable[Union[bytes, str]], key: str, close: Optional[Callable[[], None]] = None):
+        self.key = key
+        self.fields: Dict[str, Any] = {}
+        self._chunks = iter(chunks)
+        self._close = close
+        self._decoder = json.JSONDecoder()
+        self._text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._pos = 0
+        self._exhausted = False
+
+    def _read(self) -> bool:
+        """Append the next chunk to the buffer; return False at the end of the body."""
+        if self._exhausted:
+            return False
+        for chunk in self._chunks:
+            text = self._text_decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+            if not text:
+                continue
+            if self._pos > _COMPACT_THRESHOLD:
+                self._buffer = self._buffer[self._pos:]
+                self._pos = 0
+            self._buffer += text
+            return True
+        self._buffer += self._text_decoder.decode(b"", final=True)
+        self._exhausted = True
+        return False
+
+    def _peek(self) -> str:
+        """Skip whitespace and return the next character ("" at the end of the body)."""
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._read():
+                return ""
+
+    def _expect(self, allowed: str) -> str:
+        char = self._peek()
+        if not char or char not in allowed:
+            raise json.JSONDecodeError(f"Expecting one of {allowed!r}", self._buffer, self._pos)
+        self._pos += 1
+        return char
+
+    def _value(self) -> Any:
+        """Decode the complete JSON value at the current position, reading more as needed."""
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if not self._read():
+                    raise
+                continue
+            # A number ending the buffer may continue in the next chunk.
+            if end == len(self._buffer) and self._read():
+                continue
+            self._pos = end
+            return value
+
+    def __iter__(self) -> Iterator[Any]:
+        try:
+            self._expect("{")
+            if self._peek() == "}":
+                self._pos += 1
+                return
+            while True:
+                name = self._value()
+                self._expect(":")
+                if name == self.key and self._peek() == "[":
+                    self._pos += 1
+                    if self._peek() == "]":
+                        self._pos += 1
+                    else:
+                        while True:
+                            yield self._value()
+                            if self._expect(",]") == "]":
+                                break
+                else:
+                    self.fields[name] = self._value()
+                if self._expect(",}") == "}":
+                    return
+        finally:
+            if self._close is not None:
+                self._close()
+
+
+def iter_json_array(chunks: Iterable[Union[bytes, str]], key: str) -> Iterator[Any]:
+    """
+    Yield the items of one top-level array field of a streamed JSON object.
+
+    Args:
+        chunks: Body chunks as bytes (UTF-8) or str
+        key: Name of the array field
+
+    Returns:
+        Iterator over the array's items
+    """
+    return iter(JSONArrayStream(chunks, key))
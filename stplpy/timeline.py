@@ -1,9 +1,11 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-import random
-import string
-from typing import Dict, List, Optional, Any
+import itertools
+import queue
+import threading
+from types import MappingProxyType
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Any
 
-import requests
 from requests.exceptions import HTTPError
 
 from .exceptions import (
@@ -12,32 +14,107 @@ from .exceptions import (
     ResourceNotFoundError,
     RateLimitError
 )
+from .memory import MemoryBudget, estimate_size
+from .profiling import phase
+from .streaming import STREAM_CHUNK_SIZE, JSONArrayStream
+from .tokens import derive_token, generate_token
+from .transport import Transport
+
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def _read_ahead(
+    pages: Iterator[Dict[str, Any]], depth: int, budget: Optional[MemoryBudget] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Fetch up to `depth` pages ahead of the consumer in a background thread.
+
+    With a budget, each buffered page reserves its size under "prefetch"
+    until it is consumed, so reading ahead pauses while memory is short.
+    """
+    slots = threading.Semaphore(depth)
+    buffer: "queue.Queue[Any]" = queue.Queue()
+    stop = threading.Event()
+    closing = threading.Lock()
+
+    def produce() -> None:
+        try:
+            while True:
+                while not slots.acquire(timeout=0.1):
+                    if stop.is_set():
+                        return
+                if stop.is_set():
+                    return
+                page = next(pages, _DONE)
+                if page is _DONE:
+                    buffer.put((page, 0))
+                    return
+                size = estimate_size(page) if budget is not None else 0
+                if size:
+                    while not budget.reserve("prefetch", size, timeout=0.1):
+                        if stop.is_set():
+                            return
+                with closing:
+                    if stop.is_set():
+                        if size:
+                            budget.release("prefetch", size)
+                        return
+                    buffer.put((page, size))
+        except BaseException as e:
+            buffer.put((_Failure(e), 0))
+
+    threading.Thread(target=produce, name="stplpy-prefetch", daemon=True).start()
+    try:
+        while True:
+            page, size = buffer.get()
+            slots.release()
+            if size:
+                budget.release("prefetch", size)
+            if page is _DONE:
+                return
+            if isinstance(page, _Failure):
+                raise page.error
+            yield page
+    finally:
+        with closing:
+            stop.set()
+            # Pages buffered but never consumed give back their reservation.
+            while not buffer.empty():
+                size = buffer.get_nowait()[1]
+                if size:
+                    budget.release("prefetch", size)
 
 
 class Timeline:
-    def __init__(self, token: str):
+    def __init__(self, token: str, transport: Optional[Transport] = None, budget: Optional[MemoryBudget] = None):
         self.token = token
-        self.headers = {
+        self.transport = transport or Transport()
+        self.budget = budget
+        self.headers = MappingProxyType({
             "User-Agent": "Studyplus/101 CFNetwork/1474 Darwin/23.0.0",
             "Authorization": f"OAuth {token}"
-        }
+        })
 
     def _handle_http_error(self, result, default_message: str, http_err: HTTPError):
         """Handle HTTP errors and raise appropriate custom exceptions."""
-        if result.status_code == 404:
-            raise ResourceNotFoundError(f"Resource not found") from http_err
-        elif result.status_code in (401, 403):
-            raise AuthenticationError(f"[{result.status_code}] Authentication failed") from http_err
-        elif result.status_code == 429:
-            raise RateLimitError(f"Rate limit exceeded") from http_err
-        else:
-            raise APIError(f"[{result.status_code}] {default_message}", result.status_code) from http_err
-
-    def create_token(self, n: int = 10) -> str:
-        randlst = [
-            random.choice(string.ascii_letters + string.digits) for i in range(n)
-        ]
-        return "".join(randlst)
+        with phase("error_mapping"):
+            if result.status_code == 404:
+                raise ResourceNotFoundError(f"Resource not found") from http_err
+            elif result.status_code in (401, 403):
+                raise AuthenticationError(f"[{result.status_code}] Authentication failed") from http_err
+            elif result.status_code == 429:
+                raise RateLimitError(f"Rate limit exceeded") from http_err
+            else:
+                raise APIError(f"[{result.status_code}] {default_message}", result.status_code) from http_err
+
+    def create_token(self, n: int = 10, payload: Optional[Dict[str, Any]] = None) -> str:
+        """Create a random post_token, or one derived from `payload` for idempotent retries."""
+        return derive_token(payload, n) if payload is not None else generate_token(n)
 
     def get_post_detail(
         self,
@@ -56,16 +133,91 @@ class Timeline:
             else:
                 url += f"?include_comments=t&comment_count={str(comment_count)}"
         try:
-            result = requests.get(url, headers=self.headers)
+            result = self.transport.get(url, headers=self.headers)
             result.raise_for_status()
             return result.json()
         except HTTPError as http_err:
             self._handle_http_error(result, "Failed to get post detail", http_err)
 
+    def get_post_details(
+        self,
+        post_ids: Iterable[str],
+        include_like_users: bool = False,
+        like_user_count: int = 100,
+        include_comments: bool = False,
+        comment_count: int = 100,
+        fields: Optional[Iterable[str]] = None,
+        max_workers: int = 8
+    ) -> Dict[str, Dict[str, Any]]:
+        """Fetch details for many posts concurrently, keeping only `fields` if given. Missing posts are skipped."""
+        keep = set(fields) if fields is not None else None
+
+        def fetch(post_id: str) -> Optional[Dict[str, Any]]:
+            try:
+                detail = self.get_post_detail(post_id, include_like_users, like_user_count, include_comments, comment_count)
+            except ResourceNotFoundError:
+                return None
+            if keep is not None:
+                detail = {key: value for key, value in detail.items() if key in keep}
+            return detail
+
+        unique_ids = list(dict.fromkeys(post_ids))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            details = executor.map(fetch, unique_ids)
+            return {post_id: detail for post_id, detail in zip(unique_ids, details) if detail is not None}
+
+    @staticmethod
+    def _event_list_url(post_id: str, resource: str, per_page: int, until: Optional[str] = None) -> str:
+        url = f"https://api.studyplus.jp/2/timeline_events/{post_id}/{resource}?per_page={per_page}"
+        return f"{url}&until={until}" if until is not None else url
+
+    def get_post_comments(self, post_id: str, until: Optional[str] = None, per_page: int = 50) -> Dict[str, Any]:
+        url = self._event_list_url(post_id, "comments", per_page, until)
+        try:
+            result = self.transport.get(url, headers=self.headers)
+            result.raise_for_status()
+            return result.json()
+        except HTTPError as http_err:
+            self._handle_http_error(result, "Failed to get post comments", http_err)
+
+    def get_post_like_users(self, post_id: str, until: Optional[str] = None, per_page: int = 50) -> Dict[str, Any]:
+        url = self._event_list_url(post_id, "likes", per_page, until)
+        try:
+            result = self.transport.get(url, headers=self.headers)
+            result.raise_for_status()
+            return result.json()
+        except HTTPError as http_err:
+            self._handle_http_error(result, "Failed to get post like users", http_err)
+
+    def iter_post_comments(self, post_id: str, per_page: int = 50, stream: bool = False) -> Iterator[Dict[str, Any]]:
+        """Lazily yield a post's comments, fetching the next page only when the current one is consumed."""
+        if stream:
+            return self._stream_pages(
+                lambda until: self._event_list_url(post_id, "comments", per_page, until), "comments", "Failed to get post comments"
+            )
+        return self._iter_event_list(lambda until: self.get_post_comments(post_id, until, per_page), "comments")
+
+    def iter_post_like_users(self, post_id: str, per_page: int = 50, stream: bool = False) -> Iterator[Dict[str, Any]]:
+        """Lazily yield the users who liked a post, one page at a time."""
+        if stream:
+            return self._stream_pages(
+                lambda until: self._event_list_url(post_id, "likes", per_page, until), "users", "Failed to get post like users"
+            )
+        return self._iter_event_list(lambda until: self.get_post_like_users(post_id, until, per_page), "users")
+
+    def _iter_event_list(self, fetch: Callable[[Optional[str]], Dict[str, Any]], key: str) -> Iterator[Dict[str, Any]]:
+        until = None
+        while True:
+            result = fetch(until)
+            yield from result[key]
+            if not result.get("next"):
+                return
+            until = result["next"]
+
     def like_post(self, post_id: str) -> bool:
         url = f"https://api.studyplus.jp/2/timeline_events/{post_id}/likes/like"
         try:
-            result = requests.post(url, headers=self.headers)
+            result = self.transport.post(url, headers=self.headers)
             result.raise_for_status()
             return True
         except HTTPError as http_err:
@@ -74,17 +226,21 @@ class Timeline:
     def unlike_post(self, post_id: str) -> bool:
         url = f"https://api.studyplus.jp/2/timeline_events/{post_id}/likes/withdraw"
         try:
-            result = requests.post(url, headers=self.headers)
+            result = self.transport.post(url, headers=self.headers)
             result.raise_for_status()
             return True
         except HTTPError as http_err:
             self._handle_http_error(result, "Failed to unlike post", http_err)
 
-    def send_comment(self, post_id: str, text: str) -> Dict[str, Any]:
-        param = {"post_token": self.create_token(36), "comment": text}
+    def send_comment(
+        self, post_id: str, text: str, post_token: Optional[str] = None, idempotent: bool = False
+    ) -> Dict[str, Any]:
+        if post_token is None:
+            post_token = self.create_token(36, {"post_id": post_id, "comment": text} if idempotent else None)
+        param = {"post_token": post_token, "comment": text}
         url = f"https://api.studyplus.jp/2/timeline_events/{post_id}/comments"
         try:
-            result = requests.post(url, headers=self.headers, json=param)
+            result = self.transport.post(url, headers=self.headers, json=param)
             result.raise_for_status()
             return result.json()
         except HTTPError as http_err:
@@ -93,7 +249,7 @@ class Timeline:
     def unsend_comment(self, post_id: str, comment_id: str) -> bool:
         url = f"https://api.studyplus.jp/2/timeline_events/{post_id}/comments/{comment_id}"
         try:
-            result = requests.delete(url, headers=self.headers)
+            result = self.transport.delete(url, headers=self.headers)
             result.raise_for_status()
             return True
         except HTTPError as http_err:
@@ -104,8 +260,18 @@ class Timeline:
         material_code: Optional[str] = None,
         duration: int = 0,
         comment: str = "",
-        record_datetime: Optional[str] = None
+        record_datetime: Optional[str] = None,
+        post_token: Optional[str] = None,
+        idempotent: bool = False
     ) -> Dict[str, Any]:
+        """
+        Post a study record.
+
+        With `idempotent`, the post_token is derived from the record, so
+        posting the same record again (e.g. a retry after a timeout) is
+        deduplicated by the API. Pass an explicit record_datetime for this,
+        as the default "now" differs between calls.
+        """
         if record_datetime is None:
             record_datetime = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
         data = {
@@ -113,13 +279,15 @@ class Timeline:
             "duration": duration,
             "record_datetime": record_datetime,
             "comment": comment,
-            "post_token": self.create_token(),
         }
         if material_code:
             data["material_code"] = material_code
+        if post_token is None:
+            post_token = self.create_token(payload=data if idempotent else None)
+        data["post_token"] = post_token
         url = "https://api.studyplus.jp/2/study_records"
         try:
-            result = requests.post(url, headers=self.headers, json=data)
+            result = self.transport.post(url, headers=self.headers, json=data)
             result.raise_for_status()
             return result.json()
         except HTTPError as http_err:
@@ -128,122 +296,188 @@ class Timeline:
     def delete_study_record(self, record_number: int) -> Dict[str, Any]:
         url = f"https://api.studyplus.jp/2/study_records/{str(record_number)}"
         try:
-            result = requests.delete(url, headers=self.headers)
+            result = self.transport.delete(url, headers=self.headers)
             result.raise_for_status()
             return result.json()
         except HTTPError as http_err:
             self._handle_http_error(result, "Failed to delete study record", http_err)
 
+    @staticmethod
+    def _feed_url(path: str, until: Optional[str] = None) -> str:
+        url = f"https://api.studyplus.jp/2/{path}"
+        return f"{url}?until={until}" if until is not None else url
+
+    @staticmethod
+    def _achievement_path(target_goal: Optional[str]) -> str:
+        if target_goal is None:
+            return "study_achievements/feeds"
+        return f"study_achievements/feeds/study_goal/{target_goal}"
+
+    def _stream(self, url: str, key: str, default_message: str) -> JSONArrayStream:
+        """Request url with a streamed body and parse its `key` array incrementally."""
+        result = self.transport.get(url, headers=self.headers, stream=True)
+        try:
+            result.raise_for_status()
+        except HTTPError as http_err:
+            result.close()
+            self._handle_http_error(result, default_message, http_err)
+        return JSONArrayStream(result.iter_content(STREAM_CHUNK_SIZE), key, result.close)
+
+    def _stream_pages(
+        self,
+        url_for: Callable[[Optional[str]], str],
+        key: str,
+        default_message: str,
+        limit: Optional[int] = None,
+        until: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Yield `key` items parsed from the socket, page by page, following `next` cursors."""
+        pages = itertools.count() if limit is None else range(limit)
+        for _ in pages:
+            stream = self._stream(url_for(until), key, default_message)
+            yield from stream
+            until = stream.fields.get("next")
+            if not until:
+                return
+
     def get_followee_timeline(self, until: Optional[str] = None) -> Dict[str, Any]:
-        if until is not None:
-            url = f"https://api.studyplus.jp/2/timeline_feeds/followee?until={until}"
-        else:
-            url = f"https://api.studyplus.jp/2/timeline_feeds/followee"
+        url = self._feed_url("timeline_feeds/followee", until)
         try:
-            result = requests.get(url, headers=self.headers)
+            result = self.transport.get(url, headers=self.headers)
             result.raise_for_status()
             return result.json()
         except HTTPError as http_err:
             self._handle_http_error(result, "Failed to get followee timeline", http_err)
 
     def get_user_timeline(self, target_id: str, until: Optional[str] = None) -> Dict[str, Any]:
-        if until is not None:
-            url = f"https://api.studyplus.jp/2/timeline_feeds/user/{target_id}?until={until}"
-        else:
-            url = f"https://api.studyplus.jp/2/timeline_feeds/user/{target_id}"
+        url = self._feed_url(f"timeline_feeds/user/{target_id}", until)
         try:
-            result = requests.get(url, headers=self.headers)
+            result = self.transport.get(url, headers=self.headers)
             result.raise_for_status()
             return result.json()
         except HTTPError as http_err:
             self._handle_http_error(result, "Failed to get user timeline", http_err)
 
     def get_goal_timeline(self, target_id: str, until: Optional[str] = None) -> Dict[str, Any]:
-        if until is not None:
-            url = f"https://api.studyplus.jp/2/timeline_feeds/study_goal/{target_id}?until={until}"
-        else:
-            url = f"https://api.studyplus.jp/2/timeline_feeds/study_goal/{target_id}"
+        url = self._feed_url(f"timeline_feeds/study_goal/{target_id}", until)
         try:
-            result = requests.get(url, headers=self.headers)
+            result = self.transport.get(url, headers=self.headers)
             result.raise_for_status()
             return result.json()
         except HTTPError as http_err:
             self._handle_http_error(result, "Failed to get goal timeline", http_err)
 
     def get_achievement_timeline(self, target_goal: Optional[str] = None, until: Optional[str] = None) -> Dict[str, Any]:
-        if target_goal is None:
-            if until is not None:
-                url = f"https://api.studyplus.jp/2/study_achievements/feeds?until={until}"
-            else:
-                url = f"https://api.studyplus.jp/2/study_achievements/feeds"
-        else:
-            if until is not None:
-                url = f"https://api.studyplus.jp/2/study_achievements/feeds/study_goal/{target_goal}?until={until}"
-            else:
-                url = f"https://api.studyplus.jp/2/study_achievements/feeds/study_goal/{target_goal}"
+        url = self._feed_url(self._achievement_path(target_goal), until)
         try:
-            result = requests.get(url, headers=self.headers)
+            result = self.transport.get(url, headers=self.headers)
             result.raise_for_status()
             return result.json()
         except HTTPError as http_err:
             self._handle_http_error(result, "Failed to get achievement timeline", http_err)
 
-    def get_followee_timelines(self, limit: int = 3) -> List[Dict[str, Any]]:
-        results = []
-        until = None
-        for _ in range(limit):
-            if until is not None:
-                result = self.get_followee_timeline(until)
-            else:
-                result = self.get_followee_timeline()
-            for event in result["feeds"]:
-                results.append(event)
-            if "next" not in result:
-                break
+    def iter_pages(
+        self,
+        fetch: Callable[[Optional[str]], Dict[str, Any]],
+        limit: Optional[int] = None,
+        until: Optional[str] = None,
+        prefetch: int = 0
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Yield whole feed pages, following `next` cursors.
+
+        Args:
+            fetch: Function fetching the page for a cursor (None for the newest page),
+                e.g. lambda until: timeline.get_goal_timeline(goal_id, until)
+            limit: Maximum number of pages (all pages if None)
+            until: Cursor to start from, e.g. the `next` of the last page processed
+            prefetch: Pages requested ahead of the consumer in a background thread;
+                at most this many unconsumed pages are held in memory, and with
+                the timeline's memory budget only as many as the budget allows
+
+        Returns:
+            Iterator over page dictionaries with "feeds" and "next"
+        """
+        pages = self._fetch_pages(fetch, limit, until)
+        if prefetch > 0:
+            pages = _read_ahead(pages, prefetch, self.budget)
+        return pages
+
+    def _fetch_pages(
+        self,
+        fetch: Callable[[Optional[str]], Dict[str, Any]],
+        limit: Optional[int],
+        until: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        pages = itertools.count() if limit is None else range(limit)
+        for _ in pages:
+            result = fetch(until)
+            yield result
+            if not result.get("next"):
+                return
             until = result["next"]
-        return results
+
+    def _paginate(
+        self,
+        fetch: Callable[[Optional[str]], Dict[str, Any]],
+        limit: Optional[int],
+        prefetch: int = 0,
+        until: Optional[str] = None,
+        stream_path: Optional[str] = None,
+        default_message: str = "Failed to get timeline"
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Yield feed events of the pages from iter_pages.
+
+        With `stream_path` set, each page is parsed incrementally from the
+        response body instead, so memory holds one event rather than one page.
+        """
+        if stream_path is not None:
+            if prefetch > 0:
+                raise ValueError("stream and prefetch cannot be combined")
+            return self._stream_pages(lambda until: self._feed_url(stream_path, until), "feeds", default_message, limit, until)
+        return (feed for result in self.iter_pages(fetch, limit, until, prefetch) for feed in result["feeds"])
+
+    def iter_followee_timelines(
+        self, limit: Optional[int] = None, prefetch: int = 0, until: Optional[str] = None, stream: bool = False
+    ) -> Iterator[Dict[str, Any]]:
+        return self._paginate(
+            lambda until: self.get_followee_timeline(until), limit, prefetch, until,
+            "timeline_feeds/followee" if stream else None, "Failed to get followee timeline"
+        )
+
+    def iter_user_timelines(
+        self, target_id: str, limit: Optional[int] = None, prefetch: int = 0, until: Optional[str] = None, stream: bool = False
+    ) -> Iterator[Dict[str, Any]]:
+        return self._paginate(
+            lambda until: self.get_user_timeline(target_id, until), limit, prefetch, until,
+            f"timeline_feeds/user/{target_id}" if stream else None, "Failed to get user timeline"
+        )
+
+    def iter_goal_timelines(
+        self, target_id: str, limit: Optional[int] = None, prefetch: int = 0, until: Optional[str] = None, stream: bool = False
+    ) -> Iterator[Dict[str, Any]]:
+        return self._paginate(
+            lambda until: self.get_goal_timeline(target_id, until), limit, prefetch, until,
+            f"timeline_feeds/study_goal/{target_id}" if stream else None, "Failed to get goal timeline"
+        )
+
+    def iter_achievement_timelines(
+        self, target_id: Optional[str] = None, limit: Optional[int] = None, prefetch: int = 0, until: Optional[str] = None, stream: bool = False
+    ) -> Iterator[Dict[str, Any]]:
+        return self._paginate(
+            lambda until: self.get_achievement_timeline(target_id, until), limit, prefetch, until,
+            self._achievement_path(target_id) if stream else None, "Failed to get achievement timeline"
+        )
+
+    def get_followee_timelines(self, limit: int = 3) -> List[Dict[str, Any]]:
+        return list(self.iter_followee_timelines(limit))
 
     def get_user_timelines(self, target_id: str, limit: int = 3) -> List[Dict[str, Any]]:
-        results = []
-        until = None
-        for _ in range(limit):
-            if until is not None:
-                result = self.get_user_timeline(target_id, until)
-            else:
-                result = self.get_user_timeline(target_id)
-            for event in result["feeds"]:
-                results.append(event)
-            if "next" not in result:
-                break
-            until = result["next"]
-        return results
+        return list(self.iter_user_timelines(target_id, limit))
 
     def get_goal_timelines(self, target_id: str, limit: int = 3) -> List[Dict[str, Any]]:
-        results = []
-        until = None
-        for _ in range(limit):
-            if until is not None:
-                result = self.get_goal_timeline(target_id, until)
-            else:
-                result = self.get_goal_timeline(target_id)
-            for event in result["feeds"]:
-                results.append(event)
-            if "next" not in result:
-                continue
-            until = result["next"]
-        return results
+        return list(self.iter_goal_timelines(target_id, limit))
 
     def get_achievement_timelines(self, target_id: Optional[str] = None, limit: int = 3) -> List[Dict[str, Any]]:
-        results = []
-        until = None
-        for _ in range(limit):
-            if until is not None:
-                result = self.get_achievement_timeline(target_id, until)
-            else:
-                result = self.get_achievement_timeline(target_id)
-            for event in result["feeds"]:
-                results.append(event)
-            if "next" not in result:
-                continue
-            until = result["next"]
-        return results
+        return list(self.iter_achievement_timelines(target_id, limit))
@@ -0,0 +1,72 @@
+"""
+post_token generation for Stplpy library.
+
+The API deduplicates writes by their alphanumeric post_token.
+generate_token draws tokens from the operating system's secure random
+source: random bytes are mapped onto the 62-character alphabet with one
+bytes.translate call, and bytes past the last multiple of 62 are dropped
+(rejection sampling) so every character is equally likely. derive_token
+returns the same token for the same payload, so a retried write is
+recognized as a duplicate instead of being posted twice.
+"""
+import hashlib
+import json
+import secrets
+import string
+from typing import Any
+
+TOKEN_ALPHABET = string.ascii_letters + string.digits
+
+# Bytes below this value map evenly onto the alphabet (4 * 62 = 248).
+_ACCEPTED = 256 - 256 % len(TOKEN_ALPHABET)
+
+_TRANSLATION = bytes(TOKEN_ALPHABET[byte % len(TOKEN_ALPHABET)].encode("ascii")[0] for byte in range(256))
+_REJECTED = bytes(range(_ACCEPTED, 256))
+
+# Base-62 characters fully covered by one 256-bit digest (62^42 < 2^256).
+_CHARS_PER_DIGEST = 42
+
+
+def generate_token(n: int = 10) -> str:
+    """
+    Generate a random alphanumeric token from a cryptographically secure source.
+
+    Args:
+        n: Token length
+
+    Returns:
+        Token of n characters from [A-Za-z0-9]
+    """
+    token = b""
+    while len(token) < n:
+        # About 3% of bytes are rejected; draw a little extra to usually finish in one round.
+        token += secrets.token_bytes((n - len(token)) * 9 // 8 + 8).translate(_TRANSLATION, _REJECTED)
+    return token[:n].decode("ascii")
+
+
+def derive_token(payload: Any, n: int = 10) -> str:
+    """
+    Derive a token from a payload, identical for identical payloads.
+
+    The payload is serialized as JSON with sorted keys and hashed with
+    SHA-256; each digest supplies 42 base-62 characters, and longer tokens
+    continue with digests of the payload and a block counter.
+
+    Args:
+        payload: JSON-serializable request content (e.g. a study record)
+        n: Token length
+
+    Returns:
+        Token of n characters from [A-Za-z0-9]
+    """
+    data = json.dumps(payload, sort_keys=True).encode("utf-8")
+    chars = []
+    block = 0
+    while len(chars) < n:
+        digest = hashlib.sha256(data if block == 0 else data + block.to_bytes(4, "big")).digest()
+        value = int.from_bytes(digest, "big")
+        for _ in range(min(_CHARS_PER_DIGEST, n - len(chars))):
+            value, index = divmod(value, len(TOKEN_ALPHABET))
+            chars.append(TOKEN_ALPHABET[index])
+        block += 1
+    return "".join(chars)
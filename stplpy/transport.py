@@ -0,0 +1,409 @@
+"""
+HTTP transport shared by the Stplpy API clients.
+
+Every request made by User and Timeline goes through Transport.request,
+which applies the default timeout, the optional priority scheduler and
+shared rate limiter, and the circuit breaker of the request's endpoint family.
+Responses are requested compressed (gzip, plus brotli and zstd when their
+decoders are installed) and decoded incrementally by urllib3; the transport
+counts compressed and decoded payload bytes per endpoint. Hooks registered
+with add_hook receive a RequestTrace of each request's phase timings.
+"""
+import logging
+import os
+import threading
+import time
+from collections.abc import Mapping
+from datetime import timedelta
+from typing import Any, Dict, Generator, Iterable, Iterator, List, Optional, Union
+from urllib.parse import parse_qs, urlparse
+
+import requests
+from urllib3.util import make_headers
+
+from .breaker import CircuitBreaker, CircuitBreakers
+from .profiling import RequestHook, RequestTrace, TimedHTTPAdapter, tracing
+from .ratelimit import RateLimiter
+from .scheduler import BULK, INTERACTIVE, RequestScheduler
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 30.0
+
+# "gzip,deflate", extended by urllib3 with br and zstd when brotli/zstandard are installed.
+ACCEPT_ENCODING = make_headers(accept_encoding=True)["accept-encoding"]
+
+API_HOST = "api.studyplus.jp"
+
+# Endpoints that share a backend are grouped under one breaker.
+_FAMILY_ALIASES = {
+    "me": "users",
+    "follows": "users",
+    "settings": "users",
+    "study_achievements": "timeline_feeds",
+}
+
+
+def endpoint_family(url: str) -> str:
+    """
+    Get the endpoint family of a URL.
+
+    API URLs are grouped by their first path segment after the version
+    (e.g. "timeline_feeds", "users"); other hosts use the host name.
+
+    Args:
+        url: Request URL
+
+    Returns:
+        Endpoint family name
+    """
+    parsed = urlparse(url)
+    if parsed.netloc != API_HOST:
+        return parsed.netloc
+    segments = [segment for segment in parsed.path.split("/") if segment]
+    if len(segments) < 2:
+        return "api"
+    return _FAMILY_ALIASES.get(segments[1], segments[1])
+
+
+# Path segments following these are ids or names and are masked in endpoint names.
+_ID_PARENTS = {"users", "user", "study_goal", "timeline_events", "study_records"}
+
+# Query parameters that select a different listing of the same path.
+_LISTING_PARAMETERS = ("follower", "followee")
+
+
+def endpoint_name(url: str) -> str:
+    """
+    Get a stable name for the endpoint of a URL, with ids masked.
+
+    Examples: "timeline_feeds/user/{id}", "users?follower", "users/{id}".
+
+    Args:
+        url: Request URL
+
+    Returns:
+        Endpoint name
+    """
+    parsed = urlparse(url)
+    if parsed.netloc != API_HOST:
+        return parsed.netloc
+    segments = [segment for segment in parsed.path.split("/") if segment][1:]
+    name = "/".join(
+        "{id}" if index > 0 and segments[index - 1] in _ID_PARENTS else segment
+        for index, segment in enumerate(segments)
+    )
+    query = parse_qs(parsed.query)
+    listing = [parameter for parameter in _LISTING_PARAMETERS if parameter in query]
+    return f"{name}?{listing[0]}" if listing else name
+
+
+def _wire_bytes(response: requests.Response) -> Optional[int]:
+    # urllib3 counts the raw (still compressed) bytes read from the socket.
+    tell = getattr(getattr(response, "raw", None), "tell", None)
+    value = tell() if callable(tell) else None
+    return value if isinstance(value, int) else None
+
+
+class TransferStats:
+    """Compressed and decoded payload bytes per endpoint."""
+
+    def __init__(self) -> None:
+        self._endpoints: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, compressed: int, uncompressed: int, encoding: Optional[str]) -> None:
+        with self._lock:
+            stats = self._endpoints.setdefault(
+                endpoint, {"responses": 0, "compressed_bytes": 0, "uncompressed_bytes": 0, "encodings": {}}
+            )
+            stats["responses"] += 1
+            stats["compressed_bytes"] += compressed
+            stats["uncompressed_bytes"] += uncompressed
+            encoding = encoding or "identity"
+            stats["encodings"][encoding] = stats["encodings"].get(encoding, 0) + 1
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get per-endpoint transfer counters.
+
+        Returns:
+            Dictionary mapping endpoint names to responses, compressed_bytes,
+            uncompressed_bytes, ratio (uncompressed / compressed) and the
+            number of responses per content encoding
+        """
+        with self._lock:
+            result = {}
+            for endpoint, stats in self._endpoints.items():
+                compressed = stats["compressed_bytes"]
+                result[endpoint] = dict(
+                    stats,
+                    encodings=dict(stats["encodings"]),
+                    ratio=stats["uncompressed_bytes"] / compressed if compressed else 1.0
+                )
+            return result
+
+
+class Transport:
+    """
+    Pooled HTTP transport with timeouts, rate limiting and circuit breakers.
+
+    A Transport may be shared by any number of threads: each thread gets its
+    own requests.Session (requests does not guarantee a Session is thread
+    safe), and the sessions are re-created in a child process after os.fork
+    so pooled connections are never shared between processes.
+
+    Args:
+        timeout: Default request timeout in seconds
+        rate_limiter: Limiter acquired before every request (none if omitted);
+            with a scheduler, its tokens are granted in scheduling order
+        breakers: Circuit breaker registry, True for a default CircuitBreakers
+            or False to disable breakers
+        scheduler: Priority scheduler bounding requests in flight (none if omitted)
+        pool_maxsize: Connections kept per host
+        hooks: Called with the RequestTrace of every request (see profiling)
+    """
+
+    def __init__(
+        self,
+        timeout: float = DEFAULT_TIMEOUT,
+        rate_limiter: Optional[RateLimiter] = None,
+        breakers: Union[CircuitBreakers, bool] = True,
+        scheduler: Optional[RequestScheduler] = None,
+        pool_maxsize: int = 16,
+        hooks: Optional[Iterable[RequestHook]] = None
+    ):
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter
+        self.scheduler = scheduler
+        if scheduler is not None and scheduler.rate_limiter is None:
+            scheduler.rate_limiter = rate_limiter
+        if breakers is True:
+            breakers = CircuitBreakers()
+        self.breakers: Optional[CircuitBreakers] = breakers or None
+        self.pool_maxsize = pool_maxsize
+        self.transfers = TransferStats()
+        self.hooks: List[RequestHook] = list(hooks or ())
+        self._state = threading.local()
+
+    @property
+    def session(self) -> requests.Session:
+        """The calling thread's session, created on first use in each thread and process."""
+        session = getattr(self._state, "session", None)
+        if session is None or self._state.pid != os.getpid():
+            session = requests.Session()
+            adapter = TimedHTTPAdapter(pool_connections=4, pool_maxsize=self.pool_maxsize)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers["Accept-Encoding"] = ACCEPT_ENCODING
+            self._state.session = session
+            self._state.pid = os.getpid()
+        return session
+
+    def add_hook(self, hook: RequestHook) -> None:
+        """
+        Register a hook called with the RequestTrace of every request.
+
+        Hooks run once the response is read, so they should be quick; their
+        own time is recorded as the "hooks" phase. For stream=True requests
+        that is when the body iterator finishes or the response is closed,
+        on whichever thread does so.
+
+        Args:
+            hook: Callable taking a RequestTrace (e.g. a RequestProfiler)
+        """
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook: RequestHook) -> None:
+        self.hooks.remove(hook)
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        family: Optional[str] = None,
+        priority: Optional[str] = None,
+        **kwargs: Any
+    ) -> requests.Response:
+        """
+        Send a request.
+
+        Args:
+            method: HTTP method ("get", "post", "delete", ...)
+            url: Request URL
+            family: Endpoint family for the circuit breaker (derived from url if omitted)
+            priority: Scheduler priority class (writes are interactive, reads bulk by default)
+            **kwargs: Arguments passed to requests (headers, json, files, stream, ...)
+
+        Returns:
+            The response
+
+        Raises:
+            CircuitOpenError: If the endpoint family's breaker rejects the request
+        """
+        hooks = list(self.hooks)
+        trace = RequestTrace(method, url, endpoint_name(url)) if hooks else None
+        deferred = False
+        try:
+            start = time.monotonic()
+            breaker = self.breakers.get(family or endpoint_family(url)) if self.breakers else None
+            if breaker is not None:
+                breaker.before_request()
+            if trace is not None:
+                trace.add("breaker", start)
+            if self.scheduler is None:
+                response = self._send(breaker, method, url, trace, **kwargs)
+            else:
+                if priority is None:
+                    priority = BULK if method.lower() == "get" else INTERACTIVE
+                start = time.monotonic()
+                with self.scheduler.slot(priority):
+                    if trace is not None:
+                        trace.add("queue", start)
+                    response = self._send(breaker, method, url, trace, **kwargs)
+            if trace is not None and kwargs.get("stream"):
+                self._defer_hooks(response, hooks, trace)
+                deferred = True
+            return response
+        except Exception as e:
+            if trace is not None:
+                trace.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            if trace is not None and not deferred:
+                self._run_hooks(hooks, trace)
+
+    def _run_hooks(self, hooks: List[RequestHook], trace: RequestTrace) -> None:
+        trace.end = time.monotonic()
+        for hook in hooks:
+            try:
+                hook(trace)
+            except Exception as e:
+                logger.warning(f"Request hook {hook!r} failed: {e}")
+        trace.add("hooks", trace.end)
+
+    def _defer_hooks(self, response: requests.Response, hooks: List[RequestHook], trace: RequestTrace) -> None:
+        """Run the hooks once a streamed body is exhausted or the response closed, whichever is first."""
+        finished = threading.Lock()
+
+        def finish() -> None:
+            if finished.acquire(blocking=False):
+                self._run_hooks(hooks, trace)
+
+        iter_content = response.iter_content
+        close = response.close
+        readers: List[Generator[bytes, None, None]] = []
+
+        def read(*args: Any, **kwargs: Any) -> Generator[bytes, None, None]:
+            try:
+                yield from iter_content(*args, **kwargs)
+            finally:
+                finish()
+
+        def finishing_iter_content(*args: Any, **kwargs: Any) -> Iterator[bytes]:
+            reader = read(*args, **kwargs)
+            readers.append(reader)
+            return reader
+
+        def finishing_close() -> None:
+            try:
+                # A reader abandoned before the end of the body still records
+                # its download phase before the hooks run.
+                for reader in readers:
+                    reader.close()
+                close()
+            finally:
+                finish()
+
+        response.iter_content = finishing_iter_content
+        response.close = finishing_close
+
+    def _send(
+        self, breaker: Optional[CircuitBreaker], method: str, url: str, trace: Optional[RequestTrace] = None, **kwargs: Any
+    ) -> requests.Response:
+        # With a scheduler sharing the limiter, the token came with the slot.
+        if self.rate_limiter is not None and (self.scheduler is None or self.scheduler.rate_limiter is not self.rate_limiter):
+            start = time.monotonic()
+            self.rate_limiter.acquire()
+            if trace is not None:
+                trace.add("rate_limit", start)
+        kwargs.setdefault("timeout", self.timeout)
+
+        start = time.monotonic()
+        try:
+            with tracing(trace):
+                response = getattr(self.session, method.lower())(url, **kwargs)
+        except Exception:
+            if breaker is not None:
+                breaker.record(False, time.monotonic() - start)
+            raise
+        end = time.monotonic()
+        if breaker is not None:
+            breaker.record(response.status_code < 500, end - start)
+        if response.status_code == 429 and self.rate_limiter is not None:
+            self.rate_limiter.penalize(1.0 / self.rate_limiter.rate)
+        if trace is not None:
+            self._trace_response(trace, response, start, end)
+        self._account(response, url, kwargs.get("stream", False), trace)
+        return response
+
+    @staticmethod
+    def _trace_response(trace: RequestTrace, response: requests.Response, start: float, end: float) -> None:
+        trace.status_code = response.status_code
+        # requests measures elapsed from sending until the headers were parsed;
+        # a non-streamed body is read after that.
+        elapsed = getattr(response, "elapsed", None)
+        headers_at = min(start + elapsed.total_seconds(), end) if isinstance(elapsed, timedelta) else end
+        connected = max((phase_end for name, _, phase_end in trace.phases if name in ("connect", "tls")), default=start)
+        trace.add("server", max(start, min(connected, headers_at)), headers_at)
+        if headers_at < end:
+            trace.add("download", headers_at, end)
+
+        json_method = response.json
+
+        def timed_json(*args: Any, **kwargs: Any) -> Any:
+            decode_start = time.monotonic()
+            try:
+                return json_method(*args, **kwargs)
+            finally:
+                trace.add("decode", decode_start)
+
+        response.json = timed_json
+
+    def _account(self, response: requests.Response, url: str, stream: bool, trace: Optional[RequestTrace] = None) -> None:
+        headers = getattr(response, "headers", None)
+        encoding = headers.get("Content-Encoding") if isinstance(headers, Mapping) else None
+        endpoint = endpoint_name(url)
+        if not stream:
+            content = getattr(response, "content", None)
+            if isinstance(content, bytes):
+                wire = _wire_bytes(response)
+                self.transfers.record(endpoint, len(content) if wire is None else wire, len(content), encoding)
+            return
+
+        # Streamed bodies are counted as they are consumed.
+        iter_content = response.iter_content
+
+        def counting_iter_content(*args: Any, **kwargs: Any) -> Iterator[bytes]:
+            decoded = 0
+            start = time.monotonic()
+            try:
+                for chunk in iter_content(*args, **kwargs):
+                    decoded += len(chunk)
+                    yield chunk
+            finally:
+                wire = _wire_bytes(response)
+                self.transfers.record(endpoint, decoded if wire is None else wire, decoded, encoding)
+                if trace is not None:
+                    trace.add("download", start)
+
+        response.iter_content = counting_iter_content
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("get", url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("post", url, **kwargs)
+
+    def delete(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("delete", url, **kwargs)
@@ -1,25 +1,60 @@
-import requests
-from typing import Dict, List, Optional, Any
+import functools
+import hashlib
+import io
+import itertools
+import logging
+import os
+import tempfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Any, TypeVar
+from urllib.parse import urlparse
 
 from .exceptions import (
     APIError,
     AuthenticationError,
     ResourceNotFoundError,
-    ValidationError
+    RateLimitError,
+    StudyPlusError
 )
+from .cache import Cache
+from .image import DEFAULT_MAX_BYTES, DEFAULT_MAX_SIZE, prepare_upload
+from .profiling import phase
+from .streaming import STREAM_CHUNK_SIZE, JSONArrayStream
+from .transport import Transport
+
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
 
 
 class User:
-    def __init__(self, token: str):
+    def __init__(self, token: str, cache: Optional[Cache] = None, transport: Optional[Transport] = None):
         self.token = token
-        self.headers = {
+        self.cache = cache
+        self.transport = transport or Transport()
+        self.headers = MappingProxyType({
             "User-Agent": "Studyplus/101 CFNetwork/1474 Darwin/23.0.0",
             "Authorization": f"OAuth {token}"
-        }
+        })
+        # Profiles carry the viewer's relationship to the user, so cached
+        # entries are scoped to the account (a hash, never the token itself).
+        self._viewer = hashlib.sha256(token.encode("utf-8")).hexdigest()[:16]
+
+    def _cache_key(self, user_name: str) -> str:
+        return f"user:{self._viewer}:{user_name}"
+
+    def _invalidate(self, user_name: str) -> None:
+        """Drop a cached profile whose relationship state just changed."""
+        if self.cache is not None:
+            self.cache.delete(self._cache_key(user_name))
 
     def get_myself(self) -> Dict[str, Any]:
         url = "https://api.studyplus.jp/2/me"
-        result = requests.get(url, headers=self.headers)
+        result = self.transport.get(url, headers=self.headers)
         if result.status_code == 200:
             return result.json()
         elif result.status_code in (401, 403):
@@ -27,11 +62,25 @@ class User:
         else:
             raise APIError(f"[{result.status_code}] Failed to get user profile", result.status_code)
 
+    def get_cached_user(self, user_name: str) -> Optional[Dict[str, Any]]:
+        """Get a profile from the cache without a request; None on a miss or without a cache."""
+        if self.cache is None:
+            return None
+        cached = self.cache.get(self._cache_key(user_name))
+        return dict(cached) if cached is not None else None
+
     def get_user(self, user_name: str) -> Dict[str, Any]:
+        cached = self.get_cached_user(user_name)
+        if cached is not None:
+            return cached
         url = f"https://api.studyplus.jp/2/users/{user_name}"
-        result = requests.get(url, headers=self.headers)
+        result = self.transport.get(url, headers=self.headers)
         if result.status_code == 200:
-            return result.json()
+            profile = result.json()
+            if self.cache is not None:
+                self.cache.set(self._cache_key(user_name), profile)
+                return dict(profile)
+            return profile
         elif result.status_code == 404:
             raise ResourceNotFoundError(f"User '{user_name}' not found")
         elif result.status_code in (401, 403):
@@ -39,28 +88,116 @@ class User:
         else:
             raise APIError(f"[{result.status_code}] Failed to get user '{user_name}'", result.status_code)
 
-    def download_profile_picture(self, user_name: Optional[str] = None, output_file_name: str = "output.jpg") -> bool:
-        if user_name is None:
-            user_name = self.get_myself()["username"]
+    def _stream_to_file(self, url: str, output_file_name: str) -> bool:
+        """
+        Stream url into output_file_name atomically.
+
+        The image and its ".etag" file are each written to a temporary file
+        and moved into place. A 200 response whose body hashes to the file
+        already on disk counts as unchanged, as does a 304.
+
+        Returns:
+            False if the content is unchanged, True if the file was replaced
+        """
+        etag_file = output_file_name + ".etag"
+        request_headers = {}
+        if os.path.exists(output_file_name) and os.path.exists(etag_file):
+            with open(etag_file, encoding="utf-8") as f:
+                request_headers["If-None-Match"] = f.read().strip()
+
+        with self.transport.get(url, headers=request_headers, stream=True) as result:
+            if result.status_code == 304:
+                return False
+            result.raise_for_status()
+
+            digest = hashlib.sha256()
+            directory = os.path.dirname(os.path.abspath(output_file_name))
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".stplpy-", suffix=".part")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    for chunk in result.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                        f.write(chunk)
+                        digest.update(chunk)
+                changed = _file_sha256(output_file_name) != digest.hexdigest()
+                if changed:
+                    os.replace(tmp_path, output_file_name)
+                else:
+                    os.remove(tmp_path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+            etag = result.headers.get("ETag")
+            if etag:
+                _write_atomic(etag_file, etag.encode("utf-8"))
+            elif os.path.exists(etag_file):
+                # A stale ETag would revalidate content that no longer matches it.
+                os.remove(etag_file)
+            return changed
+
+    def download_profile_picture(
+        self,
+        user_name: Optional[str] = None,
+        output_file_name: str = "output.jpg",
+        image_url: Optional[str] = None
+    ) -> bool:
         try:
-            profile_picture_url = self.get_user(user_name)["user_image_url"]
-            data = requests.get(profile_picture_url).content
-            with open(output_file_name, mode='wb') as f:
-                f.write(data)
+            if image_url is None:
+                profile = self.get_myself() if user_name is None else self.get_user(user_name)
+                image_url = profile.get("user_image_url") or self.get_user(profile["username"])["user_image_url"]
+            self._stream_to_file(image_url, output_file_name)
             return True
         except Exception as e:
             raise APIError(f"Failed to download profile picture: {str(e)}")
 
-    def update_profile_picture(self, file_path: str) -> bool:
+    def download_profile_pictures(
+        self,
+        users: Iterable[Dict[str, Any]],
+        output_dir: str = ".",
+        max_workers: int = 8
+    ) -> Dict[str, str]:
+        """
+        Download avatars for many users concurrently.
+
+        Args:
+            users: User dicts as returned by get_followers/get_followees
+            output_dir: Directory the images are written to
+            max_workers: Number of concurrent downloads
+
+        Returns:
+            Dictionary mapping usernames to "downloaded", "unchanged" or "failed"
+        """
+        os.makedirs(output_dir, exist_ok=True)
+
+        def download(user: Dict[str, Any]) -> str:
+            try:
+                image_url = user.get("user_image_url") or self.get_user(user["username"])["user_image_url"]
+                extension = os.path.splitext(urlparse(image_url).path)[1] or ".jpg"
+                output_file_name = os.path.join(output_dir, f"{user['username']}{extension}")
+                return "downloaded" if self._stream_to_file(image_url, output_file_name) else "unchanged"
+            except Exception as e:
+                logger.warning(f"Failed to download profile picture of '{user.get('username')}': {e}")
+                return "failed"
+
+        targets = {user["username"]: user for user in users if user.get("username")}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            statuses = executor.map(download, targets.values())
+            return dict(zip(targets.keys(), statuses))
+
+    def update_profile_picture(
+        self,
+        file_path: str,
+        preprocess: bool = False,
+        max_size: int = DEFAULT_MAX_SIZE,
+        max_bytes: int = DEFAULT_MAX_BYTES
+    ) -> bool:
         url = "https://api.studyplus.jp/2/settings/profile_icon"
-        try:
-            with open(file_path, 'rb') as file:
-                files = {
-                    'image': ('image.jpg', file, 'image/jpeg')
-                }
-                result = requests.post(url, headers=self.headers, files=files)
-        except FileNotFoundError:
-            raise ValidationError(f"Profile picture file not found: {file_path}")
+        file_name, data, mime_type = prepare_upload(file_path, preprocess, max_size, max_bytes)
+        files = {
+            'image': (file_name, io.BytesIO(data), mime_type)
+        }
+        result = self.transport.post(url, headers=self.headers, files=files)
 
         if result.status_code == 204:
             return True
@@ -72,8 +209,9 @@ class User:
     def follow_user(self, user_name: str) -> bool:
         data = {"username": user_name}
         url = "https://api.studyplus.jp/2/follows"
-        result = requests.post(url, headers=self.headers, json=data)
+        result = self.transport.post(url, headers=self.headers, json=data)
         if result.status_code == 200:
+            self._invalidate(user_name)
             return True
         elif result.status_code == 404:
             raise ResourceNotFoundError(f"User '{user_name}' not found")
@@ -85,8 +223,9 @@ class User:
     def unfollow_user(self, user_name: str) -> bool:
         relationship_id = self.get_user(user_name)["user_relationship_id"]
         url = f"https://api.studyplus.jp/2/follows/{str(relationship_id)}"
-        result = requests.delete(url, headers=self.headers)
+        result = self.transport.delete(url, headers=self.headers)
         if result.status_code == 200:
+            self._invalidate(user_name)
             return True
         elif result.status_code == 404:
             raise ResourceNotFoundError(f"User relationship not found")
@@ -95,40 +234,155 @@ class User:
         else:
             raise APIError(f"[{result.status_code}] Failed to unfollow user '{user_name}'", result.status_code)
 
+    @staticmethod
+    def _user_page_url(relation: str, target_id: str, page: int) -> str:
+        return f"https://api.studyplus.jp/2/users?{relation}={target_id}&page={page}&per_page=50&include_recent_record_seconds=t"
+
+    def _get_user_page(self, relation: str, target_id: str, page: int, header_less: bool = False) -> List[Dict[str, Any]]:
+        """Fetch one page of a followee/follower relation."""
+        url = self._user_page_url(relation, target_id, page)
+        if header_less:
+            result = self.transport.get(url, headers={})
+        else:
+            result = self.transport.get(url, headers=self.headers)
+        if result.status_code == 200:
+            return result.json()["users"]
+        self._raise_for_user_page(result, relation, target_id, page)
+
+    def _raise_for_user_page(self, result: Any, relation: str, target_id: str, page: int) -> None:
+        with phase("error_mapping"):
+            if result.status_code == 404:
+                raise ResourceNotFoundError(f"User '{target_id}' not found")
+            elif result.status_code in (401, 403):
+                raise AuthenticationError(f"[{result.status_code}] Authentication failed")
+            elif result.status_code == 429:
+                raise RateLimitError(f"Rate limit exceeded")
+            else:
+                raise APIError(f"[{result.status_code}] Failed to get {relation}s of '{target_id}' (page {page})", result.status_code)
+
+    def _iter_user_pages(
+        self,
+        relation: str,
+        target_id: str,
+        limit: Optional[int] = None,
+        header_less: bool = False,
+        start_page: int = 1,
+        prefetch: int = 0
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Yield pages of users for a followee/follower relation until an empty page or `limit` pages.
+
+        Pages are numbered, so with `prefetch` > 0 that many following pages
+        are requested concurrently while the current one is consumed.
+        """
+        pages = itertools.count(start_page) if limit is None else iter(range(start_page, start_page + limit))
+
+        def fetch(page: int) -> List[Dict[str, Any]]:
+            return self._get_user_page(relation, target_id, page, header_less)
+
+        for result in _fetch_ahead(fetch, pages, prefetch):
+            try:
+                users = result()
+            except StudyPlusError:
+                # Bounded listings skip failed pages; unbounded ones raise rather
+                # than end early and pass off a truncated listing as complete.
+                if limit is None:
+                    raise
+                continue
+            if not users:
+                return
+            yield users
+
+    def iter_followees(
+        self,
+        target_id: str,
+        limit: Optional[int] = None,
+        header_less: bool = False,
+        start_page: int = 1,
+        prefetch: int = 0
+    ) -> Iterator[List[Dict[str, Any]]]:
+        return self._iter_user_pages("followee", target_id, limit, header_less, start_page, prefetch)
+
+    def iter_followers(
+        self,
+        target_id: str,
+        limit: Optional[int] = None,
+        header_less: bool = False,
+        start_page: int = 1,
+        prefetch: int = 0
+    ) -> Iterator[List[Dict[str, Any]]]:
+        return self._iter_user_pages("follower", target_id, limit, header_less, start_page, prefetch)
+
+    def _stream_users(self, relation: str, target_id: str, limit: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """Yield users one at a time, parsing each page incrementally from the response body."""
+        count = itertools.count(1) if limit is None else range(1, limit + 1)
+        for page in count:
+            result = self.transport.get(self._user_page_url(relation, target_id, page), headers=self.headers, stream=True)
+            if result.status_code != 200:
+                result.close()
+                self._raise_for_user_page(result, relation, target_id, page)
+            found = 0
+            for user in JSONArrayStream(result.iter_content(STREAM_CHUNK_SIZE), "users", result.close):
+                found += 1
+                yield user
+            if not found:
+                return
+
+    def stream_followees(self, target_id: str, limit: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        return self._stream_users("followee", target_id, limit)
+
+    def stream_followers(self, target_id: str, limit: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        return self._stream_users("follower", target_id, limit)
+
     def get_followees(self, target_id: str, limit: int = 10, header_less: bool = False) -> List[Dict[str, Any]]:
-        count: int = 1
-        results = []
         try:
-            for _ in range(limit):
-                url = f"https://api.studyplus.jp/2/users?followee={target_id}&page={count}&per_page=50&include_recent_record_seconds=t"
-                count += 1
-                if header_less:
-                    result = requests.get(url, headers={})
-                else:
-                    result = requests.get(url, headers=self.headers)
-                if result.status_code != 200:
-                    continue
-                for user in result.json()["users"]:
-                    results.append(user)
-            return results
+            return [user for page in self.iter_followees(target_id, limit, header_less) for user in page]
         except Exception as e:
             raise APIError(f"Failed to get followees: {str(e)}")
 
     def get_followers(self, target_id: str, limit: int = 10, header_less: bool = False) -> List[Dict[str, Any]]:
-        count: int = 1
-        results = []
         try:
-            for _ in range(limit):
-                url = f"https://api.studyplus.jp/2/users?follower={target_id}&page={count}&per_page=50&include_recent_record_seconds=t"
-                count += 1
-                if header_less:
-                    result = requests.get(url, headers={})
-                else:
-                    result = requests.get(url, headers=self.headers)
-                if result.status_code != 200:
-                    continue
-                for user in result.json()["users"]:
-                    results.append(user)
-            return results
+            return [user for page in self.iter_followers(target_id, limit, header_less) for user in page]
         except Exception as e:
             raise APIError(f"Failed to get followers: {str(e)}")
+
+
+def _fetch_ahead(fetch: Callable[[int], T], pages: Iterator[int], prefetch: int) -> Iterator[Callable[[], T]]:
+    """Yield, in page order, callables returning each page's result (or raising its error)."""
+    if prefetch <= 0:
+        for page in pages:
+            yield functools.partial(fetch, page)
+        return
+    with ThreadPoolExecutor(max_workers=prefetch + 1) as executor:
+        pending = deque(executor.submit(fetch, page) for page in itertools.islice(pages, prefetch + 1))
+        try:
+            while pending:
+                future = pending.popleft()
+                for page in itertools.islice(pages, 1):
+                    pending.append(executor.submit(fetch, page))
+                yield future.result
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=".stplpy-", suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _file_sha256(path: str) -> Optional[str]:
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(DOWNLOAD_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
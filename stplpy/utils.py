@@ -2,7 +2,7 @@
 Utility functions for Stplpy library.
 """
 from datetime import datetime, timezone
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 
 
 def format_study_duration(seconds: int) -> str:
@@ -70,6 +70,83 @@ def extract_user_ids(timeline_feeds: List[Dict[str, Any]]) -> List[str]:
     return list(user_ids)
 
 
+def extract_usernames(timeline_feeds: List[Dict[str, Any]]) -> List[str]:
+    """
+    Extract unique usernames from timeline feeds, e.g. for User.get_user.
+
+    Args:
+        timeline_feeds: List of timeline feed items
+
+    Returns:
+        List of unique usernames in order of first appearance
+    """
+    return list(dict.fromkeys(feed["username"] for feed in timeline_feeds if feed.get("username")))
+
+
+def get_event_id(feed: Dict[str, Any]) -> Optional[str]:
+    """
+    Get the event ID of a timeline feed item.
+
+    The ID lives in the body object named after the feed type
+    (e.g. feed["body_study_record"]["event_id"]).
+
+    Args:
+        feed: Timeline feed item
+
+    Returns:
+        Event ID as a string, or None if the item has none
+    """
+    body = feed.get(f"body_{feed.get('feed_type')}")
+    if isinstance(body, dict) and "event_id" in body:
+        return str(body["event_id"])
+    for key, value in feed.items():
+        if key.startswith("body_") and isinstance(value, dict) and "event_id" in value:
+            return str(value["event_id"])
+    for key in ("event_id", "post_id", "id"):
+        if key in feed:
+            return str(feed[key])
+    return None
+
+
+def get_event_body(feed: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Get the body object of a timeline feed item.
+
+    Args:
+        feed: Timeline feed item
+
+    Returns:
+        The body named after the feed type (or the first body_* object), or an empty dict
+    """
+    body = feed.get(f"body_{feed.get('feed_type')}")
+    if isinstance(body, dict):
+        return body
+    for key, value in feed.items():
+        if key.startswith("body_") and isinstance(value, dict):
+            return value
+    return {}
+
+
+def get_event_field(feed: Dict[str, Any], *names: str) -> Any:
+    """
+    Get the first present field of a timeline feed item, looking in its body first.
+
+    Args:
+        feed: Timeline feed item
+        *names: Field names in order of preference
+
+    Returns:
+        The field value, or None if none of the fields is set
+    """
+    body = get_event_body(feed)
+    for name in names:
+        if body.get(name) is not None:
+            return body[name]
+        if feed.get(name) is not None:
+            return feed[name]
+    return None
+
+
 def calculate_total_study_time(records: List[Dict[str, Any]]) -> int:
     """
     Calculate total study time from study records.
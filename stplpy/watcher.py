@@ -0,0 +1,294 @@
+"""
+Background timeline watcher for Stplpy library.
+
+TimelineWatcher polls followee, user, goal and achievement feeds from a
+single background thread and dispatches only events it has not seen before
+to registered callbacks (or an asyncio queue). Each feed's polling interval
+follows its observed activity: busy feeds are polled more often, quiet feeds
+back off, and the combined polling rate is kept within the rate limiter.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .exceptions import RateLimitError
+from .ratelimit import RateLimiter
+from .timeline import Timeline
+from .utils import get_event_id
+
+logger = logging.getLogger(__name__)
+
+EventCallback = Callable[[str, Dict[str, Any]], None]
+
+
+class _WatchedFeed:
+    def __init__(self, key: str, fetch: Callable[[Optional[str]], Dict[str, Any]], interval: float, seen_capacity: int):
+        self.key = key
+        self.fetch = fetch
+        self.interval = interval
+        self.seen_capacity = seen_capacity
+        self.seen: "OrderedDict[str, None]" = OrderedDict()
+        self.primed = False
+        self.event_rate = 0.0
+        self.last_poll: Optional[float] = None
+
+    def remember(self, event_id: str) -> bool:
+        """Record an event id; return True if it was not seen before."""
+        if event_id in self.seen:
+            self.seen.move_to_end(event_id)
+            return False
+        self.seen[event_id] = None
+        if len(self.seen) > self.seen_capacity:
+            self.seen.popitem(last=False)
+        return True
+
+
+class TimelineWatcher:
+    """
+    Poll timeline feeds in the background and push new events to subscribers.
+
+    Example:
+        watcher = TimelineWatcher(cl.timeline)
+        watcher.watch_followee()
+        watcher.subscribe(lambda feed, event: print(feed, get_event_id(event)))
+        watcher.start()
+    """
+
+    def __init__(
+        self,
+        timeline: Timeline,
+        rate_limiter: Optional[RateLimiter] = None,
+        min_interval: float = 15.0,
+        max_interval: float = 600.0,
+        backoff_factor: float = 1.5,
+        target_events_per_poll: float = 5.0,
+        max_catchup_pages: int = 3,
+        seen_capacity: int = 5000,
+        emit_initial: bool = False
+    ):
+        self.timeline = timeline
+        self.rate_limiter = rate_limiter or RateLimiter(rate=0.5, burst=2)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff_factor = backoff_factor
+        self.target_events_per_poll = target_events_per_poll
+        self.max_catchup_pages = max_catchup_pages
+        self.seen_capacity = seen_capacity
+        self.emit_initial = emit_initial
+
+        self._feeds: Dict[str, _WatchedFeed] = {}
+        # Entries carry the feed they were scheduled for; entries left behind
+        # by unwatch (or unwatch followed by watch) are dropped when popped.
+        self._schedule: List[Tuple[float, int, str, _WatchedFeed]] = []
+        self._sequence = itertools.count()
+        self._callbacks: List[Tuple[Optional[str], EventCallback]] = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # __________Feeds__________
+    def _watch(self, key: str, fetch: Callable[[Optional[str]], Dict[str, Any]]) -> str:
+        with self._lock:
+            if key not in self._feeds:
+                feed = self._feeds[key] = _WatchedFeed(key, fetch, self.min_interval, self.seen_capacity)
+                heapq.heappush(self._schedule, (time.monotonic(), next(self._sequence), key, feed))
+        self._wakeup.set()
+        return key
+
+    def watch_followee(self) -> str:
+        return self._watch("followee", lambda until: self.timeline.get_followee_timeline(until))
+
+    def watch_user(self, target_id: str) -> str:
+        return self._watch(f"user:{target_id}", lambda until: self.timeline.get_user_timeline(target_id, until))
+
+    def watch_goal(self, target_id: str) -> str:
+        return self._watch(f"goal:{target_id}", lambda until: self.timeline.get_goal_timeline(target_id, until))
+
+    def watch_achievement(self, target_id: Optional[str] = None) -> str:
+        key = f"achievement:{target_id}" if target_id else "achievement"
+        return self._watch(key, lambda until: self.timeline.get_achievement_timeline(target_id, until))
+
+    def unwatch(self, key: str) -> None:
+        with self._lock:
+            self._feeds.pop(key, None)
+            self._schedule = [entry for entry in self._schedule if entry[2] != key]
+            heapq.heapify(self._schedule)
+
+    def intervals(self) -> Dict[str, float]:
+        """
+        Get the current polling interval of each watched feed.
+
+        Returns:
+            Dictionary mapping feed keys to intervals in seconds
+        """
+        with self._lock:
+            return {key: feed.interval for key, feed in self._feeds.items()}
+
+    # Approximate cost of one remembered event id (dict slot, link and id string).
+    _BYTES_PER_SEEN_ID = 200
+
+    def memory_bytes(self) -> int:
+        """
+        Approximate memory held by the remembered event ids of all feeds.
+
+        Bounded by seen_capacity per feed; the watcher does not shrink on
+        demand, as forgetting ids would deliver their events again.
+        """
+        with self._lock:
+            return sum(len(feed.seen) for feed in self._feeds.values()) * self._BYTES_PER_SEEN_ID
+
+    # __________Subscribers__________
+    def subscribe(self, callback: EventCallback, feed: Optional[str] = None) -> None:
+        """
+        Register a callback for new events.
+
+        Args:
+            callback: Called with (feed key, event) from the watcher thread
+            feed: Only deliver events from this feed key (all feeds if None)
+        """
+        self._callbacks.append((feed, callback))
+
+    def async_queue(self, loop: Optional[asyncio.AbstractEventLoop] = None, maxsize: int = 0) -> "asyncio.Queue[Tuple[str, Dict[str, Any]]]":
+        """
+        Create an asyncio queue that receives (feed key, event) tuples.
+
+        Must be called from the event loop's thread unless loop is given.
+        With maxsize > 0, events arriving while the queue is full are dropped
+        and logged, so a slow consumer never stalls polling.
+        """
+        loop = loop or asyncio.get_running_loop()
+        queue: "asyncio.Queue[Tuple[str, Dict[str, Any]]]" = asyncio.Queue(maxsize)
+
+        def offer(item: Tuple[str, Dict[str, Any]]) -> None:
+            try:
+                queue.put_nowait(item)
+            except asyncio.QueueFull:
+                logger.warning(f"Watcher queue full, dropped event {get_event_id(item[1])} from feed '{item[0]}'")
+
+        self.subscribe(lambda key, event: loop.call_soon_threadsafe(offer, (key, event)))
+        return queue
+
+    def _dispatch(self, key: str, event: Dict[str, Any]) -> None:
+        for feed, callback in list(self._callbacks):
+            if feed is not None and feed != key:
+                continue
+            try:
+                callback(key, event)
+            except Exception as e:
+                logger.error(f"Watcher callback failed for feed '{key}': {e}")
+
+    # __________Polling__________
+    def poll(self, key: str) -> int:
+        """
+        Poll one feed now and dispatch its new events.
+
+        Args:
+            key: Feed key returned by a watch_* method
+
+        Returns:
+            Number of new events dispatched
+        """
+        feed = self._feeds[key]
+        now = time.monotonic()
+        new_events: List[Dict[str, Any]] = []
+        until = None
+        for _ in range(1 + self.max_catchup_pages):
+            page = feed.fetch(until)
+            events = page.get("feeds", [])
+            fresh = [e for e in events if feed.remember(get_event_id(e) or repr(e))]
+            new_events.extend(fresh)
+            # Every item on the page was new: older unseen events may follow.
+            if not feed.primed or len(fresh) < len(events) or not events or not page.get("next"):
+                break
+            until = page["next"]
+
+        if feed.primed or self.emit_initial:
+            for event in reversed(new_events):
+                self._dispatch(key, event)
+        count = len(new_events) if feed.primed else 0
+        self._adapt(feed, count, now)
+        feed.primed = True
+        return count
+
+    def _adapt(self, feed: _WatchedFeed, count: int, now: float) -> None:
+        if feed.last_poll is not None:
+            observed = count / max(now - feed.last_poll, 1e-3)
+            feed.event_rate = observed if feed.event_rate == 0 else 0.3 * observed + 0.7 * feed.event_rate
+        feed.last_poll = now
+
+        if count == 0:
+            interval = feed.interval * self.backoff_factor
+        elif feed.event_rate > 0:
+            interval = self.target_events_per_poll / feed.event_rate
+        else:
+            interval = self.min_interval
+        feed.interval = min(self.max_interval, max(self.min_interval, interval))
+
+    def _next_delay(self, feed: _WatchedFeed) -> float:
+        # Stretch every feed's interval when their combined demand exceeds the limiter.
+        with self._lock:
+            demand = sum(1.0 / f.interval for f in self._feeds.values())
+        budget = self.rate_limiter.rate * 0.8
+        stretch = max(1.0, demand / budget) if budget > 0 else 1.0
+        return feed.interval * stretch
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            with self._lock:
+                due = self._schedule[0] if self._schedule else None
+            if due is None:
+                self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+            delay = due[0] - time.monotonic()
+            if delay > 0:
+                self._wakeup.wait(delay)
+                self._wakeup.clear()
+                continue
+
+            with self._lock:
+                _, _, key, feed = heapq.heappop(self._schedule)
+                if self._feeds.get(key) is not feed:
+                    continue
+            self.rate_limiter.acquire()
+            try:
+                self.poll(key)
+            except RateLimitError:
+                self.rate_limiter.penalize(feed.interval)
+                feed.interval = min(self.max_interval, feed.interval * self.backoff_factor)
+            except Exception as e:
+                logger.warning(f"Failed to poll feed '{key}': {e}")
+                feed.interval = min(self.max_interval, feed.interval * self.backoff_factor)
+            next_due = time.monotonic() + self._next_delay(feed)
+            with self._lock:
+                if self._feeds.get(key) is feed:
+                    heapq.heappush(self._schedule, (next_due, next(self._sequence), key, feed))
+
+    def start(self) -> None:
+        """Start the background polling thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="stplpy-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the background polling thread."""
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def __enter__(self) -> "TimelineWatcher":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
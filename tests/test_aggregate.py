@@ -0,0 +1,123 @@
+"""
+Tests for GoalAggregator class.
+"""
+from datetime import datetime, timezone
+from unittest.mock import Mock
+
+from stplpy.aggregate import GoalAggregator
+from stplpy.timeline import Timeline
+
+NOW = datetime(2024, 1, 31, 12, 0, tzinfo=timezone.utc)
+
+
+def _event(event_id, user_id, material, day, duration=600, posted_day=None):
+    body = {
+        "event_id": event_id,
+        "material_code": material,
+        "record_datetime": f"2024-01-{day:02d}T10:00:00Z",
+        "duration": duration,
+    }
+    if posted_day is not None:
+        body["posted_at"] = f"2024-01-{posted_day:02d}T11:00:00Z"
+    return {"feed_type": "study_record", "user_id": user_id, "body_study_record": body}
+
+
+def _timeline(mock_token, goal_pages, achievement_pages=None):
+    timeline = Timeline(mock_token)
+    timeline.get_goal_timeline = Mock(side_effect=goal_pages)
+    timeline.get_achievement_timeline = Mock(side_effect=achievement_pages or [{"feeds": []}] * 10)
+    return timeline
+
+
+class TestGoalAggregator:
+    """Tests for incremental refreshes and window summaries."""
+
+    def test_window_summaries(self, mock_token):
+        """Test duration, event and distinct active-user totals per window."""
+        pages = [{"feeds": [
+            _event(4, "alice", "ASIN1", 31),
+            _event(3, "bob", "ASIN2", 29, 1200),
+            _event(2, "alice", "ASIN1", 20),
+            _event(1, "carol", "ASIN1", 1),
+        ]}]
+        aggregator = GoalAggregator(_timeline(mock_token, pages), ["college-180"])
+
+        assert aggregator.refresh(NOW) == 3
+        summary = aggregator.goal_summary("college-180", NOW)
+        assert summary[1] == {"duration": 600, "events": 1, "active_users": 1}
+        assert summary[7] == {"duration": 1800, "events": 2, "active_users": 2}
+        assert summary[30] == {"duration": 2400, "events": 3, "active_users": 2}
+        assert aggregator.material_summary("college-180", "ASIN1", NOW)[30]["events"] == 2
+        assert aggregator.top_materials("college-180", 30, now=NOW) == [("ASIN1", 1200), ("ASIN2", 1200)]
+
+    def test_refresh_reads_only_new_pages(self, mock_token):
+        """Test that a refresh stops at the newest page of the previous one."""
+        pages = [
+            {"feeds": [_event(2, "alice", "ASIN1", 30), _event(1, "bob", "ASIN1", 30)], "next": "c1"},
+            {"feeds": []},
+            {"feeds": [_event(4, "carol", "ASIN1", 31), _event(3, "dave", "ASIN1", 31)], "next": "c2"},
+            {"feeds": [_event(2, "alice", "ASIN1", 30), _event(1, "bob", "ASIN1", 30)], "next": "c3"},
+        ]
+        timeline = _timeline(mock_token, pages)
+        aggregator = GoalAggregator(timeline, ["college-180"], sources=["goal"])
+
+        assert aggregator.refresh(NOW) == 2
+        assert aggregator.refresh(NOW) == 2
+        assert timeline.get_goal_timeline.call_count == 4
+        assert aggregator.goal_summary("college-180", NOW)[7]["active_users"] == 4
+
+    def test_backdated_records_do_not_end_the_read(self, mock_token):
+        """Test that an old record date is skipped and only an old posting time stops the read."""
+        pages = [
+            {"feeds": [_event(3, "alice", "ASIN1", 30, posted_day=30), _event(2, "bob", "ASIN1", 1, posted_day=29)], "next": "c1"},
+            {"feeds": [_event(1, "carol", "ASIN1", 28, posted_day=28)], "next": "c2"},
+            {"feeds": [_event(0, "dave", "ASIN1", 1, posted_day=1)], "next": "c3"},
+        ]
+        timeline = _timeline(mock_token, pages)
+        aggregator = GoalAggregator(timeline, ["college-180"], sources=["goal"])
+
+        assert aggregator.refresh(NOW) == 2
+        assert timeline.get_goal_timeline.call_count == 3
+
+    def test_page_limit_leaves_no_gap(self, mock_token):
+        """Test that pages skipped by max_pages are read by later refreshes."""
+        feed = [_event(1, "alice", "ASIN1", 28)]
+
+        def get_goal_timeline(goal, until):
+            ids = [event["body_study_record"]["event_id"] for event in feed]
+            start = 0 if until is None else ids.index(until) + 1
+            return {"feeds": feed[start:start + 1], "next": ids[start] if start + 1 < len(feed) else None}
+
+        timeline = _timeline(mock_token, [])
+        timeline.get_goal_timeline = Mock(side_effect=get_goal_timeline)
+        aggregator = GoalAggregator(timeline, ["college-180"], sources=["goal"], max_pages=2)
+        assert aggregator.refresh(NOW) == 1
+
+        feed[:0] = [_event(4, "dave", "ASIN1", 31), _event(3, "carol", "ASIN1", 30), _event(2, "bob", "ASIN1", 29)]
+        assert aggregator.refresh(NOW) == 2
+        feed.insert(0, _event(5, "erin", "ASIN1", 31))
+        assert aggregator.refresh(NOW) == 1
+        assert aggregator.refresh(NOW) == 1
+        assert aggregator.refresh(NOW) == 0
+
+        assert aggregator.goal_summary("college-180", NOW)[7]["events"] == 5
+        assert aggregator._gaps[("college-180", "goal")] == []
+
+    def test_overlapping_feeds_are_counted_once(self, mock_token):
+        """Test that an event in both the goal and achievement feed is counted once."""
+        event = _event(1, "alice", "ASIN1", 31)
+        timeline = _timeline(mock_token, [{"feeds": [event]}], [{"feeds": [event]}])
+        aggregator = GoalAggregator(timeline, ["college-180"])
+
+        assert aggregator.refresh(NOW) == 1
+        assert aggregator.goal_summary("college-180", NOW)[1]["events"] == 1
+
+    def test_expired_days_are_dropped(self, mock_token):
+        """Test that days leaving the largest window are pruned."""
+        aggregator = GoalAggregator(Mock(), windows=(1, 7))
+        aggregator.add_events("college-180", [_event(1, "alice", "ASIN1", 25)], now=NOW)
+
+        aggregator.add_events("college-180", [], now=datetime(2024, 2, 5, tzinfo=timezone.utc))
+
+        assert aggregator.goal_summary("college-180", NOW)[7]["events"] == 0
+        assert aggregator.top_materials("college-180", now=NOW) == []
@@ -0,0 +1,110 @@
+"""
+Tests for circuit breakers and their use by the transport.
+"""
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+from requests.exceptions import ConnectionError
+from stplpy.breaker import CircuitBreaker, CircuitBreakers, CLOSED, HALF_OPEN, OPEN
+from stplpy.exceptions import CircuitOpenError
+from stplpy.retry import is_retryable
+from stplpy.timeline import Timeline
+from stplpy.transport import Transport, endpoint_family
+
+
+class TestCircuitBreaker:
+    """Tests for CircuitBreaker state transitions."""
+
+    def test_opens_on_failure_rate(self):
+        """Test that the breaker opens once the failure rate crosses the threshold."""
+        breaker = CircuitBreaker("feeds", failure_rate_threshold=0.5, minimum_calls=4)
+        for success in (True, False, True, False):
+            breaker.before_request()
+            breaker.record(success, 0.1)
+
+        assert breaker.state == OPEN
+        with pytest.raises(CircuitOpenError) as exc_info:
+            breaker.before_request()
+        assert exc_info.value.family == "feeds"
+        assert exc_info.value.retry_after > 0
+        assert is_retryable(exc_info.value)
+
+    def test_slow_calls_count_as_failures(self):
+        """Test the latency threshold."""
+        breaker = CircuitBreaker("feeds", slow_call_threshold=1.0, minimum_calls=2)
+        breaker.record(True, 2.0)
+        breaker.record(True, 2.0)
+        assert breaker.state == OPEN
+
+    def test_half_open_probes_close_breaker(self):
+        """Test that limited probes are admitted after open_duration and close the breaker."""
+        breaker = CircuitBreaker("feeds", minimum_calls=1, open_duration=0.01, half_open_max_calls=2)
+        breaker.record(False, 0.1)
+        time.sleep(0.02)
+
+        breaker.before_request()
+        breaker.before_request()
+        assert breaker.state == HALF_OPEN
+        with pytest.raises(CircuitOpenError):
+            breaker.before_request()
+
+        breaker.record(True, 0.1)
+        breaker.record(True, 0.1)
+        assert breaker.state == CLOSED
+
+    def test_failed_probe_reopens(self):
+        """Test that a failed probe reopens the breaker."""
+        breaker = CircuitBreaker("feeds", minimum_calls=1, open_duration=0.01)
+        breaker.record(False, 0.1)
+        time.sleep(0.02)
+        breaker.before_request()
+        breaker.record(False, 0.1)
+        assert breaker.state == OPEN
+
+    def test_listener_may_read_breaker(self):
+        """Test that listeners run outside the lock and a failing listener is ignored."""
+        breaker = CircuitBreaker("feeds", minimum_calls=2, failure_rate_threshold=0.5)
+        seen = []
+        breaker.add_listener(Mock(side_effect=RuntimeError("listener failed")))
+        breaker.add_listener(lambda name, old, new: seen.append((old, new, breaker.snapshot()["state"])))
+
+        breaker.record(False, 0.1)
+        breaker.record(False, 0.1)
+
+        assert seen == [(CLOSED, OPEN, OPEN)]
+        assert breaker.state == OPEN
+
+
+class TestTransportBreakers:
+    """Tests for per-family breakers in Transport."""
+
+    def test_endpoint_family(self):
+        """Test grouping of URLs into endpoint families."""
+        assert endpoint_family("https://api.studyplus.jp/2/timeline_feeds/followee") == "timeline_feeds"
+        assert endpoint_family("https://api.studyplus.jp/2/study_achievements/feeds") == "timeline_feeds"
+        assert endpoint_family("https://api.studyplus.jp/2/me") == "users"
+        assert endpoint_family("https://cdn.example.com/a.jpg") == "cdn.example.com"
+
+    @patch('stplpy.transport.requests.Session.get')
+    def test_open_breaker_fails_fast(self, mock_get, mock_token):
+        """Test that a degraded family fails fast while other families still work."""
+        mock_get.side_effect = ConnectionError("timed out")
+        transitions = []
+        breakers = CircuitBreakers(minimum_calls=3)
+        breakers.add_listener(lambda name, old, new: transitions.append((name, new)))
+        timeline = Timeline(mock_token, Transport(breakers=breakers))
+
+        for _ in range(3):
+            with pytest.raises(ConnectionError):
+                timeline.get_followee_timeline()
+        with pytest.raises(CircuitOpenError):
+            timeline.get_followee_timeline()
+
+        assert mock_get.call_count == 3
+        assert transitions == [("timeline_feeds", OPEN)]
+        assert breakers.snapshot()["timeline_feeds"]["rejected"] == 1
+
+        mock_get.side_effect = None
+        mock_get.return_value = Mock(status_code=200, raise_for_status=Mock(), json=Mock(return_value={}))
+        assert timeline.get_post_detail("post_1") == {}
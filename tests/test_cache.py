@@ -0,0 +1,98 @@
+"""
+Tests for cache backends and their use by User.
+"""
+import multiprocessing
+import time
+from unittest.mock import Mock, patch
+
+from stplpy.cache import MemoryCache, SQLiteCache
+from stplpy.user import User
+
+
+def _write_from_child(path):
+    SQLiteCache(path).set("user:child", {"username": "child"})
+
+
+class TestMemoryCache:
+    """Tests for MemoryCache class."""
+
+    def test_ttl_expiry(self):
+        """Test that entries expire after their TTL."""
+        cache = MemoryCache(ttl=0.01)
+        cache.set("a", 1)
+        assert cache.get("a") == 1
+        time.sleep(0.02)
+        assert cache.get("a") is None
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted."""
+        cache = MemoryCache(max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+
+
+class TestSQLiteCache:
+    """Tests for SQLiteCache class."""
+
+    def test_shared_between_processes(self, tmp_path):
+        """Test that an entry written by another process is visible."""
+        path = str(tmp_path / "cache.db")
+        cache = SQLiteCache(path)
+        process = multiprocessing.get_context("spawn").Process(target=_write_from_child, args=(path,))
+        process.start()
+        process.join(30)
+
+        assert cache.get("user:child") == {"username": "child"}
+
+    def test_expired_entries_are_purged(self, tmp_path):
+        """Test TTL eviction in the database."""
+        cache = SQLiteCache(str(tmp_path / "cache.db"), local_ttl=0)
+        cache.set("a", {"x": 1}, ttl=-1)
+        assert cache.get("a") is None
+        assert cache.purge_expired() == 1
+
+
+class TestUserCache:
+    """Tests for User profile caching."""
+
+    @patch('stplpy.transport.requests.Session.delete')
+    @patch('stplpy.transport.requests.Session.get')
+    def test_get_user_is_cached_and_invalidated(self, mock_get, mock_delete, mock_token, mock_user_data):
+        """Test that lookups hit the cache until a relationship change invalidates them."""
+        mock_get.return_value = Mock(status_code=200, json=Mock(return_value=mock_user_data))
+        mock_delete.return_value = Mock(status_code=200)
+        user = User(mock_token, cache=MemoryCache())
+
+        assert user.get_user("test_user") == mock_user_data
+        assert user.unfollow_user("test_user") is True
+        assert mock_get.call_count == 1
+
+        user.get_user("test_user")
+        assert mock_get.call_count == 2
+
+    @patch('stplpy.transport.requests.Session.get')
+    def test_cache_is_scoped_to_viewer(self, mock_get, mock_user_data):
+        """Test that accounts sharing a cache do not see each other's profiles."""
+        mock_get.return_value = Mock(status_code=200, json=Mock(return_value=mock_user_data))
+        cache = MemoryCache()
+
+        User("token-a", cache=cache).get_user("test_user")
+        User("token-b", cache=cache).get_user("test_user")
+
+        assert mock_get.call_count == 2
+        assert not any("token" in key for key in cache._entries)
+
+    @patch('stplpy.transport.requests.Session.get')
+    def test_returned_profile_does_not_alias_cache(self, mock_get, mock_token, mock_user_data):
+        """Test that mutating a returned profile leaves the cached entry intact."""
+        mock_get.return_value = Mock(status_code=200, json=Mock(return_value=dict(mock_user_data)))
+        user = User(mock_token, cache=MemoryCache())
+
+        user.get_user("test_user")["username"] = "changed"
+        user.get_user("test_user")["username"] = "changed again"
+
+        assert user.get_user("test_user")["username"] == mock_user_data["username"]
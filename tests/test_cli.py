@@ -0,0 +1,99 @@
+"""
+Tests for the stplpy command-line crawler.
+"""
+import json
+from unittest.mock import Mock, patch
+
+import pytest
+
+from stplpy.cli import main
+
+
+def _page(data, status_code=200):
+    """Build a mocked response."""
+    response = Mock(status_code=status_code, raise_for_status=Mock())
+    response.json.return_value = data
+    return response
+
+
+class TestTimelineCommand:
+    """Tests for timeline crawls."""
+
+    @patch('stplpy.transport.requests.Session.get')
+    def test_exports_ndjson_and_metrics(self, mock_get, tmp_path):
+        """Test that all pages are exported with their source and metrics are written."""
+        mock_get.side_effect = [
+            _page({"feeds": [{"id": 1}, {"id": 2}], "next": "c1"}),
+            _page({"feeds": [{"id": 3}]}),
+        ]
+        output = tmp_path / "feed.ndjson"
+        metrics = tmp_path / "metrics.json"
+
+        status = main(["timeline", "followee", "--token", "t", "-o", str(output),
+                       "--metrics", str(metrics), "--progress-interval", "0"])
+
+        rows = [json.loads(line) for line in output.read_text().splitlines()]
+        assert status == 0
+        assert [row["id"] for row in rows] == [1, 2, 3]
+        assert rows[0]["_source"] == "timeline:followee"
+        assert json.loads(metrics.read_text())["items"] == 3
+
+    def test_parquet_requires_output(self):
+        """Test that Parquet export without an output file is rejected."""
+        with pytest.raises(SystemExit):
+            main(["timeline", "followee", "--token", "t", "--format", "parquet"])
+
+
+class TestUsersCommand:
+    """Tests for follower/followee crawls."""
+
+    @patch('stplpy.transport.requests.Session.get')
+    def test_checkpoint_resumes_after_failure(self, mock_get, tmp_path):
+        """Test that a failed crawl resumes from the checkpointed page."""
+        output = tmp_path / "followers.ndjson"
+        checkpoint = tmp_path / "job.json"
+        args = ["followers", "target", "--token", "t", "-o", str(output), "--prefetch", "0",
+                "--checkpoint", str(checkpoint), "--progress-interval", "0"]
+
+        mock_get.side_effect = [_page({"users": [{"user_id": "a"}]}), _page({}, status_code=500)]
+        assert main(args) == 1
+        assert json.loads(checkpoint.read_text())["sources"]["followers:target"]["page"] == 2
+
+        mock_get.side_effect = [_page({"users": [{"user_id": "b"}]}), _page({"users": []})]
+        assert main(args) == 0
+
+        rows = [json.loads(line) for line in output.read_text().splitlines()]
+        assert [row["user_id"] for row in rows] == ["a", "b"]
+        assert "page=2" in mock_get.call_args_list[2][0][0]
+        assert json.loads(checkpoint.read_text())["sources"]["followers:target"]["done"] is True
+
+    @patch('stplpy.transport.requests.Session.get')
+    def test_limit_stops_and_resumes(self, mock_get, tmp_path):
+        """Test that a page limit stops the crawl and a rerun continues after it."""
+        mock_get.side_effect = lambda url, **kwargs: _page({"users": [{"user_id": url.split("page=")[1][0]}]})
+        checkpoint = tmp_path / "job.json"
+        args = ["followees", "target", "--token", "t", "-o", str(tmp_path / "out.ndjson"), "--limit", "2",
+                "--checkpoint", str(checkpoint), "--prefetch", "0", "--progress-interval", "0"]
+
+        assert main(args) == 0
+        state = json.loads(checkpoint.read_text())["sources"]["followees:target"]
+        assert state == {"page": 3}
+        calls = mock_get.call_count
+        assert main(args) == 0
+        assert mock_get.call_count == calls
+
+
+class TestCacheDir:
+    """Tests for the shared page cache."""
+
+    @patch('stplpy.transport.requests.Session.get')
+    def test_cache_dir_serves_repeat_runs(self, mock_get, tmp_path):
+        """Test that pages cached by one run are not fetched again by the next."""
+        mock_get.side_effect = lambda url, **kwargs: _page({"feeds": [{"id": 1}]})
+        args = ["timeline", "goal", "college-180", "--token", "t", "-o", str(tmp_path / "out.ndjson"),
+                "--cache-dir", str(tmp_path / "cache"), "--progress-interval", "0"]
+
+        assert main(args) == 0
+        calls = mock_get.call_count
+        assert main(args) == 0
+        assert mock_get.call_count == calls
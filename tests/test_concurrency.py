@@ -0,0 +1,105 @@
+"""
+Stress tests for sharing one client across threads and processes.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock, patch
+
+import pytest
+
+from stplpy import StudyPlus
+
+
+def _feed_response(url, **kwargs):
+    """Build a timeline page echoing the requested cursor."""
+    response = Mock(status_code=200, raise_for_status=Mock())
+    response.json.return_value = {"feeds": [{"url": url}], "next": None}
+    return response
+
+
+class TestThreadSafety:
+    """Tests hammering one client from many threads."""
+
+    @patch('stplpy.transport.requests.Session.get')
+    def test_shared_client_under_load(self, mock_get, mock_token):
+        """Test that concurrent calls get their own responses, sessions and sub-clients."""
+        mock_get.side_effect = _feed_response
+        client = StudyPlus(mock_token)
+        sessions = set()
+        timelines = set()
+        lock = threading.Lock()
+
+        def call(i):
+            timeline = client.timeline
+            result = timeline.get_followee_timeline(str(i))
+            with lock:
+                sessions.add(id(client.transport.session))
+                timelines.add(id(timeline))
+            return result["feeds"][0]["url"].endswith(f"until={i}")
+
+        with ThreadPoolExecutor(max_workers=32) as executor:
+            results = list(executor.map(call, range(2000)))
+
+        assert all(results)
+        assert mock_get.call_count == 2000
+        assert len(timelines) == 1
+        assert 1 < len(sessions) <= 32
+
+    def test_first_use_races_share_one_transport(self, mock_token):
+        """Test that threads racing on first use see one transport and one timeline."""
+        for _ in range(20):
+            client = StudyPlus(mock_token)
+            barrier = threading.Barrier(16)
+
+            def first_use(_):
+                barrier.wait()
+                return client.user.transport, client.timeline
+
+            with ThreadPoolExecutor(max_workers=16) as executor:
+                results = list(executor.map(first_use, range(16)))
+            assert len({id(transport) for transport, _ in results}) == 1
+            assert len({id(timeline) for _, timeline in results}) == 1
+            assert client.timeline.transport is client.transport
+
+    def test_create_token_across_threads(self, mock_token):
+        """Test that post tokens generated concurrently do not collide."""
+        timeline = StudyPlus(mock_token).timeline
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            tokens = list(executor.map(lambda _: timeline.create_token(20), range(5000)))
+        assert len(set(tokens)) == len(tokens)
+
+    def test_headers_are_read_only(self, mock_token):
+        """Test that shared request headers cannot be mutated."""
+        client = StudyPlus(mock_token)
+        with pytest.raises(TypeError):
+            client.timeline.headers["Authorization"] = "OAuth other"
+        with pytest.raises(TypeError):
+            client.user.headers["Authorization"] = "OAuth other"
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires os.fork")
+class TestForkSafety:
+    """Tests for using a client in a forked child."""
+
+    def test_child_gets_new_session_and_random_state(self, mock_token):
+        """Test that a forked child neither reuses the session nor repeats tokens."""
+        client = StudyPlus(mock_token)
+        parent_session = client.transport.session
+        client.timeline.create_token()
+
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            new_session = client.transport.session is not parent_session
+            os.write(write_fd, f"{new_session} {client.timeline.create_token(20)}".encode())
+            os._exit(0)
+        os.close(write_fd)
+        with os.fdopen(read_fd) as f:
+            new_session, child_token = f.read().split()
+        os.waitpid(pid, 0)
+
+        assert new_session == "True"
+        assert child_token != client.timeline.create_token(20)
+        assert client.transport.session is parent_session
@@ -0,0 +1,53 @@
+"""
+Tests for timeline event deduplication.
+"""
+from stplpy.dedup import BloomDeduper, WindowDeduper, dedup, event_key
+
+
+def _event(event_id):
+    return {"feed_type": "study_record", "body_study_record": {"event_id": event_id}}
+
+
+class TestDedup:
+    """Tests for dedup function and dedupers."""
+
+    def test_exact_window_dedup(self):
+        """Test that repeats inside the window are dropped and the ratio is reported."""
+        deduper = WindowDeduper(window=10)
+        events = [_event(i) for i in (1, 2, 2, 3, 1)]
+
+        result = [event_key(e) for e in dedup(events, deduper)]
+
+        assert result == ["1", "2", "3"]
+        assert deduper.stats()["dedup_ratio"] == 0.4
+
+    def test_window_is_bounded(self):
+        """Test that keys older than the window are forgotten."""
+        deduper = WindowDeduper(window=2)
+        for key in ("a", "b", "c"):
+            deduper.seen(key)
+        assert not deduper.seen("a")
+        assert len(deduper._keys) == 2
+
+    def test_shared_deduper_across_feeds(self):
+        """Test deduplicating overlapping feeds with one deduper."""
+        deduper = WindowDeduper()
+        followee = list(dedup([_event(1), _event(2)], deduper))
+        goal = list(dedup([_event(2), _event(3)], deduper))
+        assert [event_key(e) for e in followee + goal] == ["1", "2", "3"]
+
+    def test_content_key_without_event_id(self):
+        """Test that events without ids are keyed by content."""
+        assert event_key({"comment": "a"}) == event_key({"comment": "a"})
+        assert event_key({"comment": "a"}) != event_key({"comment": "b"})
+
+    def test_bloom_dedup_fixed_memory(self):
+        """Test the approximate mode stays within budget with few false positives."""
+        deduper = BloomDeduper(memory_bytes=64 * 1024, error_rate=0.01)
+        memory = deduper.memory_bytes()
+
+        false_positives = sum(deduper.seen(f"event-{i}") for i in range(20000))
+
+        assert deduper.memory_bytes() == memory <= 64 * 1024
+        assert false_positives < 20000 * 0.03
+        assert deduper.seen("event-19999")
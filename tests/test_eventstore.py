@@ -0,0 +1,102 @@
+"""
+Tests for EventStore class.
+"""
+from stplpy.eventstore import EventStore
+
+
+def _event(event_id, user_id, material, record_datetime, duration=60):
+    return {
+        "feed_type": "study_record",
+        "user_id": user_id,
+        "body_study_record": {
+            "event_id": event_id,
+            "material_code": material,
+            "record_datetime": record_datetime,
+            "duration": duration,
+        },
+    }
+
+
+EVENTS = [
+    _event(1, "alice", "ASIN1", "2024-01-01T10:00:00Z"),
+    _event(2, "bob", "ASIN1", "2024-01-02T10:00:00Z"),
+    _event(3, "alice", "ASIN2", "2024-01-03T10:00:00Z", 120),
+    _event(4, "carol", None, "2024-01-04T10:00:00Z"),
+]
+
+
+class TestEventStore:
+    """Tests for indexing and querying events."""
+
+    def test_extend_skips_duplicates(self):
+        """Test that an event id is only stored once."""
+        store = EventStore()
+        assert store.extend(EVENTS + EVENTS[:2]) == 4
+        assert len(store) == 4
+
+    def test_point_queries(self):
+        """Test user and material hash index lookups."""
+        store = EventStore()
+        store.extend(EVENTS)
+
+        assert [e["event_id"] for e in store.query(user_id="alice")] == ["1", "3"]
+        assert [e["event_id"] for e in store.query(material_code="ASIN1")] == ["1", "2"]
+        assert [e["event_id"] for e in store.query(user_id="alice", material_code="ASIN2")] == ["3"]
+        assert store.query(user_id="nobody") == []
+        assert store.get("3") == {
+            "event_id": "3",
+            "feed_type": "study_record",
+            "user_id": "alice",
+            "material_code": "ASIN2",
+            "record_datetime": "2024-01-03T10:00:00Z",
+            "duration": 120,
+        }
+
+    def test_range_queries(self):
+        """Test the sorted time index, including events added after a query."""
+        store = EventStore()
+        store.extend(EVENTS[1:])
+        assert [e["event_id"] for e in store.query(start="2024-01-02T00:00:00Z", end="2024-01-04T00:00:00Z")] == ["2", "3"]
+
+        store.add(EVENTS[0])
+        assert [e["event_id"] for e in store.query(end="2024-01-02T00:00:00Z")] == ["1"]
+        assert [e["event_id"] for e in store.query(user_id="alice", start="2024-01-02T00:00:00Z")] == ["3"]
+
+    def test_snapshot_round_trip(self, tmp_path):
+        """Test saving and loading a binary snapshot."""
+        store = EventStore()
+        store.extend(EVENTS)
+        path = tmp_path / "events.bin"
+        store.save(str(path))
+
+        loaded = EventStore.load(str(path))
+
+        assert len(loaded) == 4
+        assert loaded.query() == store.query()
+        assert [e["event_id"] for e in loaded.query(user_id="alice")] == ["1", "3"]
+        assert not loaded.add(EVENTS[0])
+
+    def test_snapshot_keeps_nul_characters(self, tmp_path):
+        """Test that strings containing NUL survive a snapshot."""
+        store = EventStore()
+        store.add(_event(1, "al\0ice", "ASIN\0", "2024-01-01T10:00:00Z"))
+        path = tmp_path / "events.bin"
+        store.save(str(path))
+
+        loaded = EventStore.load(str(path))
+
+        assert loaded.query() == store.query()
+        assert loaded.users() == ["al\0ice"]
+
+    def test_malformed_events_are_skipped(self):
+        """Test that bad record times are skipped and out-of-range durations clamped."""
+        store = EventStore()
+        added = store.extend([
+            _event(1, "alice", "ASIN1", "not a date"),
+            _event(2, "alice", "ASIN1", "2024-01-01T10:00:00Z", -5),
+            _event(3, "alice", "ASIN1", "2024-01-02T10:00:00Z", 2 ** 40),
+        ])
+
+        assert added == 2
+        assert store.get("1") is None
+        assert [e["duration"] for e in store.query()] == [0, 2 ** 32 - 1]
@@ -0,0 +1,75 @@
+"""
+Tests for follow graph snapshots.
+"""
+from unittest.mock import Mock
+
+from stplpy.follow_graph import FollowGraphStore, FollowSnapshot, diff_sorted, take_snapshot
+
+
+def _user(*pages):
+    user = Mock()
+    user.iter_followers.side_effect = lambda target_id, prefetch=0: iter(
+        [[{"user_id": user_id} for user_id in page] for page in pages]
+    )
+    return user
+
+
+class TestFollowSnapshot:
+    """Tests for snapshot storage and diffing."""
+
+    def test_diff_sorted(self):
+        """Test the linear merge of two sorted id arrays."""
+        assert diff_sorted([1, 3, 5, 7], [2, 3, 7, 8]) == ([2, 8], [1, 5])
+
+    def test_save_and_load(self, tmp_path):
+        """Test that numeric and string ids round-trip with their listing order."""
+        for listing in (["30", "10", "20"], ["carol", "alice", "bob"]):
+            snapshot = FollowSnapshot("12345", "follower", listing, taken_at=1700000000.0)
+            path = str(tmp_path / "snapshot.fgs")
+            snapshot.save(path)
+
+            loaded = FollowSnapshot.load(path)
+            assert loaded.listing() == listing
+            assert list(loaded) == sorted(listing)
+            assert (loaded.target_id, loaded.relation, loaded.taken_at) == ("12345", "follower", 1700000000.0)
+            assert listing[0] in loaded and "missing" not in loaded
+
+    def test_events(self):
+        """Test that additions and removals become follow and unfollow events."""
+        old = FollowSnapshot("12345", "follower", ["1", "2", "3"], taken_at=0)
+        new = FollowSnapshot("12345", "follower", ["4", "1", "3"], taken_at=86400)
+
+        assert old.diff(new) == (["4"], ["2"])
+        assert [(event["type"], event["user_id"]) for event in old.events(new)] == [("follow", "4"), ("unfollow", "2")]
+        assert old.events(new)[0]["detected_at"] == "1970-01-02T00:00:00Z"
+
+
+class TestTakeSnapshot:
+    """Tests for full and incremental crawls."""
+
+    def test_incremental_refresh_stops_at_matching_page(self):
+        """Test that the rest of the previous listing is reused after a matching page."""
+        previous = FollowSnapshot("t", "follower", ["5", "4", "3", "2", "1"])
+        user = _user(["7", "6"], ["5", "4"], ["99", "98"])
+
+        snapshot = take_snapshot(user, "t", previous=previous)
+
+        assert snapshot.listing() == ["7", "6", "5", "4", "3", "2", "1"]
+
+    def test_expected_count_keeps_crawling(self):
+        """Test that a mismatching count forces crawling past a matching page."""
+        previous = FollowSnapshot("t", "follower", ["5", "4", "3", "2", "1"])
+        user = _user(["5", "4"], ["3", "1"], [])
+
+        snapshot = take_snapshot(user, "t", previous=previous, expected_count=4)
+
+        assert snapshot.listing() == ["5", "4", "3", "1"]
+
+    def test_store_refresh(self, tmp_path):
+        """Test that the store keeps snapshots and reports changes between runs."""
+        store = FollowGraphStore(str(tmp_path))
+
+        assert store.refresh(_user(["2", "1"], []), "t") == []
+        assert store.latest("t").listing() == ["2", "1"]
+        events = store.refresh(_user(["3", "2"], []), "t")
+        assert [(event["type"], event["user_id"]) for event in events] == [("follow", "3"), ("unfollow", "1")]
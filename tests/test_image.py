@@ -0,0 +1,70 @@
+"""
+Tests for image preprocessing helpers.
+"""
+import io
+
+import pytest
+from stplpy.image import detect_image_format, prepare_upload, preprocess_image
+from stplpy.exceptions import ValidationError
+
+
+class TestDetectImageFormat:
+    """Tests for detect_image_format function."""
+
+    @pytest.mark.parametrize("header,expected", [
+        (b"\xff\xd8\xff\xe0\x00\x10JFIF\x00", "jpeg"),
+        (b"\x89PNG\r\n\x1a\n\x00\x00\x00\x0d", "png"),
+        (b"GIF89a\x01\x00\x01\x00\x00\x00", "gif"),
+        (b"RIFF\x00\x00\x00\x00WEBPVP8 ", "webp"),
+        (b"\x00\x00\x00\x18ftypheic\x00\x00", "heic"),
+        (b"not an image", None),
+    ])
+    def test_detect_image_format(self, header, expected):
+        """Test detection from magic bytes."""
+        assert detect_image_format(header) == expected
+
+
+class TestPrepareUpload:
+    """Tests for prepare_upload function."""
+
+    def test_prepare_upload_uses_real_format(self, tmp_path):
+        """Test that the MIME type follows the file content, not a fixed label."""
+        path = tmp_path / "photo.jpg"
+        path.write_bytes(b"\x89PNG\r\n\x1a\n" + b"\x00" * 16)
+
+        file_name, data, mime_type = prepare_upload(str(path))
+
+        assert file_name == "image.png"
+        assert mime_type == "image/png"
+        assert data == path.read_bytes()
+
+    def test_prepare_upload_file_not_found(self):
+        """Test prepare_upload with a missing file."""
+        with pytest.raises(ValidationError):
+            prepare_upload("/nonexistent/file.jpg")
+
+
+class TestPreprocessImage:
+    """Tests for preprocess_image function."""
+
+    def test_preprocess_image_downsizes_and_strips_metadata(self):
+        """Test that large images are shrunk and re-encoded as JPEG."""
+        Image = pytest.importorskip("PIL.Image")
+        buffer = io.BytesIO()
+        exif = Image.Exif()
+        exif[0x010F] = "PhoneMaker"
+        Image.new("RGB", (3000, 2000), (200, 40, 40)).save(buffer, format="JPEG", exif=exif)
+
+        data, mime_type = preprocess_image(buffer.getvalue(), max_size=512, max_bytes=64 * 1024)
+
+        result = Image.open(io.BytesIO(data))
+        assert mime_type == "image/jpeg"
+        assert max(result.size) <= 512
+        assert len(data) <= 64 * 1024
+        assert "exif" not in result.info
+
+    def test_preprocess_image_invalid_data(self):
+        """Test that undecodable data raises ValidationError."""
+        pytest.importorskip("PIL")
+        with pytest.raises(ValidationError):
+            preprocess_image(b"not an image")
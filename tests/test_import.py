@@ -0,0 +1,69 @@
+"""
+Tests for lazy package import and client construction.
+"""
+import subprocess
+import sys
+
+import stplpy
+from stplpy import StudyPlus
+
+
+def _run(code):
+    """Run code in a fresh interpreter and return its stdout."""
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return result.stdout.strip()
+
+
+class TestLazyImport:
+    """Tests for deferred submodule imports."""
+
+    def test_import_does_not_load_requests(self):
+        """Test that importing the package leaves requests and the clients unloaded."""
+        output = _run(
+            "import sys, stplpy; "
+            "print(any(m in sys.modules for m in ('requests', 'stplpy.user', 'stplpy.timeline', 'stplpy.transport')))"
+        )
+        assert output == "False"
+
+    def test_lazy_attributes_resolve(self):
+        """Test that lazily exported names resolve to the submodule objects."""
+        from stplpy.cache import MemoryCache
+        from stplpy.transport import Transport
+
+        assert stplpy.MemoryCache is MemoryCache
+        assert stplpy.Transport is Transport
+        assert stplpy.utils.get_event_id({"id": 1}) == "1"
+        assert set(stplpy.__all__) <= set(dir(stplpy))
+
+    def test_import_leaves_heavy_modules_unloaded(self):
+        """Test that optional features and their dependencies load only on use."""
+        heavy = (
+            'stplpy.cli', 'stplpy.eventstore', 'stplpy.aggregate', 'stplpy.follow_graph', 'stplpy.pipeline',
+            'stplpy.profiling', 'stplpy.importer', 'stplpy.resolver', 'PIL', 'urllib3', 'sqlite3',
+        )
+        output = _run(f"import sys, stplpy; print([m for m in {heavy!r} if m in sys.modules])")
+        assert output == "[]"
+
+
+class TestLazyClients:
+    """Tests for on-demand construction of sub-clients."""
+
+    def test_sub_clients_built_on_first_use(self, mock_token):
+        """Test that user and timeline clients are created lazily and share a transport."""
+        client = StudyPlus(mock_token)
+        assert client._user is None
+        assert client._timeline is None
+
+        assert client.timeline is client.timeline
+        assert client._user is None
+        assert client.user.transport is client.timeline.transport
+
+    def test_explicit_transport_is_used(self, mock_token):
+        """Test that a given transport is shared by the sub-clients."""
+        from stplpy.transport import Transport
+
+        transport = Transport()
+        client = StudyPlus(mock_token, transport=transport)
+
+        assert client.user.transport is transport
+        assert client.timeline.transport is transport
@@ -0,0 +1,108 @@
+"""
+Tests for bulk study-record import.
+"""
+import json
+from unittest.mock import Mock
+
+import pytest
+from stplpy.importer import derive_post_token, import_study_records, validate_record
+from stplpy.ratelimit import RateLimiter
+from stplpy.exceptions import APIError, ValidationError
+
+
+class TestValidateRecord:
+    """Tests for validate_record function."""
+
+    def test_validate_record_normalizes(self):
+        """Test that CSV strings are converted and datetimes normalized to UTC."""
+        record = validate_record({"duration": "90", "record_datetime": "2024-01-01T09:00:00+09:00", "material_code": ""})
+        assert record == {
+            "material_code": None,
+            "duration": 90,
+            "comment": "",
+            "record_datetime": "2024-01-01T00:00:00Z",
+        }
+
+    @pytest.mark.parametrize("record", [
+        {"duration": "abc", "record_datetime": "2024-01-01T00:00:00Z"},
+        {"duration": 0, "record_datetime": "2024-01-01T00:00:00Z"},
+        {"duration": 60, "record_datetime": "yesterday"},
+        {"duration": 60},
+    ])
+    def test_validate_record_rejects_invalid(self, record):
+        """Test that bad durations and datetimes are rejected."""
+        with pytest.raises(ValidationError):
+            validate_record(record)
+
+
+class TestDerivePostToken:
+    """Tests for derive_post_token function."""
+
+    def test_derive_post_token_is_stable(self):
+        """Test that identical records get identical tokens and others differ."""
+        record = validate_record({"duration": 60, "record_datetime": "2024-01-01T00:00:00Z"})
+        other = dict(record, duration=61)
+        assert derive_post_token(record) == derive_post_token(dict(record))
+        assert derive_post_token(record) != derive_post_token(other)
+        assert len(derive_post_token(record)) == 10
+        assert derive_post_token(record).isalnum()
+
+
+class TestImportStudyRecords:
+    """Tests for import_study_records function."""
+
+    def test_import_csv_is_idempotent(self, tmp_path):
+        """Test that re-running an import posts the same tokens."""
+        path = tmp_path / "records.csv"
+        path.write_text(
+            "duration,record_datetime,comment\n"
+            "60,2024-01-01T00:00:00Z,a\n"
+            "120,2024-01-02T00:00:00Z,b\n"
+        )
+        timeline = Mock()
+        limiter = RateLimiter(1000, burst=1000)
+
+        first = import_study_records(timeline, str(path), rate_limiter=limiter, progress=None)
+        second = import_study_records(timeline, str(path), rate_limiter=limiter, progress=None)
+
+        assert first.posted == second.posted == 2
+        tokens = [c.kwargs["post_token"] for c in timeline.post_study_record.call_args_list]
+        assert sorted(tokens[:2]) == sorted(tokens[2:])
+
+    def test_import_csv_with_byte_order_mark(self, tmp_path):
+        """Test that a BOM at the start of a CSV export does not corrupt the first header."""
+        path = tmp_path / "records.csv"
+        path.write_bytes("duration,record_datetime\n60,2024-01-01T00:00:00Z\n".encode("utf-8-sig"))
+        timeline = Mock()
+
+        result = import_study_records(timeline, str(path), progress=None)
+
+        assert result.posted == 1
+        assert timeline.post_study_record.call_args.kwargs["duration"] == 60
+
+    def test_import_validates_before_posting(self, tmp_path):
+        """Test that no record is posted when any row is invalid."""
+        path = tmp_path / "records.ndjson"
+        path.write_text(
+            json.dumps({"duration": 60, "record_datetime": "2024-01-01T00:00:00Z"}) + "\n"
+            + json.dumps({"duration": -5, "record_datetime": "2024-01-01T00:00:00Z"}) + "\n"
+        )
+        timeline = Mock()
+
+        with pytest.raises(ValidationError, match="Row 2"):
+            import_study_records(timeline, str(path), progress=None)
+        timeline.post_study_record.assert_not_called()
+
+    def test_import_reports_failures(self, tmp_path):
+        """Test that permanently failing records are counted and reported."""
+        path = tmp_path / "records.ndjson"
+        path.write_text(json.dumps({"duration": 60, "record_datetime": "2024-01-01T00:00:00Z"}) + "\n")
+        timeline = Mock()
+        timeline.post_study_record.side_effect = APIError("bad request", 400)
+        reports = []
+
+        result = import_study_records(timeline, str(path), rate_limiter=RateLimiter(1000), progress=reports.append)
+
+        assert result.failed == 1 and result.posted == 0
+        assert reports[-1] is result
+        assert "1/1 records" in str(result)
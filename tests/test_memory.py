@@ -0,0 +1,114 @@
+"""
+Tests for MemoryBudget and budgeted components.
+"""
+import threading
+import time
+
+from stplpy import StudyPlus
+from stplpy.cache import MemoryCache
+from stplpy.dedup import WindowDeduper
+from stplpy.memory import MemoryBudget, estimate_size
+from stplpy.pipeline import Pipeline
+from stplpy.timeline import Timeline
+
+
+def _profile(i):
+    return {"user_id": str(i), "nickname": "x" * 200}
+
+
+class TestMemoryBudget:
+    """Tests for eviction, reservations and usage reporting."""
+
+    def test_estimate_size(self):
+        """Test that nested values are counted and shared objects counted once."""
+        shared = "y" * 1000
+        assert estimate_size({"a": [shared, shared]}) < estimate_size({"a": [shared, "z" * 1000]})
+        assert estimate_size([_profile(1)]) > estimate_size(_profile(1))
+
+    def test_cache_evicts_to_stay_within_budget(self):
+        """Test that a budgeted cache drops least recently used entries."""
+        entry_size = estimate_size("user:0") + estimate_size(_profile(0))
+        budget = MemoryBudget(entry_size * 10)
+        cache = MemoryCache(budget=budget)
+
+        for i in range(50):
+            cache.set(f"user:{i}", _profile(i))
+
+        assert budget.used() <= budget.limit_bytes
+        assert cache.get("user:49") is not None
+        assert cache.get("user:0") is None
+        assert budget.stats()["evicted_bytes"] > 0
+
+    def test_largest_component_shrinks_first(self):
+        """Test that eviction is coordinated across components by size."""
+        budget = MemoryBudget(10 * 200)
+        deduper = WindowDeduper()
+        budget.register("dedup", deduper)
+        cache = MemoryCache(budget=budget)
+        for i in range(30):
+            deduper.seen(str(i))
+
+        cache.set("a", 1)
+
+        usage = budget.usage()
+        assert usage["dedup"] < 30 * 200
+        assert usage["cache"] > 0
+        assert sum(usage.values()) <= budget.limit_bytes
+
+    def test_reserve_waits_for_release(self):
+        """Test that a buffer blocks while the budget is exhausted and resumes on release."""
+        budget = MemoryBudget(100)
+        assert budget.reserve("a", 80)
+        assert budget.reserve("b", 80)  # A buffer holding nothing is always admitted.
+        assert not budget.reserve("b", 10, timeout=0.01)
+
+        threading.Timer(0.05, budget.release, args=("a", 80)).start()
+        assert budget.reserve("b", 10, timeout=5)
+        assert budget.usage() == {"b": 90}
+        assert budget.stats()["waits"] == 2
+
+
+class TestBudgetedBuffers:
+    """Tests for backpressure in prefetching and pipelines."""
+
+    def test_prefetch_pauses_when_budget_is_full(self, mock_token):
+        """Test that reading ahead holds back once the budget is reached."""
+        page_size = estimate_size({"feeds": [_profile(0)], "next": "c0"})
+        budget = MemoryBudget(page_size + 1)
+        fetched = []
+
+        def fetch(until):
+            fetched.append(until)
+            return {"feeds": [_profile(len(fetched))], "next": f"c{len(fetched)}"}
+
+        pages = Timeline(mock_token, budget=budget).iter_pages(fetch, limit=10, prefetch=5)
+        next(pages)
+        time.sleep(0.3)
+
+        assert len(fetched) <= 3
+        assert budget.usage()["prefetch"] <= page_size + 100
+        pages.close()
+        time.sleep(0.2)
+        assert budget.used() == 0
+
+    def test_pipeline_reservations_are_returned(self):
+        """Test that queued pipeline items release their reservations."""
+        budget = MemoryBudget(estimate_size(_profile(0)) * 3)
+        pipeline = Pipeline((_profile(i) for i in range(20)), budget=budget).map(lambda p: p["user_id"], workers=2)
+
+        assert sorted(pipeline.collect(), key=int) == [str(i) for i in range(20)]
+        assert budget.used() == 0
+
+
+class TestClientBudget:
+    """Tests for the client-wide memory budget."""
+
+    def test_client_reports_usage(self, mock_token):
+        """Test that the client attaches its cache and timeline to the budget."""
+        cache = MemoryCache()
+        client = StudyPlus(mock_token, cache=cache, memory_budget=1024 * 1024)
+        cache.set("user:x", _profile(1))
+
+        assert client.memory_usage()["cache"] > 0
+        assert client.timeline.budget is client.memory_budget
+        assert StudyPlus(mock_token).memory_usage() == {}
@@ -0,0 +1,88 @@
+"""
+Tests for Outbox class.
+"""
+import time
+from unittest.mock import Mock
+
+from stplpy.outbox import Outbox
+from stplpy.ratelimit import RateLimiter
+from stplpy.exceptions import APIError, ResourceNotFoundError
+
+
+def _outbox(tmp_path, timeline, **kwargs):
+    return Outbox(timeline, str(tmp_path / "outbox.db"), rate_limiter=RateLimiter(1000, burst=1000), **kwargs)
+
+
+class TestOutbox:
+    """Tests for enqueueing and flushing writes."""
+
+    def test_enqueue_is_durable(self, tmp_path):
+        """Test that queued writes survive reopening the outbox."""
+        timeline = Mock()
+        timeline.create_token.return_value = "token123"
+        outbox = _outbox(tmp_path, timeline)
+        outbox.enqueue_study_record(duration=60, comment="Math")
+        outbox.close()
+
+        reopened = _outbox(tmp_path, timeline)
+        assert reopened.counts()["pending"] == 1
+        timeline.post_study_record.assert_not_called()
+
+    def test_flush_sends_with_preassigned_token(self, tmp_path):
+        """Test that flushing posts each write with its enqueue-time post_token."""
+        timeline = Mock()
+        outbox = _outbox(tmp_path, timeline)
+        outbox.enqueue_study_record(duration=60, record_datetime="2024-01-01T00:00:00Z", post_token="tok1")
+        outbox.enqueue_comment("post_1", "nice", post_token="tok2")
+
+        assert outbox.flush_once() == 2
+
+        timeline.post_study_record.assert_called_once_with(
+            post_token="tok1", material_code=None, duration=60, comment="", record_datetime="2024-01-01T00:00:00Z"
+        )
+        timeline.send_comment.assert_called_once_with("post_1", "nice", post_token="tok2")
+        assert outbox.counts() == {"pending": 0, "done": 2, "failed": 0}
+
+    def test_flush_retries_server_errors_and_fails_client_errors(self, tmp_path):
+        """Test that 5xx errors are retried later while 404s fail permanently."""
+        timeline = Mock()
+        timeline.post_study_record.side_effect = APIError("boom", 503)
+        timeline.send_comment.side_effect = ResourceNotFoundError("gone")
+        outbox = _outbox(tmp_path, timeline, base_backoff=0.01)
+        outbox.enqueue_study_record(duration=60, post_token="tok1")
+        outbox.enqueue_comment("post_1", "nice", post_token="tok2")
+
+        outbox.flush_once()
+        assert outbox.counts() == {"pending": 1, "done": 0, "failed": 1}
+        assert outbox.failed()[0]["post_token"] == "tok2"
+
+        timeline.post_study_record.side_effect = None
+        time.sleep(0.02)
+        outbox.flush_once()
+        assert outbox.counts() == {"pending": 0, "done": 1, "failed": 1}
+
+    def test_background_flusher_drains(self, tmp_path):
+        """Test that the background thread drains a burst of writes."""
+        timeline = Mock()
+        with _outbox(tmp_path, timeline, batch_size=10) as outbox:
+            for i in range(100):
+                outbox.enqueue_comment("post_1", f"comment {i}", post_token=f"tok{i}")
+            assert outbox.join(timeout=10)
+        assert timeline.send_comment.call_count == 100
+
+
+class TestRateLimiter:
+    """Tests for RateLimiter class."""
+
+    def test_try_acquire_respects_burst(self):
+        """Test that the bucket empties after burst tokens."""
+        limiter = RateLimiter(rate=1, burst=2)
+        assert limiter.try_acquire()
+        assert limiter.try_acquire()
+        assert not limiter.try_acquire()
+
+    def test_acquire_timeout(self):
+        """Test that acquire gives up after the timeout."""
+        limiter = RateLimiter(rate=1, burst=1)
+        limiter.penalize(10)
+        assert not limiter.acquire(timeout=0.01)
@@ -0,0 +1,87 @@
+"""
+Tests for Pipeline class.
+"""
+import threading
+import time
+
+import pytest
+
+from stplpy.pipeline import Pipeline
+
+
+class TestPipeline:
+    """Tests for stage chaining, concurrency, backpressure and metrics."""
+
+    def test_stages_transform_items(self):
+        """Test map, flat_map and filter stages in sequence."""
+        pipeline = (
+            Pipeline(range(10))
+            .map(lambda x: x * 2, workers=3)
+            .flat_map(lambda x: [x, x + 1])
+            .filter(lambda x: x % 4 == 0, name="multiples")
+        )
+
+        assert sorted(pipeline.collect()) == [0, 4, 8, 12, 16]
+        metrics = pipeline.metrics()
+        assert list(metrics) == ["source", "1:<lambda>", "2:<lambda>", "multiples"]
+        assert metrics["source"]["emitted"] == 10
+        assert metrics["multiples"]["received"] == 20
+        assert metrics["multiples"]["emitted"] == 5
+
+    def test_stage_concurrency_is_limited(self):
+        """Test that a stage never runs more items at once than its workers."""
+        lock = threading.Lock()
+        active = [0, 0]
+
+        def slow(x):
+            with lock:
+                active[0] += 1
+                active[1] = max(active[1], active[0])
+            time.sleep(0.01)
+            with lock:
+                active[0] -= 1
+            return x
+
+        assert sorted(Pipeline(range(20)).map(slow, workers=4).collect()) == list(range(20))
+        assert 1 < active[1] <= 4
+
+    def test_bounded_queue_applies_backpressure(self):
+        """Test that a slow stage holds back the source instead of buffering everything."""
+        produced = []
+
+        def source():
+            for i in range(100):
+                produced.append(i)
+                yield i
+
+        pipeline = Pipeline(source(), queue_size=2).map(lambda x: x, workers=1, queue_size=2)
+        items = iter(pipeline)
+        next(items)
+        time.sleep(0.05)
+
+        assert len(produced) < 10
+        assert pipeline.metrics()["1:<lambda>"]["max_queue_depth"] <= 2
+        items.close()
+
+    def test_errors_stop_or_skip(self):
+        """Test that a failing item stops the pipeline, or is dropped with on_error='skip'."""
+        def check(x):
+            if x == 3:
+                raise ValueError("bad item")
+            return x
+
+        with pytest.raises(ValueError):
+            Pipeline(range(10)).map(check, workers=2).collect()
+
+        pipeline = Pipeline(range(10)).map(check, workers=2, on_error="skip")
+        assert sorted(pipeline.collect()) == [0, 1, 2, 4, 5, 6, 7, 8, 9]
+        assert pipeline.metrics()["1:check"]["errors"] == 1
+
+    def test_pipeline_runs_once(self):
+        """Test that a pipeline cannot be run or extended after starting."""
+        pipeline = Pipeline([1]).map(lambda x: x)
+        assert pipeline.collect() == [1]
+        with pytest.raises(RuntimeError):
+            pipeline.collect()
+        with pytest.raises(RuntimeError):
+            pipeline.map(lambda x: x)
@@ -0,0 +1,139 @@
+"""
+Tests for request lifecycle hooks and RequestProfiler.
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import Mock, patch
+
+import pytest
+from requests.exceptions import HTTPError
+
+from stplpy.exceptions import ResourceNotFoundError
+from stplpy.profiling import RequestProfiler
+from stplpy.streaming import JSONArrayStream
+from stplpy.timeline import Timeline
+from stplpy.transport import Transport
+
+PAYLOAD = json.dumps({"feeds": list(range(1000))}).encode()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(PAYLOAD)))
+        self.end_headers()
+        self.wfile.write(PAYLOAD)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    """Serve PAYLOAD on a local port."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+class TestRequestProfiler:
+    """Tests for phase traces, breakdowns and Chrome trace export."""
+
+    def test_phases_are_traced(self, server):
+        """Test that a request records its lifecycle phases in order."""
+        profiler = RequestProfiler()
+        transport = Transport(hooks=[profiler])
+
+        transport.get(server + "/feed").json()
+        transport.get(server + "/feed")
+
+        first, second = profiler.traces()
+        names = [name for name, _, _ in first.phases]
+        assert names[:3] == ["breaker", "connect", "server"]
+        assert "decode" in names and "hooks" in names
+        assert "connect" not in [name for name, _, _ in second.phases]
+        assert first.status_code == 200
+        for _, start, end in first.phases:
+            assert first.start <= start <= end
+
+    def test_breakdown_per_endpoint(self, server):
+        """Test per-endpoint aggregation of phase durations."""
+        profiler = RequestProfiler()
+        transport = Transport()
+        transport.add_hook(profiler)
+
+        for _ in range(3):
+            transport.get(server + "/feed")
+        transport.remove_hook(profiler)
+        transport.get(server + "/feed")
+
+        endpoint = server.split("//")[1]
+        stats = profiler.breakdown()[endpoint]
+        assert stats["requests"] == 3
+        assert stats["phases"]["server"]["count"] == 3
+        assert list(stats["phases"])[0] == "breaker"
+        assert 0 <= stats["phases"]["server"]["share"] <= 1
+
+    def test_streamed_body_is_included(self, server):
+        """Test that hooks of a stream=True request wait until the body is read or closed."""
+        profiler = RequestProfiler()
+        transport = Transport(hooks=[profiler])
+
+        response = transport.get(server + "/feed", stream=True)
+        assert profiler.traces() == []
+        assert sum(len(chunk) for chunk in response.iter_content(256)) == len(PAYLOAD)
+        response = transport.get(server + "/feed", stream=True)
+        for _ in JSONArrayStream(response.iter_content(256), "feeds", response.close):
+            break
+
+        for trace in profiler.traces():
+            download_end = max(end for name, _, end in trace.phases if name == "download")
+            assert download_end <= trace.end
+        stats = profiler.breakdown()[server.split("//")[1]]
+        assert stats["requests"] == 2
+        assert stats["phases"]["download"]["count"] == 2
+        assert all(phase["share"] <= 1 for phase in stats["phases"].values())
+
+    def test_chrome_trace_export(self, server, tmp_path):
+        """Test that requests and phases become nested complete events."""
+        profiler = RequestProfiler()
+        Transport(hooks=[profiler]).get(server + "/feed")
+        path = tmp_path / "trace.json"
+
+        profiler.save_chrome_trace(str(path))
+
+        events = json.loads(path.read_text())["traceEvents"]
+        request = events[0]
+        assert request["ph"] == "X" and request["name"].startswith("GET ")
+        for event in events[1:]:
+            assert event["tid"] == request["tid"]
+            assert request["ts"] <= event["ts"]
+            assert event["ts"] + event["dur"] <= request["ts"] + request["dur"] + 1
+
+    @patch('stplpy.transport.requests.Session.get')
+    def test_error_mapping_is_traced(self, mock_get, mock_token):
+        """Test that mapping an error response is recorded on the request's trace."""
+        mock_response = Mock(status_code=404)
+        mock_response.raise_for_status.side_effect = HTTPError("404")
+        mock_get.return_value = mock_response
+        profiler = RequestProfiler()
+        timeline = Timeline(mock_token, transport=Transport(hooks=[profiler]))
+
+        with pytest.raises(ResourceNotFoundError):
+            timeline.get_post_detail("42")
+
+        (trace,) = profiler.traces()
+        assert trace.endpoint == "timeline_events/{id}"
+        assert "error_mapping" in trace.durations()
+        assert profiler.breakdown()["timeline_events/{id}"]["errors"] == 1
+
+    def test_failing_hook_does_not_break_requests(self, server):
+        """Test that a hook raising an exception is logged and ignored."""
+        transport = Transport(hooks=[Mock(side_effect=RuntimeError("hook failed"))])
+        assert transport.get(server + "/feed").status_code == 200
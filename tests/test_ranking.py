@@ -0,0 +1,74 @@
+"""
+Tests for top-K rankings.
+"""
+import random
+from unittest.mock import Mock
+
+from stplpy.ranking import TopK, top_followers
+
+
+def _user(user_id, seconds):
+    return {"user_id": user_id, "recent_record_seconds": seconds}
+
+
+class TestTopK:
+    """Tests for TopK class."""
+
+    def test_matches_full_sort(self):
+        """Test that the bounded heap returns the same top K as sorting everything."""
+        rng = random.Random(0)
+        users = [_user(str(i), rng.randint(0, 100000)) for i in range(5000)]
+
+        ranking = TopK(10).extend(users)
+
+        expected = sorted(users, key=lambda u: u["recent_record_seconds"], reverse=True)[:10]
+        assert [u["recent_record_seconds"] for u in ranking.items()] == [u["recent_record_seconds"] for u in expected]
+        assert len(ranking) == 10
+        assert ranking.seen == 5000
+
+    def test_refresh_updates_existing_entry(self):
+        """Test that re-pushing a ranked id replaces its value."""
+        ranking = TopK(2).extend([_user("a", 10), _user("b", 20), _user("c", 5)])
+        ranking.push(_user("a", 30))
+
+        assert [u["user_id"] for u in ranking.items()] == ["a", "b"]
+        assert ranking.threshold() == 20
+
+    def test_repeated_refreshes_match_full_sort(self):
+        """Test that many refreshes of ranked ids keep the ranking and its heap bounded."""
+        rng = random.Random(1)
+        latest = {}
+        ranking = TopK(5)
+        for _ in range(2000):
+            user = _user(str(rng.randint(0, 20)), rng.randint(0, 1000))
+            latest[user["user_id"]] = user["recent_record_seconds"]
+            ranking.push(user)
+
+        ranked = [(u["user_id"], u["recent_record_seconds"]) for u in ranking.items()]
+        assert len({user_id for user_id, _ in ranked}) == len(ranking) == 5
+        assert all(latest[user_id] == seconds for user_id, seconds in ranked)
+        assert len(ranking._heap) <= 2 * ranking.k
+
+    def test_items_without_id_are_distinct(self):
+        """Test that anonymous items do not overwrite each other."""
+        ranking = TopK(3).extend([{"recent_record_seconds": 1}, {"recent_record_seconds": 3}, _user("a", 2)])
+        assert [u["recent_record_seconds"] for u in ranking.items()] == [3, 2, 1]
+
+    def test_ignores_non_numeric_values(self):
+        """Test that items without a numeric field are skipped."""
+        ranking = TopK(3, key="recent_record_seconds").extend([{"user_id": "a"}, _user("b", None), _user("c", 1)])
+        assert [u["user_id"] for u in ranking.items()] == ["c"]
+
+
+class TestTopFollowers:
+    """Tests for top_followers function."""
+
+    def test_top_followers_streams_pages(self):
+        """Test ranking followers page by page."""
+        user = Mock()
+        user.iter_followers.return_value = iter([[_user("a", 1), _user("b", 9)], [_user("c", 5)]])
+
+        result = top_followers(user, "target", k=2)
+
+        assert [u["user_id"] for u in result] == ["b", "c"]
+        user.iter_followers.assert_called_once_with("target", None)
@@ -0,0 +1,118 @@
+"""
+Tests for UserResolver class.
+"""
+import asyncio
+import threading
+from unittest.mock import Mock
+
+import pytest
+
+from stplpy.cache import MemoryCache
+from stplpy.exceptions import APIError, ResourceNotFoundError
+from stplpy.resolver import UserResolver
+from stplpy.user import User
+from stplpy.utils import extract_usernames
+
+
+def _user(mock_token, cache=None, missing=()):
+    user = User(mock_token, cache=cache)
+    calls = []
+
+    def get_user(user_name):
+        calls.append(user_name)
+        if user_name in missing:
+            raise ResourceNotFoundError(f"User '{user_name}' not found")
+        profile = {"user_id": user_name}
+        if cache is not None:
+            cache.set(user._cache_key(user_name), profile)
+        return profile
+
+    user.get_user = Mock(side_effect=get_user)
+    return user, calls
+
+
+class TestUserResolver:
+    """Tests for batching, deduplication and caching."""
+
+    def test_concurrent_callers_share_fetches(self, mock_token):
+        """Test that ids requested by many threads are fetched once each, in few batches."""
+        user, calls = _user(mock_token)
+        results = {}
+
+        with UserResolver(user, window=0.05) as resolver:
+            def caller(index):
+                results[index] = resolver.resolve(str(index % 5)).result()
+            threads = [threading.Thread(target=caller, args=(i,)) for i in range(50)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            stats = resolver.stats()
+
+        assert sorted(calls) == ["0", "1", "2", "3", "4"]
+        assert results[7] == {"user_id": "2"}
+        assert stats["requested"] == 50
+        assert stats["batches"] <= 2
+
+    def test_callers_get_separate_profiles(self, mock_token):
+        """Test that two callers of one id do not share a mutable profile."""
+        user, _ = _user(mock_token)
+        with UserResolver(user, window=0.05) as resolver:
+            first, second = resolver.resolve("1"), resolver.resolve("1")
+            first.result()["user_id"] = "changed"
+            assert second.result() == {"user_id": "1"}
+
+    def test_resolves_usernames_from_feeds(self, mock_token):
+        """Test that usernames extracted from feeds are looked up by name."""
+        user, calls = _user(mock_token)
+        feeds = [
+            {"user_id": "1", "username": "alice"},
+            {"user_id": "2", "username": "bob"},
+            {"user_id": "1", "username": "alice"},
+        ]
+
+        with UserResolver(user) as resolver:
+            profiles = resolver.resolve_all(extract_usernames(feeds))
+
+        assert list(profiles) == ["alice", "bob"]
+        assert sorted(calls) == ["alice", "bob"]
+
+    def test_cache_hits_skip_requests(self, mock_token):
+        """Test that cached profiles are answered without calling get_user."""
+        user, calls = _user(mock_token, cache=MemoryCache())
+        with UserResolver(user) as resolver:
+            resolver.resolve_all(["1", "2"])
+            assert resolver.resolve_all(["1", "2", "3"]) == {str(i): {"user_id": str(i)} for i in (1, 2, 3)}
+            assert resolver.stats()["cache_hits"] == 2
+
+        assert sorted(calls) == ["1", "2", "3"]
+
+    def test_errors_reach_callers(self, mock_token):
+        """Test that missing users are skipped or raised and other errors propagate."""
+        user, _ = _user(mock_token, missing={"gone"})
+        with UserResolver(user) as resolver:
+            assert resolver.resolve_all(["1", "gone"]) == {"1": {"user_id": "1"}}
+            with pytest.raises(ResourceNotFoundError):
+                resolver.resolve_all(["gone"], skip_missing=False)
+            user.get_user.side_effect = APIError("boom", 500)
+            with pytest.raises(APIError):
+                resolver.resolve("2").result()
+
+    def test_resolve_async(self, mock_token):
+        """Test resolving from an event loop."""
+        user, calls = _user(mock_token)
+
+        async def main(resolver):
+            return await resolver.resolve_all_async(["1", "2", "1"])
+
+        with UserResolver(user) as resolver:
+            assert asyncio.run(main(resolver)) == {"1": {"user_id": "1"}, "2": {"user_id": "2"}}
+        assert sorted(calls) == ["1", "2"]
+
+    def test_closed_resolver_rejects_requests(self, mock_token):
+        """Test that resolve fails after close."""
+        user, _ = _user(mock_token)
+        resolver = UserResolver(user)
+        resolver.close()
+        with pytest.raises(RuntimeError):
+            resolver.resolve("1")
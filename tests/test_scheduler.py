@@ -0,0 +1,119 @@
+"""
+Tests for RequestScheduler class.
+"""
+import threading
+import time
+from unittest.mock import Mock, patch
+
+from stplpy.ratelimit import RateLimiter
+from stplpy.scheduler import BULK, INTERACTIVE, RequestScheduler
+from stplpy.transport import Transport
+
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.001)
+    assert condition()
+
+
+class TestRequestScheduler:
+    """Tests for weighted fair queuing across priority classes."""
+
+    def test_interactive_overtakes_bulk_backlog(self):
+        """Test that a write queued behind a crawl gets the next free slot."""
+        scheduler = RequestScheduler(slots=1)
+        order = []
+
+        def worker(priority, name):
+            with scheduler.slot(priority):
+                order.append(name)
+
+        scheduler.acquire(BULK)
+        threads = [threading.Thread(target=worker, args=(BULK, f"bulk{i}")) for i in range(20)]
+        for thread in threads:
+            thread.start()
+        _wait_for(lambda: scheduler.metrics()[BULK]["queue_depth"] == 20)
+        interactive = threading.Thread(target=worker, args=(INTERACTIVE, "write"))
+        interactive.start()
+        _wait_for(lambda: scheduler.metrics().get(INTERACTIVE, {}).get("queue_depth") == 1)
+
+        scheduler.release(BULK)
+        for thread in threads + [interactive]:
+            thread.join(5)
+
+        assert order[0] == "write"
+        metrics = scheduler.metrics()
+        assert metrics[BULK]["granted"] == 21
+        assert metrics[INTERACTIVE]["granted"] == 1
+        assert metrics[BULK]["queue_depth"] == 0
+        assert metrics[BULK]["max_wait"] >= metrics[INTERACTIVE]["max_wait"]
+
+    def test_weights_share_slots_while_backlogged(self):
+        """Test that backlogged classes are served in proportion to their weights."""
+        scheduler = RequestScheduler(slots=1, weights={"a": 3.0, "b": 1.0})
+        order = []
+
+        def worker(priority):
+            with scheduler.slot(priority):
+                order.append(priority)
+
+        scheduler.acquire("a")
+        threads = []
+        for priority in ["b"] * 4 + ["a"] * 12:
+            threads.append(threading.Thread(target=worker, args=(priority,)))
+            threads[-1].start()
+        _wait_for(lambda: sum(m["queue_depth"] for m in scheduler.metrics().values()) == 16)
+        scheduler.release("a")
+        for thread in threads:
+            thread.join(5)
+
+        assert order[:8].count("a") == 6
+
+
+class TestTransportScheduler:
+    """Tests for scheduler integration in Transport."""
+
+    @patch('stplpy.transport.requests.Session.post')
+    @patch('stplpy.transport.requests.Session.get')
+    def test_default_priorities(self, mock_get, mock_post):
+        """Test that reads are scheduled as bulk and writes as interactive."""
+        mock_get.return_value = Mock(status_code=200)
+        mock_post.return_value = Mock(status_code=200)
+        scheduler = RequestScheduler(slots=2)
+        transport = Transport(scheduler=scheduler)
+
+        transport.get("https://api.studyplus.jp/2/timeline_feeds/followee")
+        transport.post("https://api.studyplus.jp/2/study_records")
+
+        metrics = scheduler.metrics()
+        assert metrics[BULK]["granted"] == 1
+        assert metrics[INTERACTIVE]["granted"] == 1
+        assert metrics[BULK]["in_flight"] == 0
+
+    def test_rate_tokens_follow_priority(self):
+        """Test that a write arriving while the rate budget is exhausted gets the next token."""
+        limiter = RateLimiter(rate=20, burst=1)
+        scheduler = RequestScheduler(slots=8, rate_limiter=limiter)
+        order = []
+        lock = threading.Lock()
+
+        def worker(priority, name):
+            scheduler.acquire(priority)
+            with lock:
+                order.append(name)
+            scheduler.release(priority)
+
+        scheduler.acquire(BULK)
+        scheduler.release(BULK)
+        threads = [threading.Thread(target=worker, args=(BULK, f"bulk{i}")) for i in range(6)]
+        for thread in threads:
+            thread.start()
+        _wait_for(lambda: scheduler.metrics()[BULK]["queue_depth"] == 6)
+        interactive = threading.Thread(target=worker, args=(INTERACTIVE, "write"))
+        interactive.start()
+        for thread in threads + [interactive]:
+            thread.join(5)
+
+        assert order.index("write") <= 1
+        assert len(order) == 7
@@ -0,0 +1,114 @@
+"""
+Tests for incremental JSON array parsing.
+"""
+import json
+from unittest.mock import Mock, patch
+
+import pytest
+
+from stplpy.streaming import JSONArrayStream, iter_json_array
+from stplpy.timeline import Timeline
+from stplpy.user import User
+
+
+def _chunks(text, size):
+    """Split UTF-8 encoded text into fixed-size byte chunks."""
+    data = text.encode("utf-8")
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def _stream_response(payload, size=7):
+    """Build a mocked streamed response."""
+    response = Mock(status_code=200, raise_for_status=Mock())
+    response.iter_content.return_value = _chunks(json.dumps(payload, ensure_ascii=False), size)
+    return response
+
+
+class TestJSONArrayStream:
+    """Tests for JSONArrayStream class."""
+
+    @pytest.mark.parametrize("size", [1, 3, 64, 100000])
+    def test_items_and_fields_across_chunk_boundaries(self, size):
+        """Test that items, numbers and multi-byte text split across chunks parse correctly."""
+        payload = {
+            "next": "cursor",
+            "feeds": [{"id": 12345, "comment": "勉強しました"}, {"id": 6.5e3, "nested": [1, {"a": None}]}, 7],
+            "total": 1000,
+        }
+        stream = JSONArrayStream(_chunks(json.dumps(payload, ensure_ascii=False, indent=1), size), "feeds")
+
+        assert list(stream) == payload["feeds"]
+        assert stream.fields == {"next": "cursor", "total": 1000}
+
+    def test_empty_and_missing_arrays(self):
+        """Test objects with an empty array, no array or no fields at all."""
+        assert list(iter_json_array([b'{"feeds": []}'], "feeds")) == []
+        stream = JSONArrayStream([b'{"next": null}'], "feeds")
+        assert list(stream) == []
+        assert stream.fields == {"next": None}
+        assert list(iter_json_array([b"{}"], "feeds")) == []
+
+    def test_items_arrive_before_body_ends(self):
+        """Test that the first item is yielded before later chunks are read."""
+        read = []
+
+        def chunks():
+            for chunk in [b'{"users": [{"id": 1}', b', {"id": 2}', b"]}"]:
+                read.append(chunk)
+                yield chunk
+
+        items = iter(JSONArrayStream(chunks(), "users"))
+        assert next(items) == {"id": 1}
+        assert len(read) == 2
+
+    def test_malformed_body_raises(self):
+        """Test that a truncated or malformed body raises a JSONDecodeError."""
+        with pytest.raises(json.JSONDecodeError):
+            list(iter_json_array([b'{"feeds": [{"id": 1}, '], "feeds"))
+        with pytest.raises(json.JSONDecodeError):
+            list(iter_json_array([b'[1, 2]'], "feeds"))
+
+    def test_close_called_when_abandoned(self):
+        """Test that the close callback runs when iteration stops early."""
+        close = Mock()
+        items = iter(JSONArrayStream([b'{"feeds": [1, 2, 3]}'], "feeds", close))
+        next(items)
+        items.close()
+        close.assert_called_once()
+
+
+class TestStreamingClients:
+    """Tests for streaming modes of the API clients."""
+
+    @patch('stplpy.transport.requests.Session.get')
+    def test_timeline_stream_follows_cursors(self, mock_get, mock_token):
+        """Test that streamed timelines follow the next cursor parsed from the body."""
+        mock_get.side_effect = [
+            _stream_response({"feeds": [{"id": 1}, {"id": 2}], "next": "c1"}),
+            _stream_response({"feeds": [{"id": 3}], "next": None}),
+        ]
+
+        timeline = Timeline(mock_token)
+        events = list(timeline.iter_goal_timelines("college-180", stream=True))
+
+        assert events == [{"id": 1}, {"id": 2}, {"id": 3}]
+        assert mock_get.call_args_list[0][1]["stream"] is True
+        assert mock_get.call_args[0][0].endswith("study_goal/college-180?until=c1")
+
+    def test_timeline_stream_rejects_prefetch(self, mock_token):
+        """Test that streaming and prefetching cannot be combined."""
+        with pytest.raises(ValueError):
+            Timeline(mock_token).iter_followee_timelines(prefetch=1, stream=True)
+
+    @patch('stplpy.transport.requests.Session.get')
+    def test_stream_followers_stops_at_empty_page(self, mock_get, mock_token):
+        """Test that streamed follower listings yield users and stop at an empty page."""
+        mock_get.side_effect = [
+            _stream_response({"users": [{"user_id": "a"}, {"user_id": "b"}]}),
+            _stream_response({"users": []}),
+        ]
+
+        user = User(mock_token)
+
+        assert [u["user_id"] for u in user.stream_followers("target")] == ["a", "b"]
+        assert mock_get.call_count == 2
@@ -1,6 +1,8 @@
 """
 Tests for Timeline class.
 """
+import time
+
 import pytest
 from unittest.mock import Mock, patch
 from stplpy.timeline import Timeline
@@ -45,7 +47,7 @@ class TestCreateToken:
 class TestLikePost:
     """Tests for like_post method."""
 
-    @patch('stplpy.timeline.requests.post')
+    @patch('stplpy.transport.requests.Session.post')
     def test_like_post_success(self, mock_post, mock_token):
         """Test successful like_post call."""
         mock_response = Mock()
@@ -59,7 +61,7 @@ class TestLikePost:
         assert result is True
         mock_post.assert_called_once()
 
-    @patch('stplpy.timeline.requests.post')
+    @patch('stplpy.transport.requests.Session.post')
     def test_like_post_not_found(self, mock_post, mock_token):
         """Test like_post with post not found."""
         mock_response = Mock()
@@ -71,7 +73,7 @@ class TestLikePost:
         with pytest.raises(ResourceNotFoundError):
             timeline.like_post("nonexistent_post")
 
-    @patch('stplpy.timeline.requests.post')
+    @patch('stplpy.transport.requests.Session.post')
     def test_like_post_rate_limit(self, mock_post, mock_token):
         """Test like_post with rate limit error."""
         mock_response = Mock()
@@ -87,7 +89,7 @@ class TestLikePost:
 class TestSendComment:
     """Tests for send_comment method."""
 
-    @patch('stplpy.timeline.requests.post')
+    @patch('stplpy.transport.requests.Session.post')
     def test_send_comment_success(self, mock_post, mock_token):
         """Test successful send_comment call."""
         mock_response = Mock()
@@ -106,7 +108,7 @@ class TestSendComment:
 class TestPostStudyRecord:
     """Tests for post_study_record method."""
 
-    @patch('stplpy.timeline.requests.post')
+    @patch('stplpy.transport.requests.Session.post')
     def test_post_study_record_success(self, mock_post, mock_token):
         """Test successful post_study_record call."""
         mock_response = Mock()
@@ -125,11 +127,25 @@ class TestPostStudyRecord:
         assert result == {"record_id": "record_123"}
         mock_post.assert_called_once()
 
+    @patch('stplpy.transport.requests.Session.post')
+    def test_idempotent_post_reuses_token(self, mock_post, mock_token):
+        """Test that retrying an idempotent post sends the same post_token."""
+        mock_post.return_value = Mock(status_code=200, raise_for_status=Mock(), json=Mock(return_value={}))
+        timeline = Timeline(mock_token)
+        record = {"duration": 60, "record_datetime": "2024-01-01T10:00:00Z", "idempotent": True}
+
+        timeline.post_study_record(**record)
+        timeline.post_study_record(**record)
+        timeline.post_study_record(duration=60, record_datetime="2024-01-01T10:00:00Z")
+
+        tokens = [call[1]["json"]["post_token"] for call in mock_post.call_args_list]
+        assert tokens[0] == tokens[1] != tokens[2]
+
 
 class TestGetFolloweeTimeline:
     """Tests for get_followee_timeline method."""
 
-    @patch('stplpy.timeline.requests.get')
+    @patch('stplpy.transport.requests.Session.get')
     def test_get_followee_timeline_success(self, mock_get, mock_token, mock_timeline_data):
         """Test successful get_followee_timeline call."""
         mock_response = Mock()
@@ -144,7 +160,7 @@ class TestGetFolloweeTimeline:
         assert result == mock_timeline_data
         mock_get.assert_called_once()
 
-    @patch('stplpy.timeline.requests.get')
+    @patch('stplpy.transport.requests.Session.get')
     def test_get_followee_timeline_with_until(self, mock_get, mock_token, mock_timeline_data):
         """Test get_followee_timeline with until parameter."""
         mock_response = Mock()
@@ -203,3 +219,133 @@ class TestHandleHttpError:
         with pytest.raises(APIError) as exc_info:
             timeline._handle_http_error(mock_response, "Test message", http_err)
         assert exc_info.value.status_code == 500
+
+
+class TestPostCommentsAndLikeUsers:
+    """Tests for paged comment and like-user iteration."""
+
+    @patch('stplpy.transport.requests.Session.get')
+    def test_iter_post_comments_is_lazy(self, mock_get, mock_token):
+        """Test that pages are only fetched as the iterator is consumed."""
+        first_page = Mock(status_code=200, raise_for_status=Mock())
+        first_page.json.return_value = {"comments": [{"id": 1}, {"id": 2}], "next": "cursor_2"}
+        second_page = Mock(status_code=200, raise_for_status=Mock())
+        second_page.json.return_value = {"comments": [{"id": 3}]}
+        mock_get.side_effect = [first_page, second_page]
+
+        timeline = Timeline(mock_token)
+        comments = timeline.iter_post_comments("post_123", per_page=2)
+
+        assert mock_get.call_count == 0
+        assert next(comments) == {"id": 1}
+        assert mock_get.call_count == 1
+        assert [c["id"] for c in comments] == [2, 3]
+        assert "until=cursor_2" in mock_get.call_args[0][0]
+
+    @patch('stplpy.transport.requests.Session.get')
+    def test_iter_post_like_users(self, mock_get, mock_token):
+        """Test iterating over the users who liked a post."""
+        page = Mock(status_code=200, raise_for_status=Mock())
+        page.json.return_value = {"users": [{"username": "a"}, {"username": "b"}]}
+        mock_get.return_value = page
+
+        timeline = Timeline(mock_token)
+        users = list(timeline.iter_post_like_users("post_123"))
+
+        assert users == [{"username": "a"}, {"username": "b"}]
+        assert "/timeline_events/post_123/likes" in mock_get.call_args[0][0]
+
+
+class TestGetPostDetails:
+    """Tests for get_post_details method."""
+
+    @patch('stplpy.transport.requests.Session.get')
+    def test_get_post_details_projects_fields(self, mock_get, mock_token):
+        """Test batched details with field projection and missing posts skipped."""
+        def respond(url, **kwargs):
+            response = Mock()
+            if url.endswith("/missing"):
+                response.status_code = 404
+                response.raise_for_status = Mock(side_effect=HTTPError())
+            else:
+                response.status_code = 200
+                response.raise_for_status = Mock()
+                response.json.return_value = {"comment_count": 3, "like_count": 5, "body": "x"}
+            return response
+        mock_get.side_effect = respond
+
+        timeline = Timeline(mock_token)
+        result = timeline.get_post_details(["p1", "p2", "p1", "missing"], fields=["comment_count"])
+
+        assert result == {"p1": {"comment_count": 3}, "p2": {"comment_count": 3}}
+        assert mock_get.call_count == 3
+        assert all("include_like_users" not in c[0][0] for c in mock_get.call_args_list)
+
+
+class TestTimelineIterators:
+    """Tests for cursor-following timeline iterators."""
+
+    @patch('stplpy.transport.requests.Session.get')
+    def test_iter_goal_timelines_follows_cursors(self, mock_get, mock_token):
+        """Test that iteration follows next cursors and stops on the last page."""
+        first = Mock(status_code=200, raise_for_status=Mock())
+        first.json.return_value = {"feeds": [{"id": 1}], "next": "c1"}
+        last = Mock(status_code=200, raise_for_status=Mock())
+        last.json.return_value = {"feeds": [{"id": 2}]}
+        mock_get.side_effect = [first, last]
+
+        timeline = Timeline(mock_token)
+        events = timeline.get_goal_timelines("college-180", limit=5)
+
+        assert events == [{"id": 1}, {"id": 2}]
+        assert mock_get.call_count == 2
+        assert "until=c1" in mock_get.call_args[0][0]
+
+    @patch('stplpy.transport.requests.Session.get')
+    def test_iter_user_timelines_prefetch(self, mock_get, mock_token):
+        """Test that prefetching yields the same events in order."""
+        pages = []
+        for i in range(4):
+            page = Mock(status_code=200, raise_for_status=Mock())
+            page.json.return_value = {"feeds": [{"id": i}], "next": f"c{i}" if i < 3 else None}
+            pages.append(page)
+        mock_get.side_effect = pages
+
+        timeline = Timeline(mock_token)
+        events = list(timeline.iter_user_timelines("user", prefetch=2))
+
+        assert events == [{"id": 0}, {"id": 1}, {"id": 2}, {"id": 3}]
+        assert mock_get.call_count == 4
+
+    @patch('stplpy.transport.requests.Session.get')
+    def test_prefetch_is_bounded(self, mock_get, mock_token):
+        """Test that at most `prefetch` pages are fetched ahead of the consumer."""
+        def respond(url, **kwargs):
+            page = Mock(status_code=200, raise_for_status=Mock())
+            page.json.return_value = {"feeds": [{"id": mock_get.call_count}], "next": "more"}
+            return page
+        mock_get.side_effect = respond
+
+        timeline = Timeline(mock_token)
+        events = timeline.iter_followee_timelines(prefetch=2)
+        next(events)
+        time.sleep(0.2)
+
+        assert mock_get.call_count == 3
+        events.close()
+
+    @patch('stplpy.transport.requests.Session.get')
+    def test_prefetch_propagates_errors(self, mock_get, mock_token):
+        """Test that an error in the prefetch thread is raised to the consumer."""
+        first = Mock(status_code=200, raise_for_status=Mock())
+        first.json.return_value = {"feeds": [{"id": 1}], "next": "c1"}
+        failed = Mock(status_code=404)
+        failed.raise_for_status.side_effect = HTTPError()
+        mock_get.side_effect = [first, failed]
+
+        timeline = Timeline(mock_token)
+        events = timeline.iter_goal_timelines("college-180", prefetch=1)
+
+        assert next(events) == {"id": 1}
+        with pytest.raises(ResourceNotFoundError):
+            next(events)
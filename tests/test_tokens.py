@@ -0,0 +1,67 @@
+"""
+Tests for post_token generation.
+"""
+from collections import Counter
+from unittest.mock import Mock, patch
+
+from stplpy import StudyPlus
+from stplpy.tokens import TOKEN_ALPHABET, derive_token, generate_token
+
+
+class TestGenerateToken:
+    """Tests for generate_token function."""
+
+    def test_length_and_alphabet(self):
+        """Test that tokens have the requested length and only alphanumeric characters."""
+        for n in (0, 1, 10, 36, 500):
+            token = generate_token(n)
+            assert len(token) == n
+            assert set(token) <= set(TOKEN_ALPHABET)
+
+    def test_characters_are_uniform(self):
+        """Test that rejection sampling leaves no character noticeably favored."""
+        counts = Counter(generate_token(124000))
+        assert set(counts) == set(TOKEN_ALPHABET)
+        # Expected 2000 per character; modulo bias without rejection would give ~2064 vs ~1548.
+        assert max(counts.values()) < 2250
+        assert min(counts.values()) > 1750
+
+    def test_tokens_do_not_repeat(self):
+        """Test that many tokens are distinct."""
+        tokens = [generate_token() for _ in range(20000)]
+        assert len(set(tokens)) == len(tokens)
+
+
+class TestDeriveToken:
+    """Tests for derive_token function."""
+
+    def test_stable_for_equal_payloads(self):
+        """Test that key order does not matter and different payloads differ."""
+        assert derive_token({"a": 1, "b": 2}) == derive_token({"b": 2, "a": 1})
+        assert derive_token({"a": 1}) != derive_token({"a": 2})
+
+    def test_long_tokens_extend_short_ones(self):
+        """Test tokens longer than one digest and their prefix property."""
+        token = derive_token({"a": 1}, 100)
+        assert len(token) == 100
+        assert set(token) <= set(TOKEN_ALPHABET)
+        assert token.startswith(derive_token({"a": 1}, 10))
+
+
+class TestIdempotentClient:
+    """Tests for idempotent writes through the StudyPlus client."""
+
+    @patch('stplpy.transport.requests.Session.post')
+    def test_client_passes_idempotent(self, mock_post, mock_token):
+        """Test that retried client writes reuse their derived post_token."""
+        mock_post.return_value = Mock(status_code=200, raise_for_status=Mock(), json=Mock(return_value={}))
+        client = StudyPlus(mock_token)
+
+        for _ in range(2):
+            client.post_study_record(duration=60, record_datetime="2024-01-01T10:00:00Z", idempotent=True)
+            client.send_comment("post_1", "Nice!", idempotent=True)
+        client.send_comment("post_1", "Nice!")
+
+        tokens = [call[1]["json"]["post_token"] for call in mock_post.call_args_list]
+        assert tokens[0] == tokens[2] and tokens[1] == tokens[3]
+        assert tokens[4] not in tokens[:4]
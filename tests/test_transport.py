@@ -0,0 +1,86 @@
+"""
+Tests for Transport compression negotiation and transfer accounting.
+"""
+import gzip
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from stplpy.transport import ACCEPT_ENCODING, Transport, endpoint_name
+
+PAYLOAD = json.dumps({"feeds": [{"id": i, "comment": "study " * 20} for i in range(200)]}).encode()
+
+
+class _GzipHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        accepts_gzip = "gzip" in self.headers.get("Accept-Encoding", "")
+        body = gzip.compress(PAYLOAD) if accepts_gzip else PAYLOAD
+        self.send_response(200)
+        if accepts_gzip:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def gzip_server():
+    """Serve PAYLOAD gzip-compressed on a local port."""
+    server = HTTPServer(("127.0.0.1", 0), _GzipHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+class TestEndpointName:
+    """Tests for endpoint_name function."""
+
+    @pytest.mark.parametrize("url,name", [
+        ("https://api.studyplus.jp/2/timeline_feeds/followee?until=c1", "timeline_feeds/followee"),
+        ("https://api.studyplus.jp/2/timeline_feeds/user/abc123", "timeline_feeds/user/{id}"),
+        ("https://api.studyplus.jp/2/users/test_user", "users/{id}"),
+        ("https://api.studyplus.jp/2/users?follower=abc&page=2&per_page=50", "users?follower"),
+        ("https://api.studyplus.jp/2/timeline_events/42/comments?per_page=50", "timeline_events/{id}/comments"),
+        ("https://example.com/image.jpg", "example.com"),
+    ])
+    def test_endpoint_name(self, url, name):
+        """Test that ids are masked and listings keep their relation."""
+        assert endpoint_name(url) == name
+
+
+class TestCompression:
+    """Tests for compressed transfers."""
+
+    def test_gzip_negotiated_and_counted(self, gzip_server):
+        """Test that gzip is requested, decoded and both byte counts are recorded."""
+        transport = Transport()
+
+        response = transport.get(gzip_server + "/feed")
+
+        assert "gzip" in ACCEPT_ENCODING
+        assert response.json()["feeds"][0]["id"] == 0
+        stats = transport.transfers.snapshot()["127.0.0.1:" + gzip_server.rsplit(":", 1)[1]]
+        assert stats["uncompressed_bytes"] == len(PAYLOAD)
+        assert stats["compressed_bytes"] == len(gzip.compress(PAYLOAD))
+        assert stats["encodings"] == {"gzip": 1}
+        assert stats["ratio"] > 5
+
+    def test_streamed_body_counted_when_consumed(self, gzip_server):
+        """Test that streamed responses are decoded incrementally and counted once read."""
+        transport = Transport()
+
+        with transport.get(gzip_server + "/feed", stream=True) as response:
+            assert transport.transfers.snapshot() == {}
+            body = b"".join(response.iter_content(1024))
+
+        assert body == PAYLOAD
+        (stats,) = transport.transfers.snapshot().values()
+        assert stats["uncompressed_bytes"] == len(PAYLOAD)
+        assert stats["compressed_bytes"] < len(PAYLOAD)
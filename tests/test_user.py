@@ -8,6 +8,7 @@ from stplpy.exceptions import (
     AuthenticationError,
     ResourceNotFoundError,
     ValidationError,
+    RateLimitError,
     APIError
 )
 
@@ -27,7 +28,7 @@ class TestUserInit:
 class TestGetMyself:
     """Tests for get_myself method."""
 
-    @patch('stplpy.user.requests.get')
+    @patch('stplpy.transport.requests.Session.get')
     def test_get_myself_success(self, mock_get, mock_token, mock_user_data):
         """Test successful get_myself call."""
         mock_response = Mock()
@@ -41,7 +42,7 @@ class TestGetMyself:
         assert result == mock_user_data
         mock_get.assert_called_once()
 
-    @patch('stplpy.user.requests.get')
+    @patch('stplpy.transport.requests.Session.get')
     def test_get_myself_authentication_error(self, mock_get, mock_token):
         """Test get_myself with authentication error."""
         mock_response = Mock()
@@ -52,7 +53,7 @@ class TestGetMyself:
         with pytest.raises(AuthenticationError):
             user.get_myself()
 
-    @patch('stplpy.user.requests.get')
+    @patch('stplpy.transport.requests.Session.get')
     def test_get_myself_api_error(self, mock_get, mock_token):
         """Test get_myself with API error."""
         mock_response = Mock()
@@ -68,7 +69,7 @@ class TestGetMyself:
 class TestGetUser:
     """Tests for get_user method."""
 
-    @patch('stplpy.user.requests.get')
+    @patch('stplpy.transport.requests.Session.get')
     def test_get_user_success(self, mock_get, mock_token, mock_user_data):
         """Test successful get_user call."""
         mock_response = Mock()
@@ -82,7 +83,7 @@ class TestGetUser:
         assert result == mock_user_data
         assert "test_user" in mock_get.call_args[0][0]
 
-    @patch('stplpy.user.requests.get')
+    @patch('stplpy.transport.requests.Session.get')
     def test_get_user_not_found(self, mock_get, mock_token):
         """Test get_user with user not found."""
         mock_response = Mock()
@@ -97,7 +98,7 @@ class TestGetUser:
 class TestFollowUser:
     """Tests for follow_user method."""
 
-    @patch('stplpy.user.requests.post')
+    @patch('stplpy.transport.requests.Session.post')
     def test_follow_user_success(self, mock_post, mock_token):
         """Test successful follow_user call."""
         mock_response = Mock()
@@ -110,7 +111,7 @@ class TestFollowUser:
         assert result is True
         mock_post.assert_called_once()
 
-    @patch('stplpy.user.requests.post')
+    @patch('stplpy.transport.requests.Session.post')
     def test_follow_user_not_found(self, mock_post, mock_token):
         """Test follow_user with user not found."""
         mock_response = Mock()
@@ -125,7 +126,7 @@ class TestFollowUser:
 class TestUpdateProfilePicture:
     """Tests for update_profile_picture method."""
 
-    @patch('stplpy.user.requests.post')
+    @patch('stplpy.transport.requests.Session.post')
     @patch('builtins.open', new_callable=mock_open, read_data=b'image_data')
     def test_update_profile_picture_success(self, mock_file, mock_post, mock_token):
         """Test successful profile picture update."""
@@ -144,3 +145,120 @@ class TestUpdateProfilePicture:
         user = User(mock_token)
         with pytest.raises(ValidationError):
             user.update_profile_picture("/nonexistent/file.jpg")
+
+
+def _image_response(status_code=200, chunks=(b'image', b'_data'), etag=None):
+    mock_response = Mock()
+    mock_response.status_code = status_code
+    mock_response.headers = {"ETag": etag} if etag else {}
+    mock_response.iter_content.return_value = list(chunks)
+    mock_response.raise_for_status = Mock()
+    mock_response.__enter__ = Mock(return_value=mock_response)
+    mock_response.__exit__ = Mock(return_value=False)
+    return mock_response
+
+
+class TestDownloadProfilePicture:
+    """Tests for download_profile_picture and download_profile_pictures methods."""
+
+    def test_download_profile_picture_streams_to_file(self, mock_token, tmp_path):
+        """Test that the image is streamed to disk without an API lookup."""
+        user = User(mock_token)
+        user.transport.session.get = Mock(return_value=_image_response(etag='"v1"'))
+        output = tmp_path / "avatar.jpg"
+
+        result = user.download_profile_picture(image_url="https://example.com/a.jpg", output_file_name=str(output))
+
+        assert result is True
+        assert output.read_bytes() == b'image_data'
+        assert (tmp_path / "avatar.jpg.etag").read_text() == '"v1"'
+        assert user.transport.session.get.call_args[1]["stream"] is True
+        assert list(tmp_path.glob("*.part")) == []
+
+    def test_download_profile_picture_sends_etag(self, mock_token, tmp_path):
+        """Test that a stored ETag is revalidated and a 304 leaves the file untouched."""
+        output = tmp_path / "avatar.jpg"
+        output.write_bytes(b'old')
+        (tmp_path / "avatar.jpg.etag").write_text('"v1"')
+        user = User(mock_token)
+        user.transport.session.get = Mock(return_value=_image_response(status_code=304))
+
+        assert user.download_profile_picture(image_url="https://example.com/a.jpg", output_file_name=str(output))
+        assert user.transport.session.get.call_args[1]["headers"] == {"If-None-Match": '"v1"'}
+        assert output.read_bytes() == b'old'
+
+    def test_download_profile_picture_drops_stale_etag(self, mock_token, tmp_path):
+        """Test that a response without an ETag removes the stored one."""
+        output = tmp_path / "avatar.jpg"
+        output.write_bytes(b'old')
+        (tmp_path / "avatar.jpg.etag").write_text('"v1"')
+        user = User(mock_token)
+        user.transport.session.get = Mock(return_value=_image_response())
+
+        assert user.download_profile_picture(image_url="https://example.com/a.jpg", output_file_name=str(output))
+        assert output.read_bytes() == b'image_data'
+        assert not (tmp_path / "avatar.jpg.etag").exists()
+        assert list(tmp_path.glob("*.part")) == []
+
+    @patch('stplpy.transport.requests.Session.get')
+    def test_download_profile_pictures_batch(self, mock_get, mock_token, tmp_path):
+        """Test batch download reports downloaded, unchanged and failed users."""
+        (tmp_path / "same.jpg").write_bytes(b'image_data')
+        mock_get.side_effect = lambda url, **kwargs: _image_response()
+        user = User(mock_token)
+        user.get_user = Mock(side_effect=ResourceNotFoundError("missing"))
+        users = [
+            {"username": "new", "user_image_url": "https://example.com/new.jpg"},
+            {"username": "same", "user_image_url": "https://example.com/same.jpg"},
+            {"username": "broken"},
+        ]
+
+        result = user.download_profile_pictures(users, str(tmp_path), max_workers=2)
+
+        assert result == {"new": "downloaded", "same": "unchanged", "broken": "failed"}
+        assert (tmp_path / "new.jpg").read_bytes() == b'image_data'
+
+
+class TestIterFollowers:
+    """Tests for paged follower iteration."""
+
+    @patch('stplpy.transport.requests.Session.get')
+    def test_iter_followers_stops_at_empty_page(self, mock_get, mock_token):
+        """Test that unbounded iteration stops at the first empty page."""
+        pages = [[{"user_id": "1"}], [{"user_id": "2"}], []]
+        mock_get.side_effect = [Mock(status_code=200, json=Mock(return_value={"users": p})) for p in pages]
+
+        user = User(mock_token)
+        result = list(user.iter_followers("target"))
+
+        assert result == [[{"user_id": "1"}], [{"user_id": "2"}]]
+        assert "page=3" in mock_get.call_args[0][0]
+
+    @patch('stplpy.transport.requests.Session.get')
+    def test_unbounded_iteration_raises_on_failed_page(self, mock_get, mock_token):
+        """Test that an unbounded listing raises instead of ending early on an error page."""
+        mock_get.side_effect = [
+            Mock(status_code=200, json=Mock(return_value={"users": [{"user_id": "1"}]})),
+            Mock(status_code=429),
+        ]
+
+        user = User(mock_token)
+        pages = user.iter_followers("target")
+
+        assert next(pages) == [{"user_id": "1"}]
+        with pytest.raises(RateLimitError):
+            next(pages)
+
+    @patch('stplpy.transport.requests.Session.get')
+    def test_iter_followers_prefetch_from_start_page(self, mock_get, mock_token):
+        """Test that concurrent page fetches still yield pages in order from start_page."""
+        def respond(url, **kwargs):
+            page = int(url.split("page=")[1].split("&")[0])
+            users = [{"user_id": str(page)}] if page < 6 else []
+            return Mock(status_code=200, json=Mock(return_value={"users": users}))
+        mock_get.side_effect = respond
+
+        user = User(mock_token)
+        pages = list(user.iter_followers("target", start_page=2, prefetch=3))
+
+        assert pages == [[{"user_id": str(page)}] for page in range(2, 6)]
@@ -0,0 +1,99 @@
+"""
+Tests for TimelineWatcher class.
+"""
+import asyncio
+import time
+from unittest.mock import Mock
+
+from stplpy.watcher import TimelineWatcher
+from stplpy.ratelimit import RateLimiter
+
+
+def _page(*event_ids, next_cursor=None):
+    page = {"feeds": [{"feed_type": "study_record", "body_study_record": {"event_id": i}} for i in event_ids]}
+    if next_cursor:
+        page["next"] = next_cursor
+    return page
+
+
+class TestTimelineWatcher:
+    """Tests for polling, dispatch and interval adaptation."""
+
+    def test_poll_dispatches_only_new_events(self):
+        """Test that the first poll primes the feed and later polls emit new events oldest first."""
+        timeline = Mock()
+        timeline.get_followee_timeline.side_effect = [_page(2, 1), _page(4, 3, 2, 1)]
+        watcher = TimelineWatcher(timeline, rate_limiter=RateLimiter(100))
+        received = []
+        watcher.subscribe(lambda key, event: received.append((key, event["body_study_record"]["event_id"])))
+        key = watcher.watch_followee()
+
+        assert watcher.poll(key) == 0
+        assert watcher.poll(key) == 2
+        assert received == [("followee", 3), ("followee", 4)]
+
+    def test_poll_catches_up_when_page_is_all_new(self):
+        """Test that older pages are fetched when a whole page is unseen."""
+        timeline = Mock()
+        timeline.get_user_timeline.side_effect = [
+            _page(1),
+            _page(4, 3, next_cursor="c1"),
+            _page(2, 1),
+        ]
+        watcher = TimelineWatcher(timeline, rate_limiter=RateLimiter(100))
+        key = watcher.watch_user("u1")
+        watcher.poll(key)
+
+        assert watcher.poll(key) == 3
+        timeline.get_user_timeline.assert_called_with("u1", "c1")
+
+    def test_quiet_feed_backs_off(self):
+        """Test that the interval grows while a feed stays quiet."""
+        timeline = Mock()
+        timeline.get_goal_timeline.return_value = _page(1)
+        watcher = TimelineWatcher(timeline, rate_limiter=RateLimiter(100), min_interval=10, max_interval=40)
+        key = watcher.watch_goal("college-180")
+
+        for _ in range(6):
+            watcher.poll(key)
+
+        assert watcher.intervals()[key] == 40
+
+    def test_background_thread_delivers_events(self):
+        """Test that the started watcher polls and dispatches on its own."""
+        timeline = Mock()
+        pages = iter([_page(1), _page(2, 1)])
+        timeline.get_achievement_timeline.side_effect = lambda *args: next(pages, _page(2, 1))
+        watcher = TimelineWatcher(timeline, rate_limiter=RateLimiter(1000, burst=10), min_interval=0.01)
+        received = []
+        watcher.subscribe(lambda key, event: received.append(key), feed="achievement")
+        watcher.watch_achievement()
+
+        with watcher:
+            deadline = time.monotonic() + 2
+            while not received and time.monotonic() < deadline:
+                time.sleep(0.01)
+
+        assert received == ["achievement"]
+
+    def test_rewatch_keeps_one_schedule(self):
+        """Test that unwatching and watching a feed again leaves a single schedule entry."""
+        watcher = TimelineWatcher(Mock(), rate_limiter=RateLimiter(100))
+        key = watcher.watch_followee()
+        watcher.unwatch(key)
+        watcher.watch_followee()
+
+        assert [entry[2] for entry in watcher._schedule] == [key]
+
+    def test_async_queue_drops_when_full(self, caplog):
+        """Test that a full bounded queue drops events with a warning instead of failing in the loop."""
+        async def run():
+            watcher = TimelineWatcher(Mock(), rate_limiter=RateLimiter(100))
+            queue = watcher.async_queue(maxsize=1)
+            watcher._dispatch("followee", {"id": 1})
+            watcher._dispatch("followee", {"id": 2})
+            await asyncio.sleep(0)
+            return [queue.get_nowait() for _ in range(queue.qsize())]
+
+        assert asyncio.run(run()) == [("followee", {"id": 1})]
+        assert "dropped event 2" in caplog.text